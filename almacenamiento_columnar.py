@@ -0,0 +1,119 @@
+from array import array
+from datetime import date
+
+from sprint7 import Consulta, fecha_compacta
+
+
+class TablaConsultas:
+    """
+    Tabla de consultas guardada por columnas, para archivos de varios años.
+
+    Cada consulta ocupa cuatro enteros: la fecha como ordinal y los índices de
+    su motivo, su diagnóstico y su mascota. Los textos repetidos se guardan una
+    sola vez. Al acceder a una fila se obtiene un objeto Consulta, así que
+    diccionario_Consulta/from_dict siguen funcionando igual.
+
+    Atributos:
+        fechas (array): Fecha de cada consulta (date.toordinal()).
+        motivos (array): Índice del motivo en `textos`.
+        diagnosticos (array): Índice del diagnóstico en `textos`.
+        mascotas (array): Índice de la mascota en `lista_mascotas`.
+        textos (list): Textos distintos de motivos y diagnósticos.
+        lista_mascotas (list): Mascotas distintas referenciadas.
+    """
+    def __init__(self):
+        self.fechas = array("i")
+        self.motivos = array("I")
+        self.diagnosticos = array("I")
+        self.mascotas = array("I")
+        self.textos = []
+        self.lista_mascotas = []
+        self._indice_textos = {}
+        self._indice_mascotas = {}  # id(mascota) -> posición en lista_mascotas
+
+    @classmethod
+    def desde_consultas(cls, consultas):
+        tabla = cls()
+        tabla.agregar_varias(consultas)
+        return tabla
+
+    def _texto(self, texto):
+        posicion = self._indice_textos.get(texto)
+        if posicion is None:
+            posicion = self._indice_textos[texto] = len(self.textos)
+            self.textos.append(texto)
+        return posicion
+
+    def agregar(self, consulta):
+        posicion = self._indice_mascotas.get(id(consulta.mascota))
+        if posicion is None:
+            posicion = self._indice_mascotas[id(consulta.mascota)] = len(self.lista_mascotas)
+            self.lista_mascotas.append(consulta.mascota)
+        self.fechas.append(consulta.fecha.toordinal())
+        self.motivos.append(self._texto(consulta.motivo))
+        self.diagnosticos.append(self._texto(consulta.diagnostico))
+        self.mascotas.append(posicion)
+
+    def agregar_varias(self, consultas):
+        for consulta in consultas:
+            self.agregar(consulta)
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def __getitem__(self, i):
+        return Consulta(fecha_compacta(date.fromordinal(self.fechas[i])),
+                        self.textos[self.motivos[i]],
+                        self.textos[self.diagnosticos[i]],
+                        self.lista_mascotas[self.mascotas[i]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+SIN_EDAD = -1  # En TablaMascotas.edades, mascota sin edad registrada
+
+
+class TablaMascotas:
+    """
+    Tabla de mascotas guardada por columnas, para las estadísticas del censo
+    (ver estadisticas.py). Especie y raza se guardan como índices en `textos`.
+
+    Atributos:
+        especies (array): Índice de la especie en `textos`.
+        razas (array): Índice de la raza en `textos`.
+        edades (array): Edad en años, o SIN_EDAD si no se conoce.
+        textos (list): Especies y razas distintas.
+    """
+    def __init__(self):
+        self.especies = array("I")
+        self.razas = array("I")
+        self.edades = array("i")
+        self.textos = []
+        self._indice_textos = {}
+
+    @classmethod
+    def desde_mascotas(cls, mascotas):
+        tabla = cls()
+        tabla.agregar_varias(mascotas)
+        return tabla
+
+    def _texto(self, texto):
+        posicion = self._indice_textos.get(texto)
+        if posicion is None:
+            posicion = self._indice_textos[texto] = len(self.textos)
+            self.textos.append(texto)
+        return posicion
+
+    def agregar(self, mascota):
+        self.especies.append(self._texto(mascota.especie))
+        self.razas.append(self._texto(mascota.raza))
+        self.edades.append(SIN_EDAD if mascota.edad is None else int(mascota.edad))
+
+    def agregar_varias(self, mascotas):
+        for mascota in mascotas:
+            self.agregar(mascota)
+
+    def __len__(self):
+        return len(self.edades)
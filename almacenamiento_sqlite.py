@@ -0,0 +1,288 @@
+import sqlite3
+import logging
+import itertools
+import sys
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria, clave_busqueda, configurar_logging
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS propietarios (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    nombre_clave TEXT NOT NULL,
+    telefono TEXT,
+    direccion TEXT
+);
+CREATE TABLE IF NOT EXISTS mascotas (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    nombre_clave TEXT NOT NULL,
+    especie TEXT,
+    raza TEXT,
+    edad INTEGER,
+    propietario_id INTEGER REFERENCES propietarios(id),
+    historica INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS consultas (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    motivo TEXT,
+    diagnostico TEXT,
+    mascota_id INTEGER NOT NULL REFERENCES mascotas(id)
+);
+CREATE INDEX IF NOT EXISTS idx_propietarios_nombre ON propietarios(nombre_clave);
+CREATE INDEX IF NOT EXISTS idx_mascotas_nombre ON mascotas(nombre_clave);
+CREATE INDEX IF NOT EXISTS idx_consultas_fecha ON consultas(fecha);
+CREATE INDEX IF NOT EXISTS idx_consultas_mascota ON consultas(mascota_id);
+"""
+
+_COLUMNAS_MASCOTA = "m.id, m.nombre, m.especie, m.raza, m.edad, p.id, p.nombre, p.telefono, p.direccion"
+
+
+class RepositorioSQLite:
+    """
+    Repositorio de SistemaVeterinaria sobre una base de datos SQLite.
+
+    Las consultas se resuelven con índices sobre el nombre normalizado de
+    mascotas y propietarios y sobre la fecha de consulta, así que no hace
+    falta cargar el historial en memoria. Cada escritura es una transacción;
+    dentro de `lote()` todas las escrituras comparten una sola transacción.
+
+    Las mascotas históricas (las que solo aparecen en consultas) no se listan
+    ni se encuentran por nombre, como en SistemaVeterinaria, pero sus
+    consultas sí forman parte de las historias y los reportes.
+
+    Atributos:
+        ruta (str): Archivo de la base de datos.
+    """
+    def __init__(self, ruta="veterinaria.db"):
+        self.ruta = ruta
+        # Puede usarse desde varios hilos (p. ej. servidor.py) si el acceso está serializado
+        self.conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self.conexion.execute("PRAGMA foreign_keys=ON")
+        self.conexion.executescript(ESQUEMA)
+        if "historica" not in {fila[1] for fila in self.conexion.execute("PRAGMA table_info(mascotas)")}:
+            # Base creada antes de importar mascotas históricas
+            self.conexion.execute("ALTER TABLE mascotas ADD COLUMN historica INTEGER NOT NULL DEFAULT 0")
+        self._en_lote = False
+        # Mapas de identidad para devolver un solo objeto por fila mientras alguien lo use:
+        # con referencias débiles no crecen con cada fila leída
+        self._propietarios = weakref.WeakValueDictionary()
+        self._mascotas = weakref.WeakValueDictionary()
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa todas las escrituras del bloque en una sola transacción.
+        Si ocurre un error, ninguna de ellas queda guardada.
+        """
+        if self._en_lote:
+            yield
+            return
+        self.conexion.execute("BEGIN")
+        self._en_lote = True
+        try:
+            yield
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        else:
+            self.conexion.execute("COMMIT")
+        finally:
+            self._en_lote = False
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _propietario(self, id_, nombre, telefono, direccion):
+        propietario = self._propietarios.get(id_)
+        if propietario is None:
+            propietario = self._propietarios[id_] = Propietario(nombre, telefono, direccion, id_)
+        return propietario
+
+    def _registrado(self, tabla, mapa, entidad):
+        """
+        Indica si la fila con el id de la entidad ya existe. Si existe y no
+        tiene objeto en el mapa de identidad, la entidad pasa a representarla.
+        """
+        if entidad.id is None:
+            return False
+        if entidad.id in mapa:
+            return True
+        if self.conexion.execute(f"SELECT 1 FROM {tabla} WHERE id = ?", (entidad.id,)).fetchone() is None:
+            return False
+        mapa[entidad.id] = entidad
+        return True
+
+    def _mascota(self, fila):
+        mascota = self._mascotas.get(fila[0])
+        if mascota is None:
+            propietario = self._propietario(*fila[5:9]) if fila[5] is not None else None
+            mascota = self._mascotas[fila[0]] = Mascota(fila[1], fila[2], fila[3], fila[4], propietario, fila[0])
+        return mascota
+
+    def buscar_propietario(self, nombre_propietario):
+        fila = self.conexion.execute(
+            "SELECT id, nombre, telefono, direccion FROM propietarios WHERE nombre_clave = ? ORDER BY id LIMIT 1",
+            (clave_busqueda(nombre_propietario),)).fetchone()
+        return self._propietario(*fila) if fila else None
+
+    def buscar_mascota(self, nombre_mascota):
+        fila = self.conexion.execute(
+            f"SELECT {_COLUMNAS_MASCOTA} FROM mascotas m LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "WHERE m.nombre_clave = ? AND NOT m.historica ORDER BY m.id LIMIT 1",
+            (clave_busqueda(nombre_mascota),)).fetchone()
+        return self._mascota(fila) if fila else None
+
+    def mascotas(self):
+        cursor = self.conexion.execute(
+            f"SELECT {_COLUMNAS_MASCOTA} FROM mascotas m LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "WHERE NOT m.historica ORDER BY m.id")
+        for fila in cursor:
+            yield self._mascota(fila)
+
+    def consultas_de_mascota(self, nombre_mascota):
+        cursor = self.conexion.execute(
+            f"SELECT c.fecha, c.motivo, c.diagnostico, {_COLUMNAS_MASCOTA} FROM consultas c "
+            "JOIN mascotas m ON m.id = c.mascota_id LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "WHERE m.nombre_clave = ? ORDER BY c.id",
+            (clave_busqueda(nombre_mascota),))
+        return [Consulta(date.fromisoformat(fila[0]), fila[1], fila[2], self._mascota(fila[3:])) for fila in cursor]
+
+    def consultas_entre(self, desde, hasta):
+        """
+        Retorna las consultas con fecha en [desde, hasta], ordenadas por fecha.
+        """
+        cursor = self.conexion.execute(
+            f"SELECT c.fecha, c.motivo, c.diagnostico, {_COLUMNAS_MASCOTA} FROM consultas c "
+            "JOIN mascotas m ON m.id = c.mascota_id LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "WHERE c.fecha BETWEEN ? AND ? ORDER BY c.fecha, c.id",
+            (desde.isoformat(), hasta.isoformat()))
+        return [Consulta(date.fromisoformat(fila[0]), fila[1], fila[2], self._mascota(fila[3:])) for fila in cursor]
+
+    def visitas_por_mes(self, desde=None, hasta=None):
+        """
+        Retorna las visitas por mes y especie en [desde, hasta], como {"AAAA-MM": {especie: cantidad}}.
+        """
+        cursor = self.conexion.execute(
+            "SELECT substr(c.fecha, 1, 7), m.especie, COUNT(*) FROM consultas c JOIN mascotas m ON m.id = c.mascota_id "
+            "WHERE c.fecha BETWEEN ? AND ? GROUP BY 1, 2 ORDER BY 1, 2",
+            ((desde or date.min).isoformat(), (hasta or date.max).isoformat()))
+        visitas = {}
+        for mes, especie, cantidad in cursor:
+            visitas.setdefault(mes, {})[especie] = cantidad
+        return visitas
+
+    def ultima_visita(self, mascota):
+        fila = self.conexion.execute(
+            f"SELECT c.fecha, c.motivo, c.diagnostico, {_COLUMNAS_MASCOTA} FROM consultas c "
+            "JOIN mascotas m ON m.id = c.mascota_id LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "WHERE c.mascota_id = ? ORDER BY c.fecha DESC, c.id DESC LIMIT 1",
+            (mascota.id,)).fetchone()
+        return Consulta(date.fromisoformat(fila[0]), fila[1], fila[2], self._mascota(fila[3:])) if fila else None
+
+    def ultimas_visitas(self):
+        """
+        Retorna la última consulta de cada mascota, de la más reciente a la más antigua.
+        """
+        # Con MAX(), SQLite toma las demás columnas de la fila con la fecha máxima
+        cursor = self.conexion.execute(
+            f"SELECT MAX(c.fecha), c.motivo, c.diagnostico, {_COLUMNAS_MASCOTA} FROM consultas c "
+            "JOIN mascotas m ON m.id = c.mascota_id LEFT JOIN propietarios p ON p.id = m.propietario_id "
+            "GROUP BY c.mascota_id ORDER BY 1 DESC, m.id")
+        return [Consulta(date.fromisoformat(fila[0]), fila[1], fila[2], self._mascota(fila[3:])) for fila in cursor]
+
+    def agregar_propietario(self, propietario):
+        with self.lote():
+            cursor = self.conexion.execute(
+                "INSERT INTO propietarios (id, nombre, nombre_clave, telefono, direccion) VALUES (?, ?, ?, ?, ?)",
+                (propietario.id, propietario.nombre, clave_busqueda(propietario.nombre),
+                 propietario.telefono, propietario.direccion))
+        propietario.id = cursor.lastrowid
+        self._propietarios[propietario.id] = propietario
+
+    def actualizar_propietario(self, propietario):
+        with self.lote():
+            self.conexion.execute("UPDATE propietarios SET telefono = ?, direccion = ? WHERE id = ?",
+                                  (propietario.telefono, propietario.direccion, propietario.id))
+
+    def agregar_mascota(self, mascota, historica=False):
+        with self.lote():
+            propietario = mascota.propietario
+            if propietario is not None and not self._registrado("propietarios", self._propietarios, propietario):
+                self.agregar_propietario(propietario)
+            cursor = self.conexion.execute(
+                "INSERT INTO mascotas (id, nombre, nombre_clave, especie, raza, edad, propietario_id, historica) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (mascota.id, mascota.nombre, clave_busqueda(mascota.nombre), mascota.especie, mascota.raza,
+                 mascota.edad, propietario.id if propietario else None, historica))
+        mascota.id = cursor.lastrowid
+        self._mascotas[mascota.id] = mascota
+
+    def agregar_consulta(self, consulta):
+        with self.lote():
+            if not self._registrado("mascotas", self._mascotas, consulta.mascota):
+                self.agregar_mascota(consulta.mascota)
+            self.conexion.execute(
+                "INSERT INTO consultas (fecha, motivo, diagnostico, mascota_id) VALUES (?, ?, ?, ?)",
+                (consulta.fecha.strftime("%Y-%m-%d"), consulta.motivo, consulta.diagnostico, consulta.mascota.id))
+
+
+def importar_desde_archivos(repositorio):
+    """
+    Copia al repositorio, en una sola transacción, los propietarios, mascotas y
+    consultas de propietarios.csv, mascotas.csv y consultas.json del directorio
+    actual. Propietarios y mascotas conservan sus ids, así que al repetir la
+    importación se omiten los que ya están, y también las consultas que ya
+    están (misma fecha, motivo, diagnóstico y mascota). Las mascotas que solo
+    aparecen en consultas se importan como históricas.
+
+    Retorna:
+        tuple: Cantidad de (propietarios, mascotas, consultas) importados.
+    """
+    origen = SistemaVeterinaria()
+    listadas = {id(m) for m in origen.mascotas}
+    historicas = {id(c.mascota): c.mascota for c in origen.consultas if id(c.mascota) not in listadas}
+    propietarios = {id(p): p for p in origen.propietarios}
+    for mascota in itertools.chain(origen.mascotas, historicas.values()):
+        if mascota.propietario is not None:
+            propietarios.setdefault(id(mascota.propietario), mascota.propietario)
+    importados = [0, 0, 0]
+
+    with repositorio.lote():
+        for propietario in propietarios.values():
+            if not repositorio._registrado("propietarios", repositorio._propietarios, propietario):
+                repositorio.agregar_propietario(propietario)
+                importados[0] += 1
+        for mascotas, historica in ((origen.mascotas, False), (historicas.values(), True)):
+            for mascota in mascotas:
+                if not repositorio._registrado("mascotas", repositorio._mascotas, mascota):
+                    repositorio.agregar_mascota(mascota, historica)
+                    importados[1] += 1
+        existentes = Counter(repositorio.conexion.execute("SELECT fecha, motivo, diagnostico, mascota_id FROM consultas"))
+        for consulta in origen.consultas:
+            clave = (consulta.fecha.strftime("%Y-%m-%d"), consulta.motivo, consulta.diagnostico, consulta.mascota.id)
+            if existentes[clave]:
+                existentes[clave] -= 1
+                continue
+            repositorio.agregar_consulta(consulta)
+            importados[2] += 1
+    logger.info("Datos importados a SQLite")
+    return tuple(importados)
+
+
+if __name__ == "__main__":
+    configurar_logging()
+    ruta = sys.argv[1] if len(sys.argv) > 1 else "veterinaria.db"
+    repositorio = RepositorioSQLite(ruta)
+    propietarios, mascotas, consultas = importar_desde_archivos(repositorio)
+    repositorio.cerrar()
+    print(f"Importados {propietarios} propietarios, {mascotas} mascotas y {consultas} consultas a {ruta}.")
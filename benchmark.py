@@ -0,0 +1,270 @@
+"""
+Mide el rendimiento de SistemaVeterinaria sobre datos sintéticos de una
+clínica: carga al iniciar (completa y diferida), buscar_propietario,
+registrar_consulta con su persistencia (cada una por separado y en lotes de
+LOTE_ESCRITURA con el buffer de escritura), historia_clinica y listar_mascotas
+(la primera vez y repetida) y las estadísticas del censo, recorriendo los
+objetos (censo_con_bucles) y con las columnas de estadisticas.py (la primera
+vez y repetidas), con input/print reemplazados y los listados escritos en
+os.devnull. Los resultados se guardan en JSON para
+comparar versiones.
+
+Uso: python benchmark.py [--escalas 1000 100000 1000000] [--semilla 42]
+                         [--repeticiones 200] [--salida resultados_benchmark.json]
+
+Cada escala es la cantidad de consultas; se generan una mascota cada 10
+consultas y un propietario cada 2 mascotas.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from estadisticas import Censo
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria
+
+NOMBRES = ["Ana", "Carlos", "Laura", "Andrés", "Sofía", "Juan", "Valentina", "Mateo", "Camila", "Santiago",
+           "Isabella", "Sebastián", "Mariana", "Nicolás", "Lucía", "Felipe", "Daniela", "Tomás", "Gabriela", "Diego"]
+APELLIDOS = ["Gómez", "Rodríguez", "López", "Martínez", "García", "Pérez", "Sánchez", "Ramírez", "Torres", "Díaz",
+             "Vargas", "Castro", "Moreno", "Rojas", "Ortiz", "Jiménez", "Muñoz", "Herrera", "Ruiz", "Suárez"]
+NOMBRES_MASCOTA = ["Luna", "Max", "Rocky", "Kira", "Toby", "Nala", "Simba", "Coco", "Lola", "Bruno",
+                   "Milo", "Mia", "Zeus", "Canela", "Chispa", "Oreo", "Thor", "Maya", "Rex", "Pelusa"]
+RAZAS = {
+    "Perro": ["Labrador", "Bulldog", "Pastor Alemán", "Criollo", "Beagle", "Poodle"],
+    "Gato": ["Siamés", "Persa", "Criollo", "Angora", "Bengalí"],
+    "Conejo": ["Belier", "Rex", "Cabeza de León"],
+    "Ave": ["Canario", "Periquito", "Loro"],
+}
+ESPECIES = ["Perro"] * 6 + ["Gato"] * 3 + ["Conejo", "Ave"]
+ATENCIONES = [
+    ("Vacunación anual", "Sin novedad"),
+    ("Chequeo general", "Sin novedad"),
+    ("Desparasitación", "Parásitos intestinales"),
+    ("Vómito y diarrea", "Gastroenteritis"),
+    ("Picazón en orejas", "Otitis externa"),
+    ("Pérdida de pelo", "Dermatitis alérgica"),
+    ("Cojera", "Esguince"),
+    ("Control de peso", "Sobrepeso"),
+    ("Control postoperatorio", "Evolución favorable"),
+    ("Tos persistente", "Traqueobronquitis"),
+]
+FECHA_INICIAL = date(2020, 1, 1)
+DIAS_DE_HISTORIA = 5 * 365
+LOTE_ESCRITURA = 100
+
+
+def generar_datos(consultas, semilla=42):
+    """
+    Genera propietarios, mascotas y consultas reproducibles para una escala.
+    Los nombres de propietarios y mascotas son únicos, como en una clínica
+    donde el recepcionista los distingue por apellido o número de ficha.
+
+    Retorna:
+        tuple: (propietarios, mascotas, consultas) como listas de objetos.
+    """
+    azar = random.Random(semilla)
+    cantidad_mascotas = max(1, consultas // 10)
+    propietarios = [
+        Propietario(f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {i}",
+                    f"3{azar.randrange(10**9):09d}",
+                    f"Calle {azar.randint(1, 200)} # {azar.randint(1, 99)}-{azar.randint(1, 99)}")
+        for i in range(max(1, cantidad_mascotas // 2))
+    ]
+    mascotas = []
+    for i in range(cantidad_mascotas):
+        especie = azar.choice(ESPECIES)
+        mascotas.append(Mascota(f"{azar.choice(NOMBRES_MASCOTA)} {i}", especie, azar.choice(RAZAS[especie]),
+                                azar.randint(0, 16), azar.choice(propietarios)))
+    lista_consultas = []
+    for _ in range(consultas):
+        motivo, diagnostico = azar.choice(ATENCIONES)
+        fecha = FECHA_INICIAL + timedelta(days=azar.randrange(DIAS_DE_HISTORIA))
+        lista_consultas.append(Consulta(fecha, motivo, diagnostico, azar.choice(mascotas)))
+    lista_consultas.sort(key=lambda c: c.fecha)
+    return propietarios, mascotas, lista_consultas
+
+
+def escribir_datos(propietarios, mascotas, consultas):
+    """Escribe propietarios.csv, mascotas.csv y consultas.json en el directorio actual con el formato del sistema."""
+    sistema = SistemaVeterinaria()
+    sistema.propietarios = propietarios
+    sistema.mascotas = mascotas
+    sistema.consultas = consultas
+    sistema.guardar_mascotas_csv(*mascotas)
+    sistema.guardar_json_consultas()
+
+
+def censo_con_bucles(mascotas, consultas, cantidad=10):
+    """
+    Las mismas estadísticas que Censo.resumen(), contadas recorriendo los
+    objetos uno por uno. Sirve de referencia para medir el censo por columnas.
+    """
+    def mayores(conteo):
+        return sorted(conteo.items(), key=lambda item: item[1], reverse=True)
+
+    especies, razas, edades = {}, {}, {}
+    for mascota in mascotas:
+        especies[mascota.especie] = especies.get(mascota.especie, 0) + 1
+        clave = (mascota.especie, mascota.raza)
+        razas[clave] = razas.get(clave, 0) + 1
+        if mascota.edad is not None:
+            edades[int(mascota.edad)] = edades.get(int(mascota.edad), 0) + 1
+    por_mascota, por_mes, diagnosticos = {}, {}, {}
+    for consulta in consultas:
+        por_mascota[consulta.mascota] = por_mascota.get(consulta.mascota, 0) + 1
+        mes = consulta.fecha.strftime("%Y-%m")
+        por_mes[mes] = por_mes.get(mes, 0) + 1
+        diagnosticos[consulta.diagnostico] = diagnosticos.get(consulta.diagnostico, 0) + 1
+    return {
+        "especies": mayores(especies),
+        "razas": [(especie, raza, total) for (especie, raza), total in mayores(razas)],
+        "edades": sorted(edades.items()),
+        "mascotas_frecuentes": mayores(por_mascota)[:cantidad],
+        "por_mes": dict(sorted(por_mes.items())),
+        "diagnosticos": mayores(diagnosticos)[:cantidad],
+    }
+
+
+def resumen_tiempos(duraciones):
+    """Estadísticas en milisegundos de una lista de duraciones en segundos."""
+    ordenadas = sorted(duraciones)
+
+    def percentil(p):
+        return round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000, 4)
+    return {
+        "repeticiones": len(ordenadas),
+        "total_ms": round(sum(ordenadas) * 1000, 3),
+        "promedio_ms": round(statistics.fmean(ordenadas) * 1000, 4),
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "max_ms": round(ordenadas[-1] * 1000, 4),
+    }
+
+
+def cronometrar(funcion, repeticiones=1):
+    duraciones = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        duraciones.append(time.perf_counter() - inicio)
+    return resumen_tiempos(duraciones)
+
+
+def medir_escala(consultas, semilla=42, repeticiones=200):
+    """
+    Genera los datos de una escala en un directorio temporal y mide cada operación.
+
+    Retorna:
+        dict: Tamaño de los datos y tiempos por operación.
+    """
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            with patch("builtins.print"), open(os.devnull, "w", encoding="utf-8") as nulo:
+                inicio = time.perf_counter()
+                propietarios, mascotas, lista_consultas = generar_datos(consultas, semilla)
+                escribir_datos(propietarios, mascotas, lista_consultas)
+                generacion = time.perf_counter() - inicio
+                del lista_consultas
+
+                resultados = {
+                    "propietarios": len(propietarios),
+                    "mascotas": len(mascotas),
+                    "consultas": consultas,
+                    "bytes_mascotas_csv": os.path.getsize("mascotas.csv"),
+                    "bytes_propietarios_csv": os.path.getsize("propietarios.csv"),
+                    "bytes_consultas_json": os.path.getsize("consultas.json"),
+                    "generacion_s": round(generacion, 3),
+                    "operaciones": {},
+                }
+                operaciones = resultados["operaciones"]
+                azar = random.Random(semilla)
+                nombres_propietarios = [p.nombre for p in azar.choices(propietarios, k=repeticiones)]
+                nombres_mascotas = [m.nombre for m in azar.choices(mascotas, k=repeticiones)]
+                del propietarios, mascotas
+
+                operaciones["iniciar_carga_diferida"] = cronometrar(lambda: SistemaVeterinaria(carga_diferida=True))
+                sistemas = []
+                operaciones["iniciar"] = cronometrar(lambda: sistemas.append(SistemaVeterinaria()))
+                sistema = sistemas.pop()
+
+                nombres = iter(nombres_propietarios)
+                operaciones["buscar_propietario"] = cronometrar(
+                    lambda: sistema.buscar_propietario(next(nombres)), repeticiones)
+
+                entradas = iter([
+                    valor
+                    for i, nombre in enumerate(nombres_mascotas)
+                    for valor in (nombre, (FECHA_INICIAL + timedelta(days=i)).strftime("%d-%m-%Y"),
+                                  "Chequeo general", "Sin novedad")
+                ])
+                with patch("builtins.input", lambda _="": next(entradas)):
+                    operaciones["registrar_consulta"] = cronometrar(sistema.registrar_consulta, repeticiones)
+                entradas = iter([
+                    valor
+                    for i, nombre in enumerate(nombres_mascotas)
+                    for valor in (nombre, (FECHA_INICIAL + timedelta(days=i)).strftime("%d-%m-%Y"),
+                                  "Control", "Sin novedad")
+                ])
+                sistema.lote_escritura = LOTE_ESCRITURA
+                with patch("builtins.input", lambda _="": next(entradas)):
+                    operaciones["registrar_consulta_en_lote"] = cronometrar(sistema.registrar_consulta, repeticiones)
+                sistema.escribir_pendientes()
+                sistema.lote_escritura = 1
+
+                nombres = iter(nombres_mascotas)
+                with patch("builtins.input", lambda _="": next(nombres)):
+                    operaciones["historia_clinica"] = cronometrar(lambda: sistema.historia_clinica(salida=nulo), repeticiones)
+
+                operaciones["listar_mascotas"] = cronometrar(lambda: sistema.listar_mascotas(nulo))
+                operaciones["listar_mascotas_repetido"] = cronometrar(lambda: sistema.listar_mascotas(nulo), 10)
+
+                operaciones["censo_bucles"] = cronometrar(lambda: censo_con_bucles(sistema.mascotas, sistema.consultas))
+                operaciones["censo_columnar"] = cronometrar(
+                    lambda: Censo().actualizar(sistema.mascotas, sistema.consultas).resumen())
+                sistema.censo()
+                operaciones["censo_columnar_repetido"] = cronometrar(lambda: sistema.censo().resumen(), 10)
+                sistema.cerrar()
+        finally:
+            os.chdir(directorio_original)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de SistemaVeterinaria con datos sintéticos")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="cantidades de consultas a generar")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=200,
+                        help="llamadas medidas en las operaciones individuales")
+    parser.add_argument("--salida", default="resultados_benchmark.json")
+    args = parser.parse_args(argv)
+
+    resultados = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "semilla": args.semilla,
+        "escalas": {},
+    }
+    for escala in args.escalas:
+        print(f"Escala {escala:,} consultas...", flush=True)
+        resultados["escalas"][str(escala)] = medicion = medir_escala(escala, args.semilla, args.repeticiones)
+        for operacion, tiempos in medicion["operaciones"].items():
+            print(f"  {operacion:<24} {tiempos['promedio_ms']:12.3f} ms/llamada  (p95 {tiempos['p95_ms']:.3f} ms)")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
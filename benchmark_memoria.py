@@ -0,0 +1,67 @@
+"""
+Compara la memoria que ocupan N consultas en tres representaciones:
+clases con __dict__ y datetime (como antes de usar __slots__), las clases
+actuales con __slots__ y fechas y textos compartidos, y TablaConsultas por columnas.
+
+Uso: python benchmark_memoria.py [N]   (por defecto 1.000.000)
+"""
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sprint7 import Mascota, Propietario, Consulta
+from almacenamiento_columnar import TablaConsultas
+
+MOTIVOS = ["Vacunación", "Chequeo general", "Desparasitación", "Control postoperatorio", "Dermatitis"]
+DIAGNOSTICOS = ["Sin novedad", "Otitis externa", "Dermatitis alérgica", "Sobrepeso", "Gastroenteritis"]
+
+
+class ConsultaConDict:
+    """Consulta con __dict__ por instancia, como antes de usar __slots__."""
+    def __init__(self, fecha, motivo, diagnostico, mascota):
+        self.fecha = fecha
+        self.motivo = motivo
+        self.diagnostico = diagnostico
+        self.mascota = mascota
+
+
+def datos_consultas(n, mascotas):
+    """
+    Genera los datos de n consultas con textos nuevos en cada una, como los
+    produce json.load, y fechas datetime distintas por objeto como from_dict.
+    """
+    inicio = datetime(2020, 1, 1)
+    for i in range(n):
+        yield (inicio + timedelta(days=i % 1500),
+               MOTIVOS[i % len(MOTIVOS)].encode().decode(),
+               DIAGNOSTICOS[i % len(DIAGNOSTICOS)].encode().decode(),
+               mascotas[i % len(mascotas)])
+
+
+def medir(descripcion, construir):
+    tracemalloc.start()
+    resultado = construir()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del resultado
+    return descripcion, memoria
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    mascotas = [Mascota(f"Mascota {i}", "Perro", "Mestizo", i % 15, Propietario(f"Dueño {i}", "300", "Calle"))
+                for i in range(20_000)]
+
+    resultados = [
+        medir("Clases con __dict__ y datetime", lambda: [ConsultaConDict(*d) for d in datos_consultas(n, mascotas)]),
+        medir("Clases con __slots__ y valores compartidos", lambda: [Consulta(*d) for d in datos_consultas(n, mascotas)]),
+        medir("TablaConsultas (columnas)", lambda: TablaConsultas.desde_consultas(
+            ConsultaConDict(*d) for d in datos_consultas(n, mascotas))),
+    ]
+    print(f"Memoria para {n:,} consultas:")
+    for descripcion, memoria in resultados:
+        print(f"  {descripcion:<42} {memoria / 2**20:8.1f} MiB  ({memoria / n:6.1f} bytes/consulta)")
+
+
+if __name__ == "__main__":
+    main()
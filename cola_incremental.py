@@ -0,0 +1,37 @@
+"""
+Seguimiento de listas a las que solo se les agregan elementos al final, como
+las de mascotas y consultas de SistemaVeterinaria. Lo que se deriva de ellas
+(índices, listados, censos) se pone al día procesando solo la cola nueva.
+"""
+import itertools
+
+
+class ColaIncremental:
+    """
+    Recuerda qué lista se siguió y hasta qué posición se procesó.
+
+    Si la lista es otra o se acortó, lo derivado de ella ya no sirve y debe
+    reconstruirse desde el principio: reemplazada() lo indica y nuevos()
+    retorna entonces todos los elementos.
+
+    Atributos:
+        procesados (int): Elementos de la lista ya procesados.
+    """
+    def __init__(self):
+        self._origen = None
+        self.procesados = 0
+
+    def reemplazada(self, lista):
+        """Indica si `lista` no es la que se seguía o se acortó desde la última vez."""
+        return lista is not self._origen or self.procesados > len(lista)
+
+    def nuevos(self, lista, desde=None):
+        """
+        Retorna los elementos agregados a `lista` desde la llamada anterior (o
+        desde la posición `desde`, si lo derivado ya incluye los anteriores) y
+        da la lista por procesada hasta el final.
+        """
+        if desde is None:
+            desde = 0 if self.reemplazada(lista) else self.procesados
+        self._origen, self.procesados = lista, len(lista)
+        return itertools.islice(lista, desde, None)
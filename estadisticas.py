@@ -0,0 +1,224 @@
+"""
+Estadísticas de censo de la clínica: mascotas por especie y raza,
+distribución de edades, consultas por mascota y por mes y diagnósticos más
+frecuentes.
+
+Se calculan sobre columnas de enteros (TablaMascotas y TablaConsultas de
+almacenamiento_columnar.py) en lugar de recorrer los objetos: cada
+estadística cuenta los valores de una columna de una sola vez. Con NumPy
+instalado se cuenta con numpy.unique; sin él, con collections.Counter, que
+también recorre el array en C, y los conteos se guardan para sumarles solo
+las filas nuevas la próxima vez.
+"""
+import csv
+import heapq
+import os
+from collections import Counter
+from datetime import date
+
+from almacenamiento_columnar import SIN_EDAD, TablaConsultas, TablaMascotas
+from cola_incremental import ColaIncremental
+
+try:
+    import numpy
+except ImportError:  # Opcional: sin NumPy se usa Counter
+    numpy = None
+
+# Archivo de cada reporte exportado por Censo.exportar_csv
+REPORTES_CSV = {
+    "especies": "censo_especies.csv",
+    "razas": "censo_razas.csv",
+    "edades": "censo_edades.csv",
+    "mascotas_frecuentes": "censo_consultas_por_mascota.csv",
+    "por_mes": "censo_consultas_por_mes.csv",
+    "diagnosticos": "censo_diagnosticos.csv",
+}
+
+
+def contar(*columnas):
+    """
+    Cuenta cuántas veces aparece cada valor en una columna de enteros (array),
+    o cada combinación de valores en varias columnas del mismo largo.
+
+    Retorna:
+        dict: {valor, o tupla de valores con varias columnas: cantidad}.
+    """
+    if numpy is not None and len(columnas[0]):
+        datos = [numpy.frombuffer(columna, dtype=columna.typecode) for columna in columnas]
+        if len(datos) == 1:
+            valores, cantidades = numpy.unique(datos[0], return_counts=True)
+            return dict(zip(valores.tolist(), cantidades.tolist()))
+        valores, cantidades = numpy.unique(numpy.stack(datos).astype("int64"), axis=1, return_counts=True)
+        return dict(zip(map(tuple, valores.T.tolist()), cantidades.tolist()))
+    return Counter(columnas[0] if len(columnas) == 1 else zip(*columnas))
+
+
+def _mayores(conteo, cantidad=None):
+    # A igual cantidad, por código: el orden en que aparecieron, con y sin NumPy
+    if cantidad is None:
+        return sorted(conteo.items(), key=lambda item: (-item[1], item[0]))
+    return heapq.nsmallest(cantidad, conteo.items(), key=lambda item: (-item[1], item[0]))
+
+
+class Censo:
+    """
+    Estadísticas de censo sobre las mascotas y consultas cargadas.
+
+    Se actualiza con una ColaIncremental por lista, como los índices de
+    SistemaVeterinaria: si a las listas solo se les agregaron elementos al
+    final, solo esos se pasan a las columnas; si fueron reemplazadas o se
+    acortaron, se rehacen.
+
+    Atributos:
+        mascotas (TablaMascotas): Columnas de las mascotas.
+        consultas (TablaConsultas): Columnas de las consultas.
+    """
+    def __init__(self):
+        self.mascotas = TablaMascotas()
+        self.consultas = TablaConsultas()
+        self._cola_mascotas = ColaIncremental()
+        self._cola_consultas = ColaIncremental()
+        # {(tabla, columnas): (filas contadas, Counter)}, solo sin NumPy
+        self._conteos = {}
+
+    def actualizar(self, mascotas, consultas):
+        """
+        Pone las columnas al día con las listas de mascotas y consultas y
+        retorna el censo.
+        """
+        if self._cola_mascotas.reemplazada(mascotas):
+            self.mascotas = TablaMascotas()
+            self._olvidar_conteos("mascotas")
+        if self._cola_consultas.reemplazada(consultas):
+            self.consultas = TablaConsultas()
+            self._olvidar_conteos("consultas")
+        self.mascotas.agregar_varias(self._cola_mascotas.nuevos(mascotas))
+        self.consultas.agregar_varias(self._cola_consultas.nuevos(consultas))
+        return self
+
+    def _olvidar_conteos(self, tabla):
+        for clave in [clave for clave in self._conteos if clave[0] == tabla]:
+            del self._conteos[clave]
+
+    def _contar(self, tabla, *nombres):
+        """
+        Cuenta las columnas `nombres` de la tabla ("mascotas" o "consultas").
+        Sin NumPy, al conteo anterior solo se le suman las filas nuevas.
+        """
+        columnas = [getattr(getattr(self, tabla), nombre) for nombre in nombres]
+        if numpy is not None:
+            return contar(*columnas)
+        contadas, conteo = self._conteos.get((tabla, nombres), (0, Counter()))
+        if contadas < len(columnas[0]):
+            conteo.update(contar(*(columna[contadas:] for columna in columnas)))
+            self._conteos[(tabla, nombres)] = (len(columnas[0]), conteo)
+        return conteo
+
+    def mascotas_por_especie(self):
+        """
+        Retorna:
+            list: (especie, cantidad de mascotas), de la más a la menos numerosa.
+        """
+        textos = self.mascotas.textos
+        return [(textos[especie], cantidad) for especie, cantidad in _mayores(self._contar("mascotas", "especies"))]
+
+    def mascotas_por_raza(self):
+        """
+        Retorna:
+            list: (especie, raza, cantidad de mascotas), de la más a la menos numerosa.
+        """
+        textos = self.mascotas.textos
+        pares = self._contar("mascotas", "especies", "razas")
+        return [(textos[especie], textos[raza], cantidad) for (especie, raza), cantidad in _mayores(pares)]
+
+    def distribucion_edades(self, ancho=1):
+        """
+        Cantidad de mascotas por rango de edad; las que no tienen edad
+        registrada no se cuentan.
+
+        Parámetros:
+            ancho (int): Años de cada rango.
+
+        Retorna:
+            list: (edad inicial del rango, cantidad de mascotas), por edad.
+        """
+        por_rango = {}
+        for edad, cantidad in self._contar("mascotas", "edades").items():
+            if edad == SIN_EDAD:
+                continue
+            rango = edad // ancho * ancho
+            por_rango[rango] = por_rango.get(rango, 0) + cantidad
+        return sorted(por_rango.items())
+
+    def consultas_por_mascota(self, cantidad=None):
+        """
+        Retorna:
+            list: (mascota, cantidad de consultas), de la más a la menos
+            atendida; solo las primeras `cantidad` si se indica.
+        """
+        mascotas = self.consultas.lista_mascotas
+        return [(mascotas[posicion], total) for posicion, total in _mayores(self._contar("consultas", "mascotas"), cantidad)]
+
+    def consultas_por_mes(self):
+        """
+        Retorna:
+            dict: {"AAAA-MM": cantidad de consultas}, en orden cronológico.
+        """
+        # Se cuentan los días distintos y solo esos se convierten a fecha
+        por_mes = {}
+        for ordinal, cantidad in self._contar("consultas", "fechas").items():
+            fecha = date.fromordinal(ordinal)
+            mes = f"{fecha.year:04d}-{fecha.month:02d}"
+            por_mes[mes] = por_mes.get(mes, 0) + cantidad
+        return dict(sorted(por_mes.items()))
+
+    def diagnosticos_frecuentes(self, cantidad=10):
+        """
+        Retorna:
+            list: (diagnóstico, cantidad de consultas), los `cantidad` más frecuentes.
+        """
+        textos = self.consultas.textos
+        return [(textos[diagnostico], total) for diagnostico, total in _mayores(self._contar("consultas", "diagnosticos"), cantidad)]
+
+    def resumen(self, cantidad=10):
+        """
+        Todas las estadísticas del censo, con las claves de REPORTES_CSV.
+        De mascotas frecuentes y diagnósticos se incluyen los primeros `cantidad`.
+        """
+        return {
+            "especies": self.mascotas_por_especie(),
+            "razas": self.mascotas_por_raza(),
+            "edades": self.distribucion_edades(),
+            "mascotas_frecuentes": self.consultas_por_mascota(cantidad),
+            "por_mes": self.consultas_por_mes(),
+            "diagnosticos": self.diagnosticos_frecuentes(cantidad),
+        }
+
+    def exportar_csv(self, directorio=".", cantidad=10):
+        """
+        Escribe cada estadística del resumen en su archivo CSV (ver
+        REPORTES_CSV), con una fila de encabezado.
+
+        Retorna:
+            list: Rutas de los archivos escritos.
+        """
+        resumen = self.resumen(cantidad)
+        filas = {
+            "especies": [("especie", "mascotas"), *resumen["especies"]],
+            "razas": [("especie", "raza", "mascotas"), *resumen["razas"]],
+            "edades": [("edad", "mascotas"), *resumen["edades"]],
+            "mascotas_frecuentes": [("mascota", "especie", "propietario", "consultas")] + [
+                (m.nombre, m.especie, m.propietario.nombre if m.propietario else "", total)
+                for m, total in resumen["mascotas_frecuentes"]],
+            "por_mes": [("mes", "consultas"), *resumen["por_mes"].items()],
+            "diagnosticos": [("diagnostico", "consultas"), *resumen["diagnosticos"]],
+        }
+        os.makedirs(directorio, exist_ok=True)
+        rutas = []
+        for clave, archivo in REPORTES_CSV.items():
+            ruta = os.path.join(directorio, archivo)
+            with open(ruta, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(filas[clave])
+            rutas.append(ruta)
+        return rutas
+
@@ -0,0 +1,91 @@
+"""
+Formato del snapshot binario del estado de SistemaVeterinaria.
+
+El archivo empieza con MAGIA, sigue una línea JSON con el encabezado
+(versión, archivos fuente con su tamaño y CRC32, y la lista de secciones) y
+después cada sección como un array de enteros, alineada a 8 bytes. Al leerlo
+el archivo se mapea en memoria y cada sección se copia de una vez a un array.
+"""
+import json
+import mmap
+import os
+import sys
+import zlib
+from array import array
+
+MAGIA = b"VETESTADO\n"
+FORMATO_ESTADO = 1
+_ALINEACION = 8
+
+
+def crc_archivo(ruta, tamano=None):
+    """
+    CRC32 de los primeros `tamano` bytes del archivo (todo, por defecto), o
+    None si no existe o es más corto.
+    """
+    try:
+        with open(ruta, "rb") as f:
+            total = os.fstat(f.fileno()).st_size
+            tamano = total if tamano is None else tamano
+            if tamano > total:
+                return None
+            if tamano == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                with memoryview(datos) as vista:
+                    return zlib.crc32(vista[:tamano])
+    except FileNotFoundError:
+        return None
+
+
+def escribir_estado(ruta, encabezado, secciones):
+    """
+    Escribe el encabezado (dict) y las secciones ({nombre: array}) en `ruta`.
+    Se escribe en un temporal y se reemplaza, como el snapshot de consultas.
+    """
+    encabezado = dict(encabezado, version=FORMATO_ESTADO, orden_bytes=sys.byteorder,
+                      secciones=[[nombre, datos.typecode, len(datos)] for nombre, datos in secciones.items()])
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(MAGIA)
+        f.write(json.dumps(encabezado, ensure_ascii=False).encode("utf-8") + b"\n")
+        for datos in secciones.values():
+            f.write(b"\0" * (-f.tell() % _ALINEACION))
+            datos.tofile(f)
+    os.replace(temporal, ruta)
+
+
+def leer_estado(ruta):
+    """
+    Retorna:
+        tuple: (encabezado, {nombre: array}), o None si el archivo no existe o
+        no es un snapshot de este formato.
+    """
+    try:
+        f = open(ruta, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.read(len(MAGIA)) != MAGIA:
+            return None
+        try:
+            encabezado = json.loads(f.readline())
+        except ValueError:
+            return None
+        if encabezado.get("version") != FORMATO_ESTADO:
+            return None
+        posicion = f.tell()
+        secciones = {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            for nombre, tipo, cantidad in encabezado["secciones"]:
+                posicion += -posicion % _ALINEACION
+                seccion = array(tipo)
+                fin = posicion + cantidad * seccion.itemsize
+                if fin > len(datos):
+                    return None
+                seccion.frombytes(datos[posicion:fin])
+                if encabezado["orden_bytes"] != sys.byteorder:
+                    seccion.byteswap()
+                secciones[nombre] = seccion
+                posicion = fin
+    return encabezado, secciones
@@ -0,0 +1,127 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date
+from heapq import merge
+from operator import itemgetter
+
+
+class IndiceFechas:
+    """
+    Índice de consultas ordenado por fecha, para consultas por rango y reportes
+    por período sin recorrer todo el historial.
+
+    Las fechas se guardan como ordinales en un array ordenado, en paralelo con
+    las consultas, y los rangos se resuelven con bisect. Además se mantienen al
+    día, a medida que se agregan consultas, las visitas por mes y especie y la
+    última consulta de cada mascota.
+
+    Atributos:
+        fechas (array): date.toordinal() de cada consulta, en orden.
+        consultas (list): Consultas en el mismo orden que `fechas`.
+        por_mes (dict): {(año, mes): {especie: cantidad de visitas}}.
+        ultimas (dict): {id(mascota): última consulta de la mascota}.
+    """
+    def __init__(self):
+        self.fechas = array("i")
+        self.consultas = []
+        self.por_mes = {}
+        self.ultimas = {}
+
+    def __len__(self):
+        return len(self.consultas)
+
+    def agregar(self, consulta):
+        ordinal = consulta.fecha.toordinal()
+        self._insertar(ordinal, consulta)
+        self._contar(consulta, ordinal)
+
+    def _insertar(self, ordinal, consulta):
+        if not self.fechas or ordinal >= self.fechas[-1]:
+            # Lo habitual: la consulta nueva es la más reciente
+            self.fechas.append(ordinal)
+            self.consultas.append(consulta)
+        else:
+            posicion = bisect_right(self.fechas, ordinal)
+            self.fechas.insert(posicion, ordinal)
+            self.consultas.insert(posicion, consulta)
+
+    def agregar_varias(self, consultas):
+        """
+        Agrega muchas consultas de una vez (p. ej. al cargar el historial): se
+        ordenan juntas y se intercalan con las existentes en lugar de
+        insertarlas una por una. A igual fecha se conserva el orden de registro.
+        """
+        nuevas = sorted(((consulta.fecha.toordinal(), consulta) for consulta in consultas), key=itemgetter(0))
+        if not nuevas:
+            return
+        for ordinal, consulta in nuevas:
+            self._contar(consulta, ordinal)
+        if not self.fechas or nuevas[0][0] >= self.fechas[-1]:
+            self.fechas.extend(ordinal for ordinal, _ in nuevas)
+            self.consultas.extend(consulta for _, consulta in nuevas)
+        elif len(nuevas) < 64:
+            for ordinal, consulta in nuevas:
+                self._insertar(ordinal, consulta)
+        else:
+            intercaladas = list(merge(zip(self.fechas, self.consultas), nuevas, key=itemgetter(0)))
+            self.fechas = array("i", (ordinal for ordinal, _ in intercaladas))
+            self.consultas = [consulta for _, consulta in intercaladas]
+
+    def _contar(self, consulta, ordinal):
+        mes = (consulta.fecha.year, consulta.fecha.month)
+        especies = self.por_mes.get(mes)
+        if especies is None:
+            especies = self.por_mes[mes] = {}
+        especie = consulta.mascota.especie
+        especies[especie] = especies.get(especie, 0) + 1
+        clave = id(consulta.mascota)
+        ultima = self.ultimas.get(clave)
+        if ultima is None or ordinal >= ultima.fecha.toordinal():
+            self.ultimas[clave] = consulta
+
+    def entre(self, desde, hasta):
+        """
+        Retorna las consultas con fecha en [desde, hasta], ordenadas por fecha.
+        """
+        inicio = bisect_left(self.fechas, desde.toordinal())
+        fin = bisect_right(self.fechas, hasta.toordinal())
+        return self.consultas[inicio:fin]
+
+    def visitas_por_mes(self, desde=None, hasta=None):
+        """
+        Cantidad de visitas por mes y especie en [desde, hasta] (por defecto
+        todo el historial). Los meses completos salen de los contadores; solo
+        se recorren las consultas de los meses en los bordes del rango.
+
+        Retorna:
+            dict: {"AAAA-MM": {especie: cantidad}}, en orden cronológico.
+        """
+        desde = desde.toordinal() if desde is not None else 1
+        hasta = hasta.toordinal() if hasta is not None else date.max.toordinal()
+        resultado = {}
+        for anio, mes in sorted(self.por_mes):
+            primer_dia = date(anio, mes, 1).toordinal()
+            ultimo_dia = primer_dia + monthrange(anio, mes)[1] - 1
+            if primer_dia > hasta or ultimo_dia < desde:
+                continue
+            if desde <= primer_dia and ultimo_dia <= hasta:
+                especies = dict(self.por_mes[(anio, mes)])
+            else:
+                especies = {}
+                for consulta in self.entre(date.fromordinal(max(primer_dia, desde)), date.fromordinal(min(ultimo_dia, hasta))):
+                    especie = consulta.mascota.especie
+                    especies[especie] = especies.get(especie, 0) + 1
+            if especies:
+                resultado[f"{anio:04d}-{mes:02d}"] = especies
+        return resultado
+
+    def ultima_visita(self, mascota):
+        return self.ultimas.get(id(mascota))
+
+    def ultimas_visitas(self):
+        """
+        Retorna:
+            list: La última consulta de cada mascota, de la más reciente a la más antigua.
+        """
+        return sorted(self.ultimas.values(), key=lambda consulta: consulta.fecha.toordinal(), reverse=True)
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+FORMATO_INDICE = 1
+# Palabras demasiado comunes para que sirva buscarlas
+PALABRAS_VACIAS = frozenset("a al con de del el en la las lo los para por se sin su un una y".split())
+OPERADORES_O = ("OR", "O")
+_PATRON_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_texto(texto):
+    """
+    Pasa el texto a minúsculas y le quita las tildes, para que "Vacunación"
+    y "vacunacion" coincidan.
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def palabras(texto):
+    return [p for p in _PATRON_PALABRA.findall(normalizar_texto(texto)) if p not in PALABRAS_VACIAS]
+
+
+class IndiceTexto:
+    """
+    Índice invertido de las palabras de motivo y diagnóstico de las consultas.
+
+    Cada consulta se identifica por su posición en la lista de consultas del
+    sistema, que solo crece al final; para cada palabra se guarda un array con
+    las posiciones de las consultas que la contienen, en orden.
+
+    Atributos:
+        posiciones (dict): {palabra normalizada: array de posiciones}.
+        cantidad (int): Cantidad de consultas indexadas (las posiciones 0..cantidad-1).
+        guardadas (int): Cantidad de consultas que había la última vez que se
+            guardó o cargó de disco.
+    """
+    def __init__(self):
+        self.posiciones = {}
+        self.cantidad = 0
+        self.guardadas = 0
+        self._palabras_por_texto = {}  # Motivos y diagnósticos se repiten mucho
+        self._vocabulario = None
+
+    def _palabras(self, texto):
+        resultado = self._palabras_por_texto.get(texto)
+        if resultado is None:
+            resultado = self._palabras_por_texto[texto] = palabras(texto)
+        return resultado
+
+    def agregar(self, consulta):
+        posicion = self.cantidad
+        for palabra in set(self._palabras(consulta.motivo)).union(self._palabras(consulta.diagnostico)):
+            lista = self.posiciones.get(palabra)
+            if lista is None:
+                lista = self.posiciones[palabra] = array("I")
+                self._vocabulario = None
+            lista.append(posicion)
+        self.cantidad += 1
+
+    def agregar_varias(self, consultas):
+        for consulta in consultas:
+            self.agregar(consulta)
+
+    def _con_prefijo(self, prefijo):
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self.posiciones)
+        i = bisect_left(self._vocabulario, prefijo)
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(prefijo):
+            yield self._vocabulario[i]
+            i += 1
+
+    def _termino(self, termino):
+        """Posiciones que cumplen un término: una palabra, o un prefijo si termina en '*'."""
+        if termino.endswith("*"):
+            prefijos = palabras(termino[:-1])
+            if not prefijos:
+                return None  # Como con las palabras exactas: un prefijo vacío no restringe
+            encontradas = set()
+            for prefijo in prefijos:
+                for palabra in self._con_prefijo(prefijo):
+                    encontradas.update(self.posiciones[palabra])
+            return encontradas
+        conjuntos = [self.posiciones.get(palabra, ()) for palabra in palabras(termino)]
+        if not conjuntos:
+            return None  # Solo palabras vacías: no restringe
+        conjuntos.sort(key=len)
+        encontradas = set(conjuntos[0])
+        for otras in conjuntos[1:]:
+            encontradas.intersection_update(otras)
+        return encontradas
+
+    def buscar(self, consulta):
+        """
+        Busca consultas por palabras. Los términos separados por espacios deben
+        aparecer todos (AND); "OR" (u "O") separa alternativas; un término que
+        termina en '*' busca por prefijo. Ejemplo: "dermatitis alerg* OR otitis".
+
+        Retorna:
+            list: Posiciones de las consultas encontradas, en orden.
+        """
+        grupos = [[]]
+        for termino in consulta.split():
+            if termino in OPERADORES_O:
+                grupos.append([])
+            else:
+                grupos[-1].append(termino)
+        resultado = set()
+        for grupo in grupos:
+            encontradas = None
+            for termino in sorted(grupo, key=lambda t: t.endswith("*")):
+                del_termino = self._termino(termino)
+                if del_termino is None:
+                    continue
+                encontradas = del_termino if encontradas is None else encontradas & del_termino
+                if not encontradas:
+                    break
+            if encontradas:
+                resultado |= encontradas
+        return sorted(resultado)
+
+    def guardar(self, ruta, firma):
+        """
+        Guarda el índice: una línea JSON con el vocabulario y la firma del
+        snapshot de consultas al que corresponde, seguida de las posiciones
+        como enteros de 32 bits. Se escribe en un temporal y se reemplaza.
+        """
+        terminos = sorted(self.posiciones)
+        encabezado = {
+            "version": FORMATO_INDICE,
+            "firma": list(firma) if firma else None,
+            "consultas": self.cantidad,
+            "orden_bytes": sys.byteorder,
+            "terminos": [[palabra, len(self.posiciones[palabra])] for palabra in terminos],
+        }
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(json.dumps(encabezado, ensure_ascii=False).encode("utf-8") + b"\n")
+            for palabra in terminos:
+                self.posiciones[palabra].tofile(f)
+        os.replace(temporal, ruta)
+        self.guardadas = self.cantidad
+
+    @classmethod
+    def cargar(cls, ruta, firma):
+        """
+        Carga el índice guardado en `ruta` si corresponde al snapshot con esa
+        firma. Retorna None si no existe, es de otro snapshot o está dañado.
+        """
+        try:
+            with open(ruta, "rb") as f:
+                encabezado = json.loads(f.readline())
+                if encabezado.get("version") != FORMATO_INDICE or \
+                        encabezado["firma"] != (list(firma) if firma else None):
+                    return None
+                indice = cls()
+                for palabra, cantidad in encabezado["terminos"]:
+                    lista = indice.posiciones[palabra] = array("I")
+                    lista.fromfile(f, cantidad)
+                    if encabezado["orden_bytes"] != sys.byteorder:
+                        lista.byteswap()
+        except (OSError, EOFError, ValueError, KeyError):
+            return None
+        indice.cantidad = indice.guardadas = encabezado["consultas"]
+        return indice
@@ -0,0 +1,179 @@
+"""
+Instrumentación de SistemaVeterinaria: cantidad de llamadas, latencia
+(p50/p95/p99), bytes leídos y escritos por operación, y exportación en el
+formato de texto de Prometheus.
+
+La medición se activa y desactiva en tiempo de ejecución con
+`instrumentacion.activa`; desactivada, cada operación instrumentada solo
+paga una comprobación.
+"""
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ARCHIVO_METRICAS = "metricas_veterinaria.prom"
+CUANTILES = (0.50, 0.95, 0.99)
+
+
+class Instrumentacion:
+    """
+    Métricas por operación. Las latencias se guardan en una ventana con las
+    últimas `muestras` duraciones de cada operación, de la que se calculan
+    los percentiles; las cantidades y sumas son acumuladas desde el inicio.
+
+    Atributos:
+        activa (bool): Si se están registrando mediciones.
+    """
+    def __init__(self, muestras=10000):
+        self.activa = False
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._duraciones = {}
+            self._llamadas = {}
+            self._segundos = {}
+            self._errores = {}
+            self._bytes_leidos = {}
+            self._bytes_escritos = {}
+
+    def registrar(self, operacion, segundos, error=False):
+        with self._lock:
+            if operacion not in self._duraciones:
+                self._duraciones[operacion] = deque(maxlen=self.muestras)
+                self._llamadas[operacion] = 0
+                self._segundos[operacion] = 0.0
+                self._errores[operacion] = 0
+            self._duraciones[operacion].append(segundos)
+            self._llamadas[operacion] += 1
+            self._segundos[operacion] += segundos
+            self._errores[operacion] += error
+
+    def sumar_bytes(self, operacion, leidos=0, escritos=0):
+        if not self.activa:
+            return
+        with self._lock:
+            if leidos:
+                self._bytes_leidos[operacion] = self._bytes_leidos.get(operacion, 0) + leidos
+            if escritos:
+                self._bytes_escritos[operacion] = self._bytes_escritos.get(operacion, 0) + escritos
+
+    @contextmanager
+    def medicion(self, operacion):
+        """Mide el bloque como una llamada a `operacion`."""
+        if not self.activa:
+            yield
+            return
+        inicio = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.registrar(operacion, time.perf_counter() - inicio, error)
+
+    def medir(self, funcion):
+        """Decorador que mide cada llamada a `funcion` con su nombre como operación."""
+        operacion = funcion.__name__.lstrip("_")
+
+        @functools.wraps(funcion)
+        def medida(*args, **kwargs):
+            if not self.activa:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            error = True
+            try:
+                resultado = funcion(*args, **kwargs)
+                error = False
+                return resultado
+            finally:
+                self.registrar(operacion, time.perf_counter() - inicio, error)
+        return medida
+
+    def resumen(self):
+        """
+        Retorna:
+            dict: Por operación, llamadas, errores, tiempo total, percentiles en
+            milisegundos y bytes leídos y escritos.
+        """
+        with self._lock:
+            copia = {operacion: sorted(duraciones) for operacion, duraciones in self._duraciones.items()}
+            llamadas = dict(self._llamadas)
+            segundos = dict(self._segundos)
+            errores = dict(self._errores)
+            leidos = dict(self._bytes_leidos)
+            escritos = dict(self._bytes_escritos)
+        resultado = {}
+        for operacion in sorted(set(copia) | set(leidos) | set(escritos)):
+            duraciones = copia.get(operacion, [])
+            datos = resultado[operacion] = {
+                "llamadas": llamadas.get(operacion, 0),
+                "errores": errores.get(operacion, 0),
+                "total_s": round(segundos.get(operacion, 0.0), 6),
+                "bytes_leidos": leidos.get(operacion, 0),
+                "bytes_escritos": escritos.get(operacion, 0),
+            }
+            for cuantil in CUANTILES:
+                datos[f"p{int(cuantil * 100)}_ms"] = round(percentil(duraciones, cuantil) * 1000, 3) if duraciones else None
+        return resultado
+
+    def formato_prometheus(self, objetos=None):
+        """
+        Las métricas en el formato de texto de Prometheus. `objetos` (dict de
+        tipo -> cantidad) se exporta como el gauge veterinaria_objetos.
+        """
+        with self._lock:
+            copia = {operacion: sorted(duraciones) for operacion, duraciones in self._duraciones.items()}
+            llamadas = dict(self._llamadas)
+            segundos = dict(self._segundos)
+            errores = dict(self._errores)
+            leidos = dict(self._bytes_leidos)
+            escritos = dict(self._bytes_escritos)
+        lineas = [
+            "# HELP veterinaria_operacion_segundos Latencia de las operaciones de SistemaVeterinaria.",
+            "# TYPE veterinaria_operacion_segundos summary",
+        ]
+        for operacion, duraciones in sorted(copia.items()):
+            for cuantil in CUANTILES:
+                lineas.append(f'veterinaria_operacion_segundos{{operacion="{operacion}",quantile="{cuantil}"}} '
+                              f"{percentil(duraciones, cuantil):.6f}")
+            lineas.append(f'veterinaria_operacion_segundos_sum{{operacion="{operacion}"}} {segundos[operacion]:.6f}')
+            lineas.append(f'veterinaria_operacion_segundos_count{{operacion="{operacion}"}} {llamadas[operacion]}')
+        for nombre, ayuda, valores in (
+                ("veterinaria_operacion_errores_total", "Llamadas que terminaron con una excepción.", errores),
+                ("veterinaria_bytes_leidos_total", "Bytes leídos de disco por operación.", leidos),
+                ("veterinaria_bytes_escritos_total", "Bytes escritos en disco por operación.", escritos)):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} counter")
+            for operacion, valor in sorted(valores.items()):
+                lineas.append(f'{nombre}{{operacion="{operacion}"}} {valor}')
+        if objetos:
+            lineas.append("# HELP veterinaria_objetos Objetos en memoria.")
+            lineas.append("# TYPE veterinaria_objetos gauge")
+            for tipo, cantidad in objetos.items():
+                lineas.append(f'veterinaria_objetos{{tipo="{tipo}"}} {cantidad}')
+        return "\n".join(lineas) + "\n"
+
+    def guardar_prometheus(self, ruta=ARCHIVO_METRICAS, objetos=None):
+        """
+        Escribe las métricas en `ruta` reemplazando el archivo de una vez,
+        para que quien lo lea (p. ej. el textfile collector de node_exporter)
+        nunca vea uno a medio escribir.
+        """
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.formato_prometheus(objetos))
+        os.replace(temporal, ruta)
+
+
+def percentil(ordenadas, cuantil):
+    return ordenadas[min(len(ordenadas) - 1, int(cuantil * len(ordenadas)))]
+
+
+# Instancia que usan los métodos instrumentados de SistemaVeterinaria
+instrumentacion = Instrumentacion()
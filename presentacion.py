@@ -0,0 +1,119 @@
+"""
+Salida de los listados largos (mascotas, historias clínicas). El texto de
+cada elemento se formatea una sola vez, cada página se arma con un join y se
+escribe con una sola llamada a write, en lugar de un print por línea.
+"""
+import sys
+
+from cola_incremental import ColaIncremental
+
+TAMANO_PAGINA = 20
+OPCIONES_SALIR = ("q", "s")
+
+
+class Listado:
+    """
+    Texto de los elementos de una lista, dividido en páginas.
+
+    Se actualiza con una ColaIncremental, como los índices por nombre de
+    SistemaVeterinaria: si a la lista solo se le agregaron elementos al final,
+    se formatean solo esos y se descartan solo las páginas que cambian; si fue
+    reemplazada o se acortó, se rehace todo.
+
+    Atributos:
+        formato (callable): Convierte un elemento en su texto, con el salto de línea final.
+        textos (list): Texto ya formateado de cada elemento, en orden.
+    """
+    def __init__(self, formato):
+        self.formato = formato
+        self.textos = []
+        self._cola = ColaIncremental()
+        self._paginas = {}  # (tamaño o None para todo el listado, número) -> texto
+
+    def __len__(self):
+        return len(self.textos)
+
+    def actualizar(self, elementos):
+        """
+        Pone el listado al día con `elementos` y lo retorna.
+        """
+        if self._cola.reemplazada(elementos):
+            self.textos = []
+            self._paginas = {}
+        anteriores = len(self.textos)
+        self.textos.extend(map(self.formato, self._cola.nuevos(elementos)))
+        if anteriores < len(self.textos):
+            # Las páginas que ya estaban completas no cambian
+            self._paginas = {(tamano, numero): texto for (tamano, numero), texto in self._paginas.items()
+                             if tamano is not None and numero * tamano <= anteriores}
+        return self
+
+    def cantidad_paginas(self, tamano):
+        return max(1, -(-len(self.textos) // tamano))
+
+    def pagina(self, numero=1, tamano=None):
+        """
+        Texto de la página `numero` (desde 1) con `tamano` elementos por
+        página; sin tamaño, el listado completo. Lanza ValueError si la
+        página no existe.
+        """
+        if tamano is not None and not 1 <= numero <= self.cantidad_paginas(tamano):
+            raise ValueError(f"La página {numero} no existe: hay {self.cantidad_paginas(tamano)} "
+                             f"de {tamano} elementos")
+        clave = (tamano, numero if tamano is not None else 1)
+        texto = self._paginas.get(clave)
+        if texto is None:
+            if tamano is None:
+                texto = "".join(self.textos)
+            else:
+                inicio = (numero - 1) * tamano
+                texto = "".join(self.textos[inicio:inicio + tamano])
+            self._paginas[clave] = texto
+        return texto
+
+
+def escribir_listado(listado, salida=None, tamano=None, pagina=None):
+    """
+    Escribe el listado en `salida` (por defecto sys.stdout) con una sola
+    llamada a write por página.
+
+    Con `pagina` se escribe solo esa página. Con `tamano` y una terminal
+    interactiva se muestra página por página y entre una y otra se pregunta
+    cómo seguir; en un archivo o una tubería se escribe todo de una vez.
+    Lanza ValueError si la página no existe o el tamaño es menor que 1.
+    """
+    if tamano is not None and tamano < 1:
+        raise ValueError(f"El tamaño de página debe ser al menos 1, no {tamano}")
+    salida = sys.stdout if salida is None else salida
+    if pagina is not None:
+        tamano = tamano or TAMANO_PAGINA
+        salida.write(listado.pagina(pagina, tamano))
+    elif tamano is None or len(listado) <= tamano or not _es_terminal(salida):
+        salida.write(listado.pagina())
+    else:
+        _paginar(listado, salida, tamano)
+    salida.flush()
+
+
+def _es_terminal(salida):
+    try:
+        return salida.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _paginar(listado, salida, tamano):
+    total = listado.cantidad_paginas(tamano)
+    numero = 1
+    while True:
+        salida.write(listado.pagina(numero, tamano))
+        salida.flush()
+        respuesta = input(f"Página {numero} de {total}. Enter: siguiente, número: ir a esa página, q: salir > ").strip().lower()
+        if respuesta in OPCIONES_SALIR:
+            return
+        if respuesta.isdigit():
+            numero = min(max(int(respuesta), 1), total)
+        elif numero == total:
+            return
+        else:
+            numero += 1
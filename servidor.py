@@ -0,0 +1,248 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+from sprint7 import SistemaVeterinaria, configurar_logging, detener_logging, NIVELES_LOG, DURABILIDADES, INTERVALO_ESCRITURA, INTERVALO_RECARGA
+
+logger = logging.getLogger(__name__)
+
+OTRAS_RUTAS = "otras"  # Clave de las métricas para cualquier ruta desconocida
+
+
+class MetricasLatencia:
+    """
+    Latencia de las peticiones por ruta: cantidad, errores y percentiles sobre
+    las últimas `muestras` duraciones de cada ruta.
+    """
+    def __init__(self, muestras=10000):
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self._duraciones = {}
+        self._cantidad = {}
+        self._errores = {}
+
+    def registrar(self, ruta, segundos, error=False):
+        with self._lock:
+            if ruta not in self._duraciones:
+                self._duraciones[ruta] = deque(maxlen=self.muestras)
+                self._cantidad[ruta] = 0
+                self._errores[ruta] = 0
+            self._duraciones[ruta].append(segundos)
+            self._cantidad[ruta] += 1
+            self._errores[ruta] += error
+
+    def resumen(self):
+        with self._lock:
+            copia = {ruta: sorted(duraciones) for ruta, duraciones in self._duraciones.items()}
+            cantidad = dict(self._cantidad)
+            errores = dict(self._errores)
+        resultado = {}
+        for ruta, duraciones in copia.items():
+            def percentil(p):
+                return round(duraciones[min(len(duraciones) - 1, int(p * len(duraciones)))] * 1000, 3)
+            resultado[ruta] = {
+                "peticiones": cantidad[ruta],
+                "errores": errores[ruta],
+                "promedio_ms": round(sum(duraciones) / len(duraciones) * 1000, 3),
+                "p50_ms": percentil(0.50),
+                "p95_ms": percentil(0.95),
+                "p99_ms": percentil(0.99),
+            }
+        return resultado
+
+
+class ManejadorVeterinaria(BaseHTTPRequestHandler):
+    """
+    Atiende la API JSON. Rutas:
+
+        GET  /mascotas                         lista de mascotas
+        POST /mascotas                         registra una mascota (y su dueño si es nuevo)
+        POST /consultas                        registra una consulta
+        GET  /mascotas/<nombre>/historia       historia clínica de la mascota
+        GET  /metricas                         latencia de las peticiones por ruta
+
+    Usa HTTP/1.1, así que el cliente puede reutilizar la conexión: el cuerpo
+    de cada petición se lee completo antes de responder, aunque la ruta no
+    exista, para que no se confunda con la petición siguiente.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        logger.debug("HTTP %s - " + formato, self.address_string(), *args)
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def _atender(self, metodo):
+        inicio = time.perf_counter()
+        partes = [unquote(p) for p in urlsplit(self.path).path.strip("/").split("/")]
+        ruta = self._nombre_ruta(metodo, partes)
+        try:
+            self._cuerpo = self._leer_cuerpo()
+            estado, cuerpo = self._despachar(metodo, partes)
+        except ValueError as e:
+            estado, cuerpo = 400, {"error": str(e)}
+        except Exception as e:
+            logger.error("Error en la petición %s %s: %s", metodo, self.path, e)
+            estado, cuerpo = 500, {"error": "error interno"}
+        self._responder(estado, cuerpo)
+        self.server.metricas.registrar(ruta, time.perf_counter() - inicio, estado >= 400)
+
+    @staticmethod
+    def _nombre_ruta(metodo, partes):
+        """Nombre de la ruta en las métricas: uno por ruta de la API y OTRAS_RUTAS para el resto."""
+        if partes == ["mascotas"] and metodo in ("GET", "POST"):
+            return f"{metodo} /mascotas"
+        if metodo == "POST" and partes == ["consultas"]:
+            return "POST /consultas"
+        if metodo == "GET" and len(partes) == 3 and partes[0] == "mascotas" and partes[2] == "historia":
+            return "GET /mascotas/<nombre>/historia"
+        if metodo == "GET" and partes == ["metricas"]:
+            return "GET /metricas"
+        return OTRAS_RUTAS
+
+    def _leer_cuerpo(self):
+        """
+        Lee el cuerpo de la petición según Content-Length. Si no se puede saber
+        dónde termina, se cierra la conexión después de responder.
+        """
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            if longitud < 0:
+                raise ValueError(longitud)
+        except ValueError:
+            self.close_connection = True
+            raise ValueError("Content-Length inválido")
+        return self.rfile.read(longitud)
+
+    def _despachar(self, metodo, partes):
+        servicio = self.server
+        if metodo == "GET" and partes == ["mascotas"]:
+            with servicio.lock:
+                mascotas = [m.diccionarioMascotas() for m in servicio.sistema.iterar_mascotas()]
+            return 200, mascotas
+        if metodo == "GET" and len(partes) == 3 and partes[0] == "mascotas" and partes[2] == "historia":
+            with servicio.lock:
+                consultas = [c.diccionario_Consulta() for c in servicio.sistema.consultas_de_mascota(partes[1])]
+            if not consultas:
+                return 404, {"error": f"No hay consultas registradas para {partes[1]}"}
+            return 200, consultas
+        if metodo == "GET" and partes == ["metricas"]:
+            return 200, servicio.metricas.resumen()
+        if metodo == "POST" and partes in (["mascotas"], ["consultas"]):
+            datos = self._leer_json()
+            with servicio.lock:
+                if partes == ["mascotas"]:
+                    resumen = servicio.sistema.importar_registros(mascotas=[datos])
+                else:
+                    resumen = servicio.sistema.importar_registros(consultas=[datos])
+            if resumen["errores"]:
+                return 400, {"error": resumen["errores"][0]}
+            return 201, datos
+        return 404, {"error": "Ruta no encontrada"}
+
+    def _leer_json(self):
+        try:
+            datos = json.loads(self._cuerpo or b"null")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}")
+        if not isinstance(datos, dict):
+            raise ValueError("Se esperaba un objeto JSON")
+        return datos
+
+    def _responder(self, estado, cuerpo):
+        contenido = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(contenido)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(contenido)
+
+
+class ServidorVeterinaria(ThreadingHTTPServer):
+    """
+    Servidor HTTP con un hilo por conexión sobre un único SistemaVeterinaria.
+    Un lock serializa el acceso al sistema, porque sus listas, índices y
+    archivos no admiten modificaciones concurrentes.
+
+    Atributos:
+        sistema (SistemaVeterinaria): Motor compartido por todas las conexiones.
+        metricas (MetricasLatencia): Latencia de las peticiones por ruta.
+    """
+    daemon_threads = True
+
+    def __init__(self, direccion, sistema):
+        super().__init__(direccion, ManejadorVeterinaria)
+        self.sistema = sistema
+        self.lock = threading.Lock()
+        self.metricas = MetricasLatencia()
+
+    def service_actions(self):
+        # Entre peticiones: escribir los registros que ya esperaron su intervalo en el buffer
+        # e incorporar lo que otros procesos agregaron a los archivos
+        with self.lock:
+            self.sistema.escribir_pendientes(vencidas=True)
+            self.sistema.recargar_cambios(vencida=True)
+
+    def server_close(self):
+        super().server_close()
+        with self.lock:
+            self.sistema.cerrar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de la veterinaria Amigos Peludos")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--sqlite", metavar="RUTA", help="usar una base de datos SQLite en lugar de mascotas.csv/consultas.json")
+    parser.add_argument("--carga-diferida", action="store_true", help="leer cada historia clínica solo cuando se consulta")
+    parser.add_argument("--sucursales", nargs="+", metavar="DIRECTORIO", help="atender los datos de varias sucursales, uno por directorio")
+    parser.add_argument("--sucursal", metavar="DIRECTORIO", help="sucursal donde se registran los datos nuevos (por defecto la primera)")
+    parser.add_argument("--lote-escritura", type=int, default=1, metavar="N", help="escribir los registros nuevos en lotes de N")
+    parser.add_argument("--intervalo-escritura", type=float, default=INTERVALO_ESCRITURA, metavar="SEGUNDOS",
+                        help="tiempo máximo que un registro espera su lote")
+    parser.add_argument("--durabilidad", choices=DURABILIDADES, default="flush", help="qué se garantiza de cada lote escrito")
+    parser.add_argument("--intervalo-recarga", type=float, default=INTERVALO_RECARGA, metavar="SEGUNDOS",
+                        help="cada cuánto incorporar lo que otros procesos agregan a los archivos")
+    parser.add_argument("--nivel-log", choices=NIVELES_LOG, help="nivel mínimo del log (por defecto INFO o VETERINARIA_LOG_NIVEL)")
+    args = parser.parse_args(argv)
+
+    configurar_logging(nivel=args.nivel_log)
+
+    opciones = dict(carga_diferida=args.carga_diferida, lote_escritura=args.lote_escritura,
+                    intervalo_escritura=args.intervalo_escritura, durabilidad=args.durabilidad,
+                    intervalo_recarga=args.intervalo_recarga)
+    repositorio = None
+    if args.sqlite:
+        from almacenamiento_sqlite import RepositorioSQLite
+        repositorio = RepositorioSQLite(args.sqlite)
+    elif args.sucursales:
+        from sucursales import RepositorioSucursales
+        # Las sucursales escriben y recargan en sus procesos trabajadores
+        repositorio = RepositorioSucursales(args.sucursales, args.sucursal, **opciones)
+    sistema = SistemaVeterinaria(repositorio=repositorio, **opciones)
+    servidor = ServidorVeterinaria((args.host, args.puerto), sistema)
+    logger.info("Servicio HTTP escuchando en %s:%s", args.host, args.puerto)
+    print(f"Escuchando en http://{args.host}:{args.puerto} (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        logger.info("Servicio HTTP detenido")
+        detener_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,255 @@
-from datetime import datetime
+from datetime import datetime, date
 import json
 import csv
 import logging
+import logging.handlers
+import queue
+import atexit
+import sys
+import os
+import itertools
+import argparse
+import re
+import mmap
+import io
+import gc
+import shutil
+import time
+from contextlib import contextmanager, nullcontext
+from array import array
 
-logging.basicConfig(
-    filename="clinica_veterinaria.log", 
-    encoding='utf-8', 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO)
+from metricas import instrumentacion, ARCHIVO_METRICAS
+from indice_fechas import IndiceFechas
+from indice_texto import IndiceTexto
+from estado_binario import crc_archivo, escribir_estado, leer_estado
+from presentacion import Listado, escribir_listado, TAMANO_PAGINA
+from cola_incremental import ColaIncremental
+
+try:
+    import fcntl
+except ImportError:  # Windows: no hay bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_LOG = "clinica_veterinaria.log"
+FORMATO_LOG = "%(asctime)s - %(levelname)s - %(message)s"
+NIVELES_LOG = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+_oyente_logging = None
+
+
+class _ManejadorCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea el registro al encolarlo: el mensaje con sus
+    argumentos (%-style) se arma en el hilo que escribe el archivo. Los
+    argumentos que se pasan a los logs son valores que no cambian después.
+    """
+    def prepare(self, record):
+        return record
+
+
+def configurar_logging(archivo=ARCHIVO_LOG, nivel=None, max_bytes=5 * 2**20, copias=5, cuando=None):
+    """
+    Configura el log de la aplicación: los registros se encolan sin bloquear
+    y un hilo en segundo plano (QueueListener) los escribe en `archivo`.
+
+    Parámetros:
+        archivo (str): Archivo de log.
+        nivel (str | int): Nivel mínimo; por defecto la variable de entorno
+            VETERINARIA_LOG_NIVEL o INFO.
+        max_bytes (int): Tamaño a partir del cual se rota el archivo.
+        copias (int): Cantidad de archivos rotados que se conservan.
+        cuando (str): Si se indica (p. ej. "midnight"), se rota por tiempo en
+            lugar de por tamaño, con los valores de TimedRotatingFileHandler.
+
+    Retorna:
+        QueueListener: El hilo escritor, ya iniciado.
+    """
+    global _oyente_logging
+    detener_logging()
+    if nivel is None:
+        nivel = os.environ.get("VETERINARIA_LOG_NIVEL", "INFO")
+    if isinstance(nivel, str):
+        nivel = nivel.upper()
+    if cuando:
+        manejador = logging.handlers.TimedRotatingFileHandler(archivo, when=cuando, backupCount=copias, encoding="utf-8")
+    else:
+        manejador = logging.handlers.RotatingFileHandler(archivo, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+    manejador.setFormatter(logging.Formatter(FORMATO_LOG))
+
+    cola = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    raiz.addHandler(_ManejadorCola(cola))
+    _oyente_logging = logging.handlers.QueueListener(cola, manejador)
+    _oyente_logging.start()
+    atexit.unregister(detener_logging)  # Una sola vez aunque se reconfigure
+    atexit.register(detener_logging)
+    return _oyente_logging
+
+
+def detener_logging():
+    """
+    Escribe lo que quede en la cola, detiene el hilo escritor y cierra el archivo.
+    """
+    global _oyente_logging
+    if _oyente_logging is None:
+        return
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        if isinstance(manejador, _ManejadorCola):
+            raiz.removeHandler(manejador)
+    _oyente_logging.stop()
+    for manejador in _oyente_logging.handlers:
+        manejador.close()
+    _oyente_logging = None
+
+ARCHIVO_CONSULTAS = "consultas.json"
+ARCHIVO_MASCOTAS = "mascotas.csv"  # Con encabezado: ver CAMPOS_MASCOTAS
+ARCHIVO_PROPIETARIOS = "propietarios.csv"  # id, nombre, telefono, direccion; cada cambio agrega una fila
+ARCHIVO_BLOQUEO = ".veterinaria.lock"  # Coordina a varios procesos que comparten el directorio de datos
+FORMATO_CONSULTAS = 2  # 1: lista con mascota y propietario embebidos; 2: entidades con id referenciadas
+UMBRAL_COMPACTACION = 1000  # Entradas del journal antes de reescribir consultas.json
+TAMANO_BUFFER = 1 << 20  # Buffer de escritura para importaciones masivas
+ARCHIVO_ESTADO = "veterinaria.estado"  # Snapshot binario de todo el estado, para iniciar sin analizar CSV/JSON
+INTERVALO_ESTADO = 600  # Segundos entre snapshots binarios mientras se registran datos
+INTERVALO_ESCRITURA = 1.0  # Segundos que puede esperar un registro en el buffer de escritura
+INTERVALO_RECARGA = 2.0  # Segundos entre revisiones de lo que otros procesos agregaron (servidor)
+DURABILIDADES = ("flush", "fsync")
+_NULO = -1  # Valor ausente en las secciones del snapshot binario
+LISTADOS_EN_CACHE = 256  # Listados (lista de mascotas, historias clínicas) con el texto ya formateado
+
+# Encabezado de mascotas.csv; sin él, el archivo es de una versión anterior y se migra
+CAMPOS_MASCOTAS = ["id", "nombre", "especie", "raza", "edad", "propietario_id"]
+# Formato anterior de mascotas.csv, con los datos del propietario en cada fila; se sigue aceptando al importar
+CAMPOS_MASCOTA_CSV = ["nombre", "especie", "raza", "edad", "propietario", "telefono", "direccion"]
+
+_PATRON_MASCOTA_ID = re.compile(rb'"mascota_id": (\d+)')
+_PATRON_CONSULTA = re.compile(rb'^\{[^\n]*"mascota_id": (\d+)\}', re.MULTILINE)
+_BITS_DESPLAZAMIENTO = 48  # Ubicación de una consulta diferida: (archivo << 48) | byte de inicio
+
+def clave_busqueda(texto):
+    """Normaliza un nombre para compararlo sin distinguir mayúsculas/minúsculas."""
+    return texto.casefold()
+
+_fechas = {}  # Fechas internadas: todas las consultas de un mismo día comparten el objeto date
+_fechas_texto = {}  # "dd-mm-aaaa" -> date
+
+def fecha_compacta(fecha):
+    """Convierte un date o datetime al objeto date compartido de ese día."""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    return _fechas.setdefault(fecha, fecha)
+
+def fecha_desde_texto(texto):
+    """Convierte "dd-mm-aaaa" a date; cada texto distinto se analiza una sola vez."""
+    fecha = _fechas_texto.get(texto)
+    if fecha is None:
+        fecha = _fechas_texto[texto] = fecha_compacta(datetime.strptime(texto, "%d-%m-%Y"))
+    return fecha
+
+# Campos que se reconocen en el encabezado de un CSV, por tipo de registro
+CAMPOS_IMPORTACION = {
+    "propietarios": ["id", "nombre", "telefono", "direccion"],
+    "mascotas": CAMPOS_MASCOTAS + CAMPOS_MASCOTA_CSV,
+    "consultas": ["fecha", "motivo", "diagnostico", "mascota", "propietario"],
+}
+
+# Columnas de un CSV sin encabezado según su tipo y su cantidad: propietarios.csv, mascotas.csv
+# de la versión anterior (con el id del propietario) y el formato con los datos del propietario
+_CAMPOS_SIN_ENCABEZADO = {
+    "propietarios": {4: ["id", "nombre", "telefono", "direccion"]},
+    "mascotas": {5: CAMPOS_MASCOTAS[1:], 7: CAMPOS_MASCOTA_CSV},
+    "consultas": {},
+}
+
+def leer_registros(ruta, tipo=None):
+    """
+    Lee registros (diccionarios) de un archivo para importarlos: .csv con
+    encabezado, .jsonl con un objeto por línea o .json con una lista. La
+    primera fila de un CSV es su encabezado si tiene algún campo conocido del
+    tipo de registro ("propietarios", "mascotas" o "consultas"; sin tipo, de
+    cualquiera). Un CSV sin encabezado se reconoce por su cantidad de columnas
+    (ver _CAMPOS_SIN_ENCABEZADO). Si las mascotas tienen el id del propietario
+    en lugar de su nombre, como el mascotas.csv del sistema, los propietarios
+    se buscan en el propietarios.csv del mismo directorio.
+
+    El formato se revisa al llamarla, antes de leer los registros: lanza
+    ValueError si no se reconoce.
+    """
+    if ruta.endswith(".csv"):
+        with open(ruta, newline="", encoding="utf-8") as f:
+            primera = next(csv.reader(f), None)
+        if primera is None:
+            return iter(())
+        tipos = [tipo] if tipo else list(CAMPOS_IMPORTACION)
+        encabezado = any(set(CAMPOS_IMPORTACION[t]).intersection(primera) for t in tipos)
+        campos = primera if encabezado else next(
+            (_CAMPOS_SIN_ENCABEZADO[t][len(primera)] for t in tipos if len(primera) in _CAMPOS_SIN_ENCABEZADO[t]), None)
+        if campos is None:
+            raise ValueError(f"{ruta}: CSV sin encabezado y con {len(primera)} columnas, no se reconoce su formato")
+        propietarios = None
+        if "propietario_id" in campos and "propietario" not in campos:
+            propietarios = _propietarios_por_id(os.path.join(os.path.dirname(ruta), ARCHIVO_PROPIETARIOS))
+        return _leer_registros_csv(ruta, campos, encabezado, propietarios)
+    return _leer_registros_json(ruta)
+
+def _propietarios_por_id(ruta):
+    """Datos de cada propietario de un propietarios.csv, por id (la última fila de cada uno)."""
+    try:
+        with open(ruta, newline="", encoding="utf-8") as f:
+            return {fila[0]: {"propietario": fila[1], "telefono": fila[2], "direccion": fila[3]}
+                    for fila in csv.reader(f) if len(fila) == 4}
+    except FileNotFoundError:
+        raise ValueError(f"Las mascotas tienen el id de su propietario, pero no se encontró {ruta}") from None
+
+def _leer_registros_csv(ruta, campos, encabezado, propietarios):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        if encabezado:
+            next(reader)
+        for fila in reader:
+            registro = dict(zip(campos, fila))
+            if propietarios is not None:
+                registro.update(propietarios.get(registro.pop("propietario_id"), {}))
+            yield registro
+
+def _leer_registros_json(ruta):
+    if ruta.endswith(".jsonl"):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+    else:
+        with open(ruta, encoding="utf-8") as f:
+            yield from json.load(f)
+
+def entero_positivo(texto):
+    """Tipo de argparse para números de página y tamaños: enteros desde 1."""
+    numero = int(texto)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"debe ser un entero mayor o igual a 1: {texto}")
+    return numero
+
+def texto_mascota(mascota):
+    """Texto de una mascota en la lista de mascotas, con su separador."""
+    return f"{mascota}\n{'-' * 30}\n"
+
+def texto_consulta(consulta):
+    """Texto de una consulta en la historia clínica."""
+    return f"{consulta}\n"
 
 class Titulos:
     @staticmethod
-    def imprimir_titulo(texto):
-        print("\n" + "=" * 60)
-        print(f"{texto.center(60)}")
-        print("=" * 60 + "\n")
+    def imprimir_titulo(texto, archivo=None):
+        print("\n" + "=" * 60, file=archivo)
+        print(f"{texto.center(60)}", file=archivo)
+        print("=" * 60 + "\n", file=archivo)
         
 class Mensajes:
     @staticmethod
-    def imprimir_mensaje(texto):
-        print("\n * " + texto)
+    def imprimir_mensaje(texto, archivo=None):
+        print("\n * " + texto, file=archivo)
 
 class Mascota:
     """
@@ -31,13 +261,18 @@ class Mascota:
         raza (str): Raza de la mascota.
         edad (int): Edad de la mascota en años.
         dueno (Dueno): Objeto que representa al dueño de la mascota.
+        id (int): Identificador estable, asignado por el sistema al persistirla.
     """
-    def __init__(self, nombre, especie, raza, edad, propietario):  #Se crea la clase, se usa el metodo constructor init para inicializarla
+    # __weakref__: los mapas de identidad de RepositorioSQLite no las mantienen vivas
+    __slots__ = ("nombre", "especie", "raza", "edad", "propietario", "id", "__weakref__")
+
+    def __init__(self, nombre, especie, raza, edad, propietario, id=None):  #Se crea la clase, se usa el metodo constructor init para inicializarla
         self.nombre = nombre
         self.especie = especie
         self.raza = raza
         self.edad = edad
         self.propietario = propietario
+        self.id = id
         
     def __str__(self):
         propietario_nombre = self.propietario.nombre if self.propietario else "Sin propietario"
@@ -57,6 +292,15 @@ class Mascota:
                 "propietario": self.propietario.diccionarioPropietario()
                 }
 
+    def diccionario_normalizado(self):
+        return {"id": self.id,
+                "nombre": self.nombre,
+                "especie": self.especie,
+                "raza": self.raza,
+                "edad": self.edad,
+                "propietario_id": self.propietario.id if self.propietario else None
+                }
+
     @staticmethod
     def from_dict(data):
         propietario = Propietario.from_dict(data["propietario"])
@@ -71,11 +315,15 @@ class Propietario:
         nombre (str): Nombre del dueño.
         telefono (str): Teléfono de contacto.
         direccion (str): Dirección de residencia.
+        id (int): Identificador estable, asignado por el sistema al persistirlo.
     """
-    def __init__(self, nombre, telefono, direccion):
+    __slots__ = ("nombre", "telefono", "direccion", "id", "__weakref__")
+
+    def __init__(self, nombre, telefono, direccion, id=None):
         self.nombre = nombre
         self.telefono = telefono
-        self.direccion = direccion      
+        self.direccion = direccion
+        self.id = id
 
     def __str__(self):
         return (
@@ -90,6 +338,14 @@ class Propietario:
             "telefono": self.telefono,
             "direccion": self.direccion
         }
+
+    def diccionario_normalizado(self):
+        return {
+            "id": self.id,
+            "nombre": self.nombre,
+            "telefono": self.telefono,
+            "direccion": self.direccion
+        }
     
     @staticmethod
     def from_dict(data):
@@ -100,15 +356,18 @@ class Consulta:
     Registro de una consulta médica para una mascota.
 
     Atributos:
-        fecha (str): Fecha de la consulta.
+        fecha (date): Fecha de la consulta; un datetime se reduce a su fecha.
         motivo (str): Motivo de la visita.
         diagnostico (str): Diagnóstico emitido.
         mascota (Mascota): Mascota asociada a la consulta.
     """
+    __slots__ = ("fecha", "motivo", "diagnostico", "mascota")
+
     def __init__(self, fecha, motivo, diagnostico, mascota):
-        self.fecha = fecha
-        self.motivo = motivo
-        self.diagnostico = diagnostico
+        self.fecha = fecha_compacta(fecha)
+        # Motivos y diagnósticos se repiten mucho: se comparte una sola copia de cada texto
+        self.motivo = sys.intern(motivo) if type(motivo) is str else motivo
+        self.diagnostico = sys.intern(diagnostico) if type(diagnostico) is str else diagnostico
         self.mascota = mascota  #Se usa para llamar la clase Mascota
         
     def __str__(self):
@@ -126,24 +385,134 @@ class Consulta:
             "diagnostico": self.diagnostico,
             "mascota": self.mascota.diccionarioMascotas()
         }
+
+    def diccionario_normalizado(self):
+        return {
+            "fecha": self.fecha.strftime("%d-%m-%Y"),
+            "motivo": self.motivo,
+            "diagnostico": self.diagnostico,
+            "mascota_id": self.mascota.id
+        }
         
     @staticmethod
     def from_dict(data):
         mascota = Mascota.from_dict(data["mascota"])
-        fecha = datetime.strptime(data["fecha"], "%d-%m-%Y")
-        return Consulta(fecha, data["motivo"], data["diagnostico"], mascota)
+        return Consulta(fecha_desde_texto(data["fecha"]), data["motivo"], data["diagnostico"], mascota)
         
 class SistemaVeterinaria:
     """
     Sistema principal para gestionar el funcionamiento de la veterinaria:
     registro de mascotas, dueños y consultas.
+
+    Por defecto los datos viven en listas en memoria respaldadas por
+    propietarios.csv, mascotas.csv y consultas.json. Con un repositorio (p. ej. RepositorioSQLite) no se carga
+    nada al iniciar: las búsquedas y registros se delegan al repositorio, que
+    debe ofrecer buscar_propietario, buscar_mascota, consultas_de_mascota,
+    agregar_propietario, actualizar_propietario, agregar_mascota,
+    agregar_consulta y mascotas.
+
+    Con carga_diferida=True las consultas no se cargan al iniciar: solo se
+    registra dónde está cada consulta de cada mascota en consultas.json y su
+    journal, y se leen cuando se pide la historia clínica de esa mascota.
+
+    Los archivos de datos se buscan en `directorio`, o en el directorio actual
+    si no se indica (p. ej. uno por sucursal, ver sucursales.py).
+
+    Las mascotas y consultas nuevas pasan por un buffer de escritura y se
+    escriben en lotes: cuando se juntan `lote_escritura` registros, cuando el
+    más antiguo lleva `intervalo_escritura` segundos esperando (se revisa al
+    registrar; el servidor lo revisa también entre peticiones, al menos cada
+    medio segundo) y al cerrar. El menú de main() escribe el buffer antes de
+    cada pregunta, así que ningún registro espera a que el usuario responda.
+    Con el lote por defecto, 1, cada registro se escribe en el momento. La
+    `durabilidad` indica qué se garantiza de cada registro:
+
+        "flush": cada lote se entrega al sistema operativo al escribirlo;
+            sobrevive a una caída del programa pero no a un corte de energía.
+        "fsync": además se espera a que cada lote esté en el disco.
+
+    No hay una durabilidad que deje los lotes en el buffer del archivo: cada
+    lote se escribe con el bloqueo tomado y otros procesos leen los archivos
+    apenas se suelta, para incorporar los registros y no repetir sus ids. Con
+    cualquiera, si el programa se interrumpe se pierden los registros que
+    todavía esperaban en el buffer de escritura.
+
+    Lo que otros procesos agregan a los archivos se incorpora al escribir y
+    con recargar_cambios(); con `intervalo_recarga`, también al consultar si
+    pasaron esos segundos desde la última revisión.
     """
-    def __init__(self):        
+    def __init__(self, journal=True, repositorio=None, carga_diferida=False, directorio=None,
+                 lote_escritura=1, intervalo_escritura=INTERVALO_ESCRITURA, durabilidad="flush",
+                 intervalo_recarga=None):
+        if durabilidad not in DURABILIDADES:
+            raise ValueError(f"Durabilidad desconocida: {durabilidad} (opciones: {', '.join(DURABILIDADES)})")
+        self.repositorio = repositorio
+        self.directorio = os.path.abspath(directorio) if directorio is not None else None
+        self.lote_escritura = lote_escritura
+        self.intervalo_escritura = intervalo_escritura
+        self.durabilidad = durabilidad
+        self.intervalo_recarga = intervalo_recarga
+        self.journal = journal  # Con journal, cada consulta nueva se agrega al final de consultas.jsonl
+        self._archivo_bloqueo = None
+        self._profundidad_bloqueo = 0
+        self._ultimo_estado = time.monotonic()
+        self._ultima_recarga = time.monotonic()
+        # Buffer de escritura: registros que están en memoria pero aún no en los archivos
+        self._mascotas_pendientes = []
+        self._consultas_pendientes = []
+        self._inicio_pendientes = None
+        self._reiniciar_estado()
+        if repositorio is not None:
+            return
+        self._cargar_archivos(carga_diferida)
+
+    def _reiniciar_estado(self):
+        """Estado en memoria de un sistema que todavía no leyó ningún archivo."""
         self.mascotas= []
         self.propietarios= []
         self.consultas = []
-        self.cargar_json()  # Cargar las consultas al iniciar
-        self._cargar_mascotas_duenos_csv()
+        self._entradas_journal = 0
+        self._snapshot_danado = False  # No se pudo leer ni apartar: no se compacta encima
+        # Índices por nombre normalizado, por fecha y por palabras: clave -> (índice, ColaIncremental de la lista indexada)
+        self._indices = {}
+        # Texto ya formateado de los listados: clave -> Listado, del menos al más recientemente usado
+        self._listados = {}
+        # Mapas de identidad: cada propietario/mascota existe una sola vez en memoria
+        self._por_id = {"propietario": {}, "mascota": {}}
+        self._siguiente_id = {"propietario": 1, "mascota": 1}
+        self._persistidos = {"propietario": set(), "mascota": set()}  # ids ya escritos en consultas.json/.jsonl
+        self._mascotas_historicas = {}  # (nombre, id(propietario)) -> mascota que solo aparece en consultas
+        self._formato_antiguo = False
+        # Con carga diferida: id de mascota -> array [ubicación, longitud, ...] de sus consultas en disco
+        self._ubicaciones = None
+        self._ids_por_nombre = {}
+        self._rutas_diferidas = ()
+        # Hasta dónde se leyó cada archivo, para incorporar lo que agreguen otros procesos
+        self._fin_csv = 0
+        self._fin_propietarios = 0
+        self._propietarios_en_csv = set()  # ids de los propietarios ya escritos en propietarios.csv
+        self._csv_antiguo = False  # mascotas.csv sin encabezado o con filas sin id de la mascota
+        self._fin_journal = 0
+        self._firma_snapshot = None
+        self._versiones = {}  # archivo -> (inodo, mtime) al terminar de leerlo o escribirlo
+
+    def _cargar_archivos(self, carga_diferida=False):
+        with self.bloqueo(sincronizar=False):
+            if not carga_diferida and self._cargar_estado_binario():
+                # Lo que se agregó a los archivos después del snapshot binario
+                self._incorporar_cambios_externos()
+                self._csv_antiguo = self._csv_antiguo or not self._mascotas_csv_con_encabezado()
+            else:
+                self._cargar_mascotas_duenos_csv()
+                if carga_diferida:
+                    self._indexar_consultas()
+                else:
+                    self.cargar_json()  # Cargar las consultas al iniciar, enlazadas a las mascotas del CSV
+                if self._formato_antiguo:
+                    logger.info("Migrando consultas al formato normalizado")
+                    self.compactar_consultas()
+            if self._csv_antiguo:
+                self._migrar_mascotas_csv()
 
     def registrar_propietario(self):
         """
@@ -157,11 +526,29 @@ class SistemaVeterinaria:
         telefono= input("Teléfono del dueño: ")
         direccion= input("Dirección del dueño: ")
         propietario = Propietario(nombre, telefono, direccion)
-        self.propietarios.append(propietario)
+        self.guardar_propietario(propietario)
         print("Dueño registrado")
-        logging.info(f"Se registró al dueño: {nombre}")
+        logger.info("Se registró al dueño: %s", nombre)
         return propietario
 
+    def actualizar_datos_propietario(self):
+        """
+        Solicita por consola el teléfono y la dirección nuevos de un dueño registrado.
+        """
+        Titulos.imprimir_titulo("Actualizar propietario")
+        nombre = input("Nombre del dueño: ").strip()
+        propietario = self.buscar_propietario(nombre)
+        if not propietario:
+            Mensajes.imprimir_mensaje("El dueño no está registrado.")
+            logger.info("Se intentó actualizar un dueño no registrado: %s", nombre)
+            return
+        telefono = input(f"Teléfono ({propietario.telefono}, vacío para no cambiarlo): ").strip() or None
+        direccion = input(f"Dirección ({propietario.direccion}, vacío para no cambiarla): ").strip() or None
+        if self.actualizar_propietario(propietario, telefono, direccion):
+            print("Datos del dueño actualizados")
+            logger.info("Se actualizaron los datos del dueño: %s", propietario.nombre)
+
+    @instrumentacion.medir
     def buscar_propietario(self, nombre_propietario): #para saber si el dueño ya esta inscrito se hace una verificación "nombre_propietario" va a ser pedido cuando el usuario registre su mascota
         """
         Busca un dueño registrado por nombre (ignorando mayúsculas/minúsculas).
@@ -172,11 +559,654 @@ class SistemaVeterinaria:
         Retorna:
             Dueno o None: Objeto del dueño si existe, de lo contrario None.
         """
-        for propietario in self.propietarios:
-            if propietario.nombre.lower()==nombre_propietario.lower():  #para evitar dolores de cabeza, se le pide que no discrimine por mayuscula
-                return propietario
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.buscar_propietario(nombre_propietario)
+        encontrados = self._indice("propietarios", self.propietarios, lambda p: p.nombre).get(clave_busqueda(nombre_propietario))
+        return encontrados[0] if encontrados else None
+
+    @instrumentacion.medir
+    def buscar_mascota(self, nombre_mascota):
+        """
+        Busca una mascota registrada por nombre (ignorando mayúsculas/minúsculas).
+
+        Retorna:
+            Mascota o None: La primera mascota registrada con ese nombre.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.buscar_mascota(nombre_mascota)
+        encontradas = self._indice("mascotas", self.mascotas, lambda m: m.nombre).get(clave_busqueda(nombre_mascota))
+        return encontradas[0] if encontradas else None
+
+    @instrumentacion.medir
+    def consultas_de_mascota(self, nombre_mascota):
+        """
+        Retorna las consultas registradas para las mascotas con ese nombre, en orden de registro.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.consultas_de_mascota(nombre_mascota)
+        if self._ubicaciones is not None:
+            return self._leer_consultas_diferidas(nombre_mascota)
+        return list(self._indice("consultas", self.consultas, lambda c: c.mascota.nombre).get(clave_busqueda(nombre_mascota), []))
+
+    def iterar_mascotas(self):
+        """
+        Recorre las mascotas registradas en orden de registro.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.mascotas()
+        return iter(self.mascotas)
+
+    def agregar_propietario(self, propietario):
+        """
+        Incorpora un propietario ya construido. En los archivos se guarda junto a sus mascotas.
+        """
+        if self.repositorio is not None:
+            self.repositorio.agregar_propietario(propietario)
+        else:
+            self.propietarios.append(propietario)
+
+    def guardar_propietario(self, propietario):
+        """
+        Incorpora un propietario y lo escribe de inmediato en propietarios.csv,
+        aunque todavía no tenga mascotas.
+
+        Retorna:
+            bool: True si se guardó.
+        """
+        if self.repositorio is not None:
+            self.repositorio.agregar_propietario(propietario)
+            return True
+        with self.bloqueo():
+            self.propietarios.append(propietario)
+            try:
+                self._escribir_propietarios_csv([propietario])
+            except Exception as e:
+                logger.error("Error al guardar propietario en CSV: %s", e)
+                print("Hubo un problema al guardar el propietario.")
+                return False
+            self._guardar_estado_periodico()
+        logger.info("Propietario %s guardado en archivo CSV", propietario.nombre)
+        return True
+
+    @instrumentacion.medir
+    def actualizar_propietario(self, propietario, telefono=None, direccion=None):
+        """
+        Cambia el teléfono y/o la dirección de un propietario y lo persiste: se
+        agrega una fila con sus datos al final de propietarios.csv, que al
+        cargar reemplaza a las anteriores con el mismo id.
+
+        Retorna:
+            bool: True si se guardó.
+        """
+        if telefono is not None:
+            propietario.telefono = telefono
+        if direccion is not None:
+            propietario.direccion = direccion
+        if self.repositorio is not None:
+            self.repositorio.actualizar_propietario(propietario)
+            return True
+        with self.bloqueo():
+            try:
+                self._escribir_propietarios_csv([propietario])
+            except Exception as e:
+                logger.error("Error al guardar propietario en CSV: %s", e)
+                print("Hubo un problema al guardar el propietario.")
+                return False
+            self._guardar_estado_periodico()
+        logger.info("Propietario %s actualizado en archivo CSV", propietario.nombre)
+        return True
+
+    @instrumentacion.medir
+    def agregar_mascota(self, mascota):
+        """
+        Incorpora una mascota ya construida y la persiste.
+        """
+        if self.repositorio is not None:
+            self.repositorio.agregar_mascota(mascota)
+            return
+        with self._bloqueo_registro():
+            self.mascotas.append(mascota)
+            self._encolar_escritura(self._mascotas_pendientes, mascota)
+
+    @instrumentacion.medir
+    def agregar_consulta(self, consulta):
+        """
+        Incorpora una consulta ya construida y la persiste: una línea en el journal
+        o el archivo JSON completo, según el modo.
+        """
+        if self.repositorio is not None:
+            self.repositorio.agregar_consulta(consulta)
+            return
+        with self._bloqueo_registro():
+            # Con carga diferida la consulta queda en el journal y se lee desde allí al pedirla
+            if self._ubicaciones is None:
+                self.consultas.append(consulta)
+            self._encolar_escritura(self._consultas_pendientes, consulta)
+
+    def _bloqueo_registro(self):
+        """
+        Si cada registro se escribe en el momento, se registra con el bloqueo
+        tomado, como cualquier escritura; si va al buffer, el bloqueo se toma al
+        escribir el lote.
+        """
+        if self.lote_escritura <= 1:
+            return self.bloqueo()
+        return nullcontext()
+
+    def _encolar_escritura(self, pendientes, registro):
+        if not self._mascotas_pendientes and not self._consultas_pendientes:
+            self._inicio_pendientes = time.monotonic()
+        pendientes.append(registro)
+        self.escribir_pendientes(vencidas=True)
+
+    def escribir_pendientes(self, vencidas=False):
+        """
+        Escribe en un solo lote las mascotas y consultas que esperan en el
+        buffer de escritura: una apertura de mascotas.csv y una del journal (o
+        una compactación, sin journal).
+
+        Parámetros:
+            vencidas (bool): Escribir solo si ya se juntaron `lote_escritura`
+                registros o el más antiguo espera hace `intervalo_escritura`
+                segundos.
+
+        Retorna:
+            int: Cantidad de registros escritos.
+        """
+        cantidad = len(self._mascotas_pendientes) + len(self._consultas_pendientes)
+        if not cantidad:
+            return 0
+        if vencidas:
+            vencido = self.intervalo_escritura is not None and \
+                time.monotonic() - self._inicio_pendientes >= self.intervalo_escritura
+            if cantidad < self.lote_escritura and not vencido:
+                return 0
+        with self.bloqueo():
+            mascotas, self._mascotas_pendientes = self._mascotas_pendientes, []
+            consultas, self._consultas_pendientes = self._consultas_pendientes, []
+            if mascotas:
+                self.guardar_mascotas_csv(*mascotas)
+            if consultas:
+                if self.journal or self._ubicaciones is not None:
+                    self.agregar_consultas_journal(consultas)
+                else:
+                    self.compactar_consultas()
+            self._guardar_estado_periodico()
+        return cantidad
+
+    @instrumentacion.medir
+    def importar_registros(self, propietarios=(), mascotas=(), consultas=()):
+        """
+        Registra propietarios, mascotas y consultas sin usar la consola, p. ej. para
+        migrar el padrón de otra clínica. Cada registro es un diccionario con:
+
+            propietarios: nombre, telefono, direccion
+            mascotas: nombre, especie, raza, edad, propietario (nombre) y
+                opcionalmente telefono y direccion del propietario
+            consultas: mascota (nombre), fecha (dd-mm-aaaa), motivo, diagnostico
+                y opcionalmente propietario, para distinguir mascotas homónimas
+
+        Se validan con las mismas reglas que el menú (edad entera, fecha
+        dd-mm-aaaa, nombres y demás datos como texto); los registros
+        inválidos se omiten y se informan. Los
+        propietarios se reconocen por nombre como en buscar_propietario. Al
+        final se escribe una sola vez en propietarios.csv (también los
+        propietarios sin mascotas), en mascotas.csv y en el journal.
+
+        Retorna:
+            dict: Cantidad de propietarios, mascotas y consultas nuevos, y los errores.
+        """
+        resumen = {"propietarios": 0, "mascotas": 0, "consultas": 0, "errores": []}
+        nuevos_propietarios = []
+        nuevas_mascotas = []
+        nuevas_consultas = []
+
+        def propietario_de(nombre, telefono, direccion):
+            propietario = self.buscar_propietario(nombre.strip())
+            if propietario is None:
+                propietario = Propietario(nombre.strip(), telefono, direccion)
+                self.agregar_propietario(propietario)
+                nuevos_propietarios.append(propietario)
+                resumen["propietarios"] += 1
+            return propietario
+
+        def texto(datos, campo):
+            # Un número o null guardado como nombre rompería las búsquedas e índices
+            valor = datos[campo]
+            if not isinstance(valor, str):
+                raise TypeError(f"{campo} debe ser texto, no {type(valor).__name__}")
+            return valor
+
+        def error(tipo, numero, e):
+            resumen["errores"].append(f"{tipo} {numero}: {type(e).__name__} {e}")
+            logger.error("Registro inválido al importar (%s %s): %s", tipo, numero, e)
+
+        with self.repositorio.lote() if self.repositorio is not None else self.bloqueo():
+            self.escribir_pendientes()
+            for numero, datos in enumerate(propietarios, start=1):
+                try:
+                    propietario_de(texto(datos, "nombre"), datos.get("telefono", ""), datos.get("direccion", ""))
+                except (KeyError, TypeError, AttributeError) as e:
+                    error("propietario", numero, e)
+
+            for numero, datos in enumerate(mascotas, start=1):
+                try:
+                    if isinstance(datos["edad"], bool):  # True pasaría como 1
+                        raise TypeError(f"edad debe ser un número entero, no {datos['edad']}")
+                    edad = int(datos["edad"])
+                    nombre, especie, raza = (texto(datos, campo) for campo in ("nombre", "especie", "raza"))
+                    propietario = propietario_de(texto(datos, "propietario"), datos.get("telefono", ""),
+                                                 datos.get("direccion", ""))
+                    mascota = Mascota(nombre, especie, raza, edad, propietario)
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    error("mascota", numero, e)
+                    continue
+                if self.repositorio is not None:
+                    self.repositorio.agregar_mascota(mascota)
+                else:
+                    self.mascotas.append(mascota)
+                    nuevas_mascotas.append(mascota)
+                resumen["mascotas"] += 1
+
+            for numero, datos in enumerate(consultas, start=1):
+                try:
+                    fecha = fecha_desde_texto(texto(datos, "fecha").strip())
+                    motivo, diagnostico = texto(datos, "motivo"), texto(datos, "diagnostico")
+                    if datos.get("propietario") is not None:
+                        texto(datos, "propietario")
+                    mascota = self._mascota_de(texto(datos, "mascota"), datos.get("propietario"))
+                    if mascota is None:
+                        raise KeyError(f"mascota no registrada: {datos['mascota']}")
+                    consulta = Consulta(fecha, motivo, diagnostico, mascota)
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    error("consulta", numero, e)
+                    continue
+                if self.repositorio is not None:
+                    self.repositorio.agregar_consulta(consulta)
+                else:
+                    nuevas_consultas.append(consulta)
+                resumen["consultas"] += 1
+
+            if nuevos_propietarios and self.repositorio is None:
+                try:
+                    self._escribir_propietarios_csv(nuevos_propietarios)
+                except Exception as e:
+                    logger.error("Error al guardar propietarios en CSV: %s", e)
+            if nuevas_mascotas:
+                self.guardar_mascotas_csv(*nuevas_mascotas)
+            if nuevas_consultas:
+                if self._ubicaciones is None:
+                    self.consultas.extend(nuevas_consultas)
+                if self.journal or self._ubicaciones is not None:
+                    self.agregar_consultas_journal(nuevas_consultas)
+                else:
+                    self.compactar_consultas()
+            if self.repositorio is None:
+                self._guardar_estado_periodico()
+        logger.info("Importación: %d propietarios, %d mascotas, %d consultas, %d errores",
+                    resumen["propietarios"], resumen["mascotas"], resumen["consultas"], len(resumen["errores"]))
+        return resumen
+
+    def _mascota_de(self, nombre_mascota, nombre_propietario=None):
+        """
+        Busca una mascota por nombre; si se indica el propietario, entre las de ese dueño.
+        """
+        if nombre_propietario is None or self.repositorio is not None:
+            return self.buscar_mascota(nombre_mascota)
+        clave_propietario = clave_busqueda(nombre_propietario.strip())
+        candidatas = self._indice("mascotas", self.mascotas, lambda m: m.nombre).get(clave_busqueda(nombre_mascota), [])
+        return next((m for m in candidatas
+                     if m.propietario and clave_busqueda(m.propietario.nombre) == clave_propietario), None)
+
+    def cerrar(self):
+        """
+        Deja los datos consistentes al salir: escribe el buffer de escritura,
+        compacta el journal pendiente o cierra el repositorio.
+        """
+        if self.repositorio is not None:
+            self.repositorio.cerrar()
+            return
+        self.escribir_pendientes()
+        if self.journal and self._entradas_journal and self._ubicaciones is None:
+            self.compactar_consultas()
+        self._guardar_indice_texto()
+        self.guardar_estado_binario()
+
+    @contextmanager
+    def bloqueo(self, sincronizar=True):
+        """
+        Bloqueo exclusivo entre procesos (fcntl.flock sobre ARCHIVO_BLOQUEO) para
+        las secciones que leen y escriben los archivos de datos. Es reentrante.
+        Al tomarlo, por defecto se incorpora primero lo que otros procesos
+        escribieron, para no pisar sus registros ni repetir sus ids.
+        Sin fcntl (Windows) solo se sincroniza.
+        """
+        if self._profundidad_bloqueo == 0 and fcntl is not None:
+            try:
+                self._archivo_bloqueo = open(self._ruta(ARCHIVO_BLOQUEO), "a")
+                fcntl.flock(self._archivo_bloqueo.fileno(), fcntl.LOCK_EX)
+            except OSError as e:
+                logger.warning("No se pudo bloquear el directorio de datos: %s", e)
+                self._archivo_bloqueo = None
+        self._profundidad_bloqueo += 1
+        try:
+            if sincronizar and self._profundidad_bloqueo == 1:
+                self._incorporar_cambios_externos()
+            yield
+        finally:
+            self._profundidad_bloqueo -= 1
+            if self._profundidad_bloqueo == 0 and self._archivo_bloqueo is not None:
+                fcntl.flock(self._archivo_bloqueo.fileno(), fcntl.LOCK_UN)
+                self._archivo_bloqueo.close()
+                self._archivo_bloqueo = None
+
+    def _ruta(self, nombre):
+        """Ruta de un archivo de datos dentro del directorio del sistema."""
+        return nombre if self.directorio is None else os.path.join(self.directorio, nombre)
+
+    @staticmethod
+    def _firma(ruta):
+        """Identifica una versión de un archivo reescrito por reemplazo: (inodo, tamaño, mtime)."""
+        try:
+            datos = os.stat(ruta)
+        except FileNotFoundError:
+            return None
+        return (datos.st_ino, datos.st_size, datos.st_mtime_ns)
+
+    @staticmethod
+    def _tamano(ruta):
+        try:
+            return os.path.getsize(ruta)
+        except FileNotFoundError:
+            return 0
+
+    def _sincronizar(self, archivo):
+        """
+        Entrega lo escrito en el archivo abierto al sistema operativo y, con
+        durabilidad "fsync", espera a que llegue al disco.
+        """
+        archivo.flush()
+        if self.durabilidad == "fsync":
+            os.fsync(archivo.fileno())
+
+    def _sincronizar_directorio(self):
+        """Con durabilidad "fsync", persiste también los renombres hechos en el directorio de datos."""
+        if self.durabilidad != "fsync" or not hasattr(os, "O_DIRECTORY"):
+            return
+        descriptor = os.open(self.directorio or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _recordar_version(self, nombre):
+        """Anota inodo y mtime de un archivo de datos tal como quedó al leerlo o escribirlo."""
+        try:
+            datos = os.stat(self._ruta(nombre))
+        except FileNotFoundError:
+            self._versiones.pop(nombre, None)
+        else:
+            self._versiones[nombre] = (datos.st_ino, datos.st_mtime_ns)
+
+    def _cambio_archivo(self, nombre, fin):
+        """
+        Cómo cambió un archivo de datos desde que este sistema lo leyó o
+        escribió hasta el byte `fin`.
+
+        Retorna:
+            str o None: None si no cambió, "agregado" si solo se le agregaron
+            datos al final, "reescrito" si se reemplazó (otro inodo), se borró,
+            se truncó o se reescribió en el lugar (mismo tamaño, otro mtime).
+        """
+        try:
+            datos = os.stat(self._ruta(nombre))
+        except FileNotFoundError:
+            return "reescrito" if fin else None
+        version = self._versiones.get(nombre)
+        if datos.st_size < fin or (version is not None and datos.st_ino != version[0]):
+            return "reescrito"
+        if datos.st_size > fin:
+            return "agregado"
+        if version is not None and datos.st_mtime_ns != version[1]:
+            return "reescrito"
         return None
 
+    def _hay_cambios_externos(self, archivo=ARCHIVO_CONSULTAS):
+        """Revisa, sin bloqueo ni lecturas, si otro proceso modificó algún archivo de datos."""
+        return (self._cambio_archivo(ARCHIVO_MASCOTAS, self._fin_csv) is not None
+                or self._cambio_archivo(ARCHIVO_PROPIETARIOS, self._fin_propietarios) is not None
+                or self._cambio_archivo(self._ruta_journal(archivo), self._fin_journal) is not None
+                or self._firma(self._ruta(archivo)) != self._firma_snapshot)
+
+    def recargar_cambios(self, vencida=False):
+        """
+        Incorpora lo que otros procesos agregaron a los archivos de datos desde
+        la última lectura, leyendo solo los bytes nuevos de cada uno; si alguno
+        fue reemplazado, truncado o reescrito, se recarga todo. Si ningún
+        archivo cambió de tamaño, inodo ni mtime, no se toma el bloqueo.
+
+        Parámetros:
+            vencida (bool): Revisar solo si pasaron `intervalo_recarga`
+                segundos desde la última revisión (sin intervalo, nunca).
+
+        Retorna:
+            bool: True si había cambios.
+        """
+        if self.repositorio is not None or self._profundidad_bloqueo:
+            return False
+        ahora = time.monotonic()
+        if vencida and (self.intervalo_recarga is None or ahora - self._ultima_recarga < self.intervalo_recarga):
+            return False
+        self._ultima_recarga = ahora
+        if not self._hay_cambios_externos():
+            return False
+        with self.bloqueo(sincronizar=False):
+            self._incorporar_cambios_externos()
+        return True
+
+    def _recargar_todo(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Vuelve a cargar todo desde los archivos, cuando otro proceso los
+        reescribió y no se puede seguir leyendo desde donde se había quedado.
+        Se conservan los propietarios que aún no están en los archivos y los
+        registros del buffer de escritura, enlazados a los objetos recargados.
+        """
+        nuevos = [p for p in self.propietarios if p.id not in self._propietarios_en_csv]
+        carga_diferida = self._ubicaciones is not None
+        self._reiniciar_estado()
+        self._cargar_archivos(carga_diferida)
+        por_id = self._por_id
+        self.propietarios.extend(p for p in nuevos if p.id not in por_id["propietario"])
+        for mascota in self._mascotas_pendientes:
+            if mascota.propietario is not None:
+                mascota.propietario = por_id["propietario"].get(mascota.propietario.id, mascota.propietario)
+            self.mascotas.append(mascota)
+        for consulta in self._consultas_pendientes:
+            consulta.mascota = por_id["mascota"].get(consulta.mascota.id, consulta.mascota)
+            if not carga_diferida:
+                self.consultas.append(consulta)
+
+    def _incorporar_cambios_externos(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Incorpora lo que otros procesos escribieron desde la última lectura o
+        escritura de este sistema: filas nuevas de propietarios.csv y
+        mascotas.csv y registros nuevos del journal. Si otro proceso compactó las consultas, se recargan.
+        Debe llamarse con el bloqueo tomado.
+        """
+        if self.repositorio is not None:
+            return
+        cambio_csv = {self._cambio_archivo(ARCHIVO_MASCOTAS, self._fin_csv),
+                      self._cambio_archivo(ARCHIVO_PROPIETARIOS, self._fin_propietarios)}
+        if "reescrito" in cambio_csv:
+            logger.info("Otro proceso reescribió mascotas.csv o propietarios.csv, se recarga todo")
+            self._recargar_todo(archivo)
+            return
+        if "agregado" in cambio_csv:
+            self._cargar_mascotas_duenos_csv(desde=self._fin_csv, desde_propietarios=self._fin_propietarios)
+        cambio_journal = self._cambio_archivo(self._ruta_journal(archivo), self._fin_journal)
+        if self._firma(self._ruta(archivo)) != self._firma_snapshot or cambio_journal == "reescrito":
+            logger.info("Otro proceso compactó las consultas, se recargan")
+            if self._ubicaciones is not None:
+                self._indexar_consultas(archivo)
+            else:
+                self.cargar_json(archivo)
+                # Las del buffer de escritura todavía no están en los archivos
+                self.consultas.extend(self._consultas_pendientes)
+        elif cambio_journal == "agregado":
+            if not self._leer_journal(archivo, desde=self._fin_journal):
+                self.cargar_consultas_pendientes(archivo)
+
+    def _indice(self, nombre, lista, nombre_de):
+        """
+        Retorna el índice {nombre normalizado: [elementos]} de una lista, indexando solo
+        los elementos agregados al final desde la última consulta. Si la lista fue
+        reemplazada o se acortó, el índice se reconstruye completo.
+        """
+        indice, cola = self._indices.get(nombre, (None, ColaIncremental()))
+        if cola.reemplazada(lista):
+            indice = {}
+        for elemento in cola.nuevos(lista):
+            indice.setdefault(clave_busqueda(nombre_de(elemento)), []).append(elemento)
+        self._indices[nombre] = (indice, cola)
+        return indice
+
+    def _indice_fechas(self):
+        """
+        Retorna el índice por fecha de las consultas. Se construye la primera vez
+        con todo el historial y después solo se le agregan las consultas nuevas.
+        """
+        if self._ubicaciones is not None:
+            # Los reportes por período necesitan todo el historial en memoria
+            with self.bloqueo():
+                self.cargar_consultas_pendientes()
+        indice, cola = self._indices.get("fechas", (None, ColaIncremental()))
+        if cola.reemplazada(self.consultas):
+            indice = IndiceFechas()
+        indice.agregar_varias(cola.nuevos(self.consultas))
+        self._indices["fechas"] = (indice, cola)
+        return indice
+
+    @instrumentacion.medir
+    def consultas_entre(self, desde, hasta):
+        """
+        Retorna las consultas con fecha en [desde, hasta], ordenadas por fecha.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.consultas_entre(desde, hasta)
+        return self._indice_fechas().entre(desde, hasta)
+
+    @instrumentacion.medir
+    def visitas_por_mes(self, desde=None, hasta=None):
+        """
+        Retorna las visitas por mes y especie en [desde, hasta] (por defecto
+        todo el historial), como {"AAAA-MM": {especie: cantidad}}.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.visitas_por_mes(desde, hasta)
+        return self._indice_fechas().visitas_por_mes(desde, hasta)
+
+    @instrumentacion.medir
+    def ultima_visita(self, nombre_mascota):
+        """
+        Retorna la consulta más reciente de la mascota, o None si no tiene.
+        """
+        mascota = self.buscar_mascota(nombre_mascota)
+        if mascota is None:
+            return None
+        if self.repositorio is not None:
+            return self.repositorio.ultima_visita(mascota)
+        return self._indice_fechas().ultima_visita(mascota)
+
+    @instrumentacion.medir
+    def ultimas_visitas(self):
+        """
+        Retorna la última consulta de cada mascota, de la más reciente a la más antigua.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None:
+            return self.repositorio.ultimas_visitas()
+        return self._indice_fechas().ultimas_visitas()
+
+    @staticmethod
+    def _ruta_indice_texto(archivo):
+        return os.path.splitext(archivo)[0] + ".indice"
+
+    def _indice_texto(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Retorna el índice de palabras de las consultas. Al usarlo por primera vez
+        se carga el guardado junto al snapshot, si corresponde a él, o se
+        construye; después solo se le agregan las consultas nuevas.
+        """
+        if self._ubicaciones is not None:
+            with self.bloqueo():
+                self.cargar_consultas_pendientes()
+        indice, cola = self._indices.get("texto", (None, ColaIncremental()))
+        if cola.reemplazada(self.consultas):
+            # El guardado sirve si es del mismo snapshot: el journal solo agrega consultas al final
+            indice = IndiceTexto.cargar(self._ruta(self._ruta_indice_texto(archivo)), self._firma_snapshot)
+            if indice is None or indice.cantidad > len(self.consultas):
+                indice = IndiceTexto()
+            else:
+                logger.info("Índice de palabras cargado: %s consultas", indice.cantidad)
+        indice.agregar_varias(cola.nuevos(self.consultas, desde=indice.cantidad))
+        self._indices["texto"] = (indice, cola)
+        return indice
+
+    def _guardar_indice_texto(self, archivo=ARCHIVO_CONSULTAS, forzar=False):
+        """
+        Guarda el índice de palabras, si se construyó, para no rehacerlo al iniciar.
+        Sin `forzar` solo se guarda si tiene consultas nuevas.
+        """
+        if "texto" not in self._indices or self._ubicaciones is not None:
+            return
+        indice = self._indice_texto(archivo)
+        if not forzar and indice.guardadas == indice.cantidad:
+            return
+        try:
+            indice.guardar(self._ruta(self._ruta_indice_texto(archivo)), self._firma_snapshot)
+        except OSError as e:
+            logger.error("Error al guardar el índice de palabras: %s", e)
+
+    @instrumentacion.medir
+    def buscar_consultas(self, texto, desde=None, hasta=None, especie=None):
+        """
+        Busca consultas por las palabras de su motivo o diagnóstico, sin
+        distinguir mayúsculas ni tildes. Los términos deben aparecer todos;
+        "OR" separa alternativas y "palabra*" busca por prefijo. Opcionalmente
+        filtra por rango de fechas y especie.
+
+        Retorna:
+            list: Consultas encontradas, ordenadas por fecha.
+        """
+        self.recargar_cambios(vencida=True)
+        if self.repositorio is not None and hasattr(self.repositorio, "buscar_consultas"):
+            return self.repositorio.buscar_consultas(texto, desde, hasta, especie)
+        if self.repositorio is not None:
+            # El repositorio no tiene índice de palabras: se filtran las consultas del período
+            indice = IndiceTexto()
+            candidatas = self.repositorio.consultas_entre(desde or date.min, hasta or date.max)
+            indice.agregar_varias(candidatas)
+        else:
+            indice = self._indice_texto()
+            candidatas = self.consultas
+        clave_especie = clave_busqueda(especie) if especie else None
+        encontradas = []
+        for posicion in indice.buscar(texto):
+            consulta = candidatas[posicion]
+            if (desde is not None and consulta.fecha < desde) or (hasta is not None and consulta.fecha > hasta):
+                continue
+            if clave_especie is not None and clave_busqueda(consulta.mascota.especie) != clave_especie:
+                continue
+            encontradas.append(consulta)
+        encontradas.sort(key=lambda consulta: consulta.fecha)
+        return encontradas
+
     def registrar_mascota(self):
         """
         Registra una nueva mascota. Si el dueño no está registrado, lo solicita.
@@ -191,7 +1221,7 @@ class SistemaVeterinaria:
                 edad = int(input("Edad de la mascota en años: "))
                 break
             except ValueError:
-                logging.error("Error al ingresar la edad de la mascota, se ingresó un valor no valido")
+                logger.error("Error al ingresar la edad de la mascota, se ingresó un valor no valido")
                 print("Por favor, ingrese un número válido.")
 
         nombre_propietario = input("Nombre del dueño: ").strip() #Esto buscará si el dueño ya esta registrado, de otra forma, pedira que lo registre
@@ -202,28 +1232,38 @@ class SistemaVeterinaria:
             propietario=self.registrar_propietario()
         
         mascota= Mascota(nombre, especie, raza, edad, propietario)
-        self.mascotas.append(mascota)
         print(f"\n - Mascota '{mascota.nombre}' registrada.")
-        logging.info(f"Se registró la mascota: {mascota.nombre}, del dueño: {propietario.nombre}")
+        logger.info("Se registró la mascota: %s, del dueño: %s", mascota.nombre, propietario.nombre)
         
-        self.guardar_mascotas_csv(mascota)
+        self.agregar_mascota(mascota)
 
 
-    def listar_mascotas(self):
+    @instrumentacion.medir
+    def listar_mascotas(self, salida=None, tamano_pagina=None, pagina=None):
         """
-        Muestra por consola todas las mascotas registradas en el sistema.
+        Muestra todas las mascotas registradas en el sistema.
+
+        Parámetros:
+            salida (file): Dónde escribir el listado, con su título y sus
+                mensajes; por defecto la consola.
+            tamano_pagina (int): Mascotas por página. En una terminal se
+                muestra página por página; sin tamaño, todas juntas.
+            pagina (int): Mostrar solo esa página.
         """
+        self.recargar_cambios(vencida=True)
         
-        Titulos.imprimir_titulo("Lista de mascotas")
-        if not self.mascotas:
-            Mensajes.imprimir_mensaje("No existen mascotas registradas")
-            logging.info("Se intento consultar la lista de mascotas, pero no hay registros")
+        Titulos.imprimir_titulo("Lista de mascotas", salida)
+        if self.repositorio is not None:
+            listado = Listado(texto_mascota).actualizar(list(self.iterar_mascotas()))
+        else:
+            listado = self._listado("mascotas", self.mascotas, texto_mascota)
+        if not len(listado):
+            Mensajes.imprimir_mensaje("No existen mascotas registradas", salida)
+            logger.info("Se intento consultar la lista de mascotas, pero no hay registros")
             return
 
-        for mascota in self.mascotas:
-            print(mascota)
-            print("-" * 30)         
-        logging.info("Se consultaron las mascotas registradas")
+        escribir_listado(listado, salida, tamano_pagina, pagina)
+        logger.info("Se consultaron las mascotas registradas")
 
     def registrar_consulta(self):
         """
@@ -232,125 +1272,1181 @@ class SistemaVeterinaria:
         Titulos.imprimir_titulo("Registro de Consulta")
         nombre_mascota = input("Nombre de la mascota: ")
 
-        mascota = next((m for m in self.mascotas if m.nombre.lower() == nombre_mascota.lower()), None)
+        mascota = self.buscar_mascota(nombre_mascota)
         if not mascota:
             Mensajes.imprimir_mensaje("Mascota no encontrada")
-            logging.info("Se intentó registrar una consulta para una mascota no registrada")
+            logger.info("Se intentó registrar una consulta para una mascota no registrada")
             return
 
-        while True:
-            fecha_input = input("Fecha de la consulta (dd-mm-aaaa): ")
-            try:
-                fecha = datetime.strptime(fecha_input, "%d-%m-%Y").date()
-                break
-            except ValueError:
-                logging.error("Error al ingresar la fecha de la consulta, se ingresó un valor no valido")
-                print("Formato incorrecto o fecha inválida. Ejemplo válido: 15-03-2025.")
-    
+        fecha = self._pedir_fecha("Fecha de la consulta (dd-mm-aaaa): ")
         motivo = input("Motivo de la consulta: ")
         diagnostico = input("Diagnóstico: ")
 
         consulta = Consulta(fecha, motivo, diagnostico, mascota)
-        self.consultas.append(consulta)
         print("Consulta registrada.")
-        logging.info(f"Se registró una consulta de la mascota: {mascota.nombre}")
+        logger.info("Se registró una consulta de la mascota: %s", mascota.nombre)
         
-        # Guardar la consulta en el archivo JSON
-        self.guardar_json_consultas()
+        self.agregar_consulta(consulta)
 
-    def historia_clinica(self):
+    @staticmethod
+    def _pedir_fecha(mensaje, opcional=False):
         """
-        Muestra el historial clínico (consultas) de una mascota específica.
+        Pide una fecha dd-mm-aaaa hasta que sea válida. Si es opcional, una
+        respuesta vacía retorna None.
         """
-        Titulos.imprimir_titulo("Historia Clínica")
-        nombre_mascota = input("Nombre de la mascota: ")
+        while True:
+            fecha_input = input(mensaje)
+            if opcional and not fecha_input.strip():
+                return None
+            try:
+                return datetime.strptime(fecha_input.strip(), "%d-%m-%Y").date()
+            except ValueError:
+                logger.error("Error al ingresar la fecha de la consulta, se ingresó un valor no valido")
+                print("Formato incorrecto o fecha inválida. Ejemplo válido: 15-03-2025.")
+
+    def reporte_consultas_entre(self):
+        """
+        Muestra las consultas registradas entre dos fechas.
+        """
+        Titulos.imprimir_titulo("Consultas por período")
+        desde = self._pedir_fecha("Desde (dd-mm-aaaa): ")
+        hasta = self._pedir_fecha("Hasta (dd-mm-aaaa): ")
+        consultas = self.consultas_entre(desde, hasta)
+        if not consultas:
+            Mensajes.imprimir_mensaje("No hay consultas en ese período.")
+            return
+        for consulta in consultas:
+            print(consulta)
+        print(f"Total: {len(consultas)} consultas.")
+        logger.info("Se consultaron las consultas entre %s y %s", desde, hasta)
+
+    def reporte_visitas_por_mes(self):
+        """
+        Muestra la cantidad de visitas por mes y especie.
+        """
+        Titulos.imprimir_titulo("Visitas por mes y especie")
+        desde = self._pedir_fecha("Desde (dd-mm-aaaa, vacío para todo el historial): ", opcional=True)
+        hasta = self._pedir_fecha("Hasta (dd-mm-aaaa, vacío para todo el historial): ", opcional=True)
+        visitas = self.visitas_por_mes(desde, hasta)
+        if not visitas:
+            Mensajes.imprimir_mensaje("No hay consultas en ese período.")
+            return
+        for mes, especies in visitas.items():
+            detalle = ", ".join(f"{especie}: {cantidad}" for especie, cantidad in sorted(especies.items()))
+            print(f"{mes}  {sum(especies.values()):>6} visitas  ({detalle})")
+        logger.info("Se consultó el reporte de visitas por mes")
+
+    def censo(self):
+        """
+        Retorna el censo de mascotas y consultas (ver estadisticas.py). Sus
+        columnas se construyen la primera vez y después solo se les agregan los
+        registros nuevos.
+        """
+        from estadisticas import Censo
+        if self.repositorio is not None:
+            return Censo().actualizar(list(self.iterar_mascotas()), self.consultas_entre(date.min, date.max))
+        self.recargar_cambios(vencida=True)
+        if self._ubicaciones is not None:
+            with self.bloqueo():
+                self.cargar_consultas_pendientes()
+        censo = self._indices.get("censo")
+        if censo is None:
+            censo = self._indices["censo"] = Censo()
+        return censo.actualizar(self.mascotas, self.consultas)
 
-        consultas = [c for c in self.consultas if c.mascota.nombre.lower() == nombre_mascota.lower()]
+    def reporte_censo(self, directorio=None):
+        """
+        Muestra las estadísticas del censo y, si se indica un directorio (o se
+        pide por consola), las exporta a CSV.
+        """
+        Titulos.imprimir_titulo("Estadísticas de la clínica")
+        censo = self.censo()  # Con repositorio se arma en cada llamada: se exporta el mismo que se muestra
+        resumen = censo.resumen()
+        if not resumen["especies"]:
+            Mensajes.imprimir_mensaje("No existen mascotas registradas")
+            return
+        print("Mascotas por especie: " + ", ".join(f"{especie}: {cantidad}" for especie, cantidad in resumen["especies"]))
+        print("Razas más comunes: " + ", ".join(f"{raza} ({especie}): {cantidad}"
+                                                for especie, raza, cantidad in resumen["razas"][:10]))
+        print("Edades: " + ", ".join(f"{edad} años: {cantidad}" for edad, cantidad in resumen["edades"]))
+        print("Mascotas con más consultas: " + ", ".join(f"{mascota.nombre}: {cantidad}"
+                                                         for mascota, cantidad in resumen["mascotas_frecuentes"]))
+        for mes, cantidad in resumen["por_mes"].items():
+            print(f"{mes}  {cantidad:>6} consultas")
+        print("Diagnósticos más frecuentes: " + ", ".join(f"{diagnostico}: {cantidad}"
+                                                          for diagnostico, cantidad in resumen["diagnosticos"]))
+        if directorio is None:
+            directorio = input("Directorio para exportar a CSV (vacío para no exportar): ").strip() or None
+        if directorio is not None:
+            rutas = censo.exportar_csv(directorio)
+            print(f"Reportes exportados: {', '.join(rutas)}")
+        logger.info("Se consultaron las estadísticas de la clínica")
+
+    def reporte_ultimas_visitas(self):
+        """
+        Muestra la fecha de la última consulta de cada mascota.
+        """
+        Titulos.imprimir_titulo("Última visita de cada mascota")
+        consultas = self.ultimas_visitas()
         if not consultas:
-            Mensajes.imprimir_mensaje("No hay consultas registradas para esta mascota.")
-            logging.info(f"No se encontraron consultas para la mascota: {nombre_mascota}")
+            Mensajes.imprimir_mensaje("No hay consultas registradas.")
             return
+        for consulta in consultas:
+            print(f"{consulta.fecha}  {consulta.mascota.nombre} ({consulta.mascota.especie}) - {consulta.motivo}")
+        logger.info("Se consultó el reporte de últimas visitas")
 
-        print(f"\nHistorial clínico de {nombre_mascota}:")
+    def reporte_busqueda(self):
+        """
+        Busca consultas por palabras del motivo o diagnóstico, con filtros opcionales.
+        """
+        Titulos.imprimir_titulo("Buscar consultas")
+        print('Varias palabras: deben aparecer todas. "OR" separa alternativas; "derma*" busca por prefijo.')
+        texto = input("Buscar: ")
+        desde = self._pedir_fecha("Desde (dd-mm-aaaa, vacío para todo el historial): ", opcional=True)
+        hasta = self._pedir_fecha("Hasta (dd-mm-aaaa, vacío para todo el historial): ", opcional=True)
+        especie = input("Especie (vacío para todas): ").strip() or None
+        consultas = self.buscar_consultas(texto, desde, hasta, especie)
+        if not consultas:
+            Mensajes.imprimir_mensaje("No se encontraron consultas.")
+            return
         for consulta in consultas:
             print(consulta)
-        logging.info(f"Se consultó la historia clínica de la mascota: {nombre_mascota}")
-        
+        print(f"Total: {len(consultas)} consultas.")
+        logger.info("Se buscaron consultas por: %s", texto)
+
+    def historia_clinica(self, nombre_mascota=None, salida=None, tamano_pagina=None, pagina=None):
+        """
+        Muestra el historial clínico (consultas) de una mascota específica. Sin
+        nombre, se pide por consola; salida, tamano_pagina y pagina funcionan
+        como en listar_mascotas.
+        """
+        Titulos.imprimir_titulo("Historia Clínica", salida)
+        if nombre_mascota is None:
+            nombre_mascota = input("Nombre de la mascota: ")
+
+        with instrumentacion.medicion("historia_clinica"):
+            listado = self._listado_historia(nombre_mascota)
+            if not len(listado):
+                Mensajes.imprimir_mensaje("No hay consultas registradas para esta mascota.", salida)
+                logger.info("No se encontraron consultas para la mascota: %s", nombre_mascota)
+                return
+
+            print(f"\nHistorial clínico de {nombre_mascota}:", file=salida)
+            escribir_listado(listado, salida, tamano_pagina, pagina)
+        logger.info("Se consultó la historia clínica de la mascota: %s", nombre_mascota)
+
+    def _listado(self, clave, elementos, formato):
+        """
+        Retorna el Listado guardado con esa clave, puesto al día con `elementos`.
+        Se guardan hasta LISTADOS_EN_CACHE; al pasarse se descarta el que se
+        usó hace más tiempo.
+        """
+        listado = self._listados.pop(clave, None)
+        if listado is None:
+            listado = Listado(formato)
+            if len(self._listados) >= LISTADOS_EN_CACHE:
+                del self._listados[next(iter(self._listados))]
+        self._listados[clave] = listado
+        return listado.actualizar(elementos)
+
+    def _listado_historia(self, nombre_mascota):
+        """
+        Retorna el Listado de las consultas de las mascotas con ese nombre. Con
+        las consultas en memoria se guarda para la próxima vez, atado a la lista
+        del índice por nombre, que crece al registrar consultas.
+        """
+        if self.repositorio is not None or self._ubicaciones is not None:
+            return Listado(texto_consulta).actualizar(self.consultas_de_mascota(nombre_mascota))
+        clave = clave_busqueda(nombre_mascota)
+        consultas = self._indice("consultas", self.consultas, lambda c: c.mascota.nombre).get(clave)
+        if consultas is None:
+            return Listado(texto_consulta)
+        return self._listado(("historia", clave), consultas, texto_consulta)
         
-    def guardar_json_consultas(self):
-        datos = []
+    def conteo_objetos(self):
+        """
+        Retorna:
+            dict: Cantidad de objetos en memoria por tipo.
+        """
+        conteo = {
+            "propietarios": len(self.propietarios),
+            "mascotas": len(self.mascotas),
+            "consultas": len(self.consultas),
+            "entradas_journal": self._entradas_journal,
+        }
+        if self._ubicaciones is not None:
+            conteo["consultas_sin_cargar"] = sum(len(datos) // 2 for datos in self._ubicaciones.values())
+        return conteo
+
+    def mostrar_estadisticas(self, archivo=ARCHIVO_METRICAS):
+        """
+        Muestra las métricas de rendimiento de cada operación, las guarda en
+        formato Prometheus y permite activar o desactivar la medición.
+        """
+        Titulos.imprimir_titulo("Estadísticas de rendimiento")
+        print(f"Medición {'activada' if instrumentacion.activa else 'desactivada'}.")
+        resumen = instrumentacion.resumen()
+        if resumen:
+            print(f"{'Operación':<28}{'Llamadas':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Leídos':>12}{'Escritos':>12}")
+            for operacion, datos in resumen.items():
+                print(f"{operacion:<28}{datos['llamadas']:>9}{datos['p50_ms'] or 0:>10.3f}{datos['p95_ms'] or 0:>10.3f}"
+                      f"{datos['p99_ms'] or 0:>10.3f}{datos['bytes_leidos']:>12}{datos['bytes_escritos']:>12}")
+        print("Objetos en memoria: " + ", ".join(f"{tipo}: {cantidad}" for tipo, cantidad in self.conteo_objetos().items()))
+        try:
+            instrumentacion.guardar_prometheus(archivo, self.conteo_objetos())
+            print(f"Métricas guardadas en {archivo}")
+        except OSError as e:
+            logger.error("Error al guardar las métricas: %s", e)
+
+        accion = "Desactivar" if instrumentacion.activa else "Activar"
+        if input(f"¿{accion} la medición? (s/n): ").strip().lower() == "s":
+            instrumentacion.activa = not instrumentacion.activa
+            logger.info("Medición de rendimiento %s", "activada" if instrumentacion.activa else "desactivada")
+
+    @instrumentacion.medir
+    def guardar_json_consultas(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Reescribe el archivo JSON con todas las consultas en memoria, en formato
+        normalizado: cada propietario y mascota se escribe una vez con su id y las
+        consultas los referencian. Cada registro ocupa una línea.
+
+        Retorna:
+            bool: True si el archivo se guardó correctamente.
+        """
+        propietarios = {}
+        mascotas = {}
+        consultas = []
         for consulta in self.consultas:
-            datos.append(consulta.diccionario_Consulta())
+            mascota = consulta.mascota
+            if mascota.propietario is not None:
+                propietarios[self._asegurar_id("propietario", mascota.propietario)] = mascota.propietario
+            mascotas[self._asegurar_id("mascota", mascota)] = mascota
+            consultas.append(consulta.diccionario_normalizado())
 
+        secciones = (
+            ("propietarios", [p.diccionario_normalizado() for p in propietarios.values()]),
+            ("mascotas", [m.diccionario_normalizado() for m in mascotas.values()]),
+            ("consultas", consultas),
+        )
+        # Se escribe en un archivo temporal y se reemplaza: nadie ve un snapshot a medio escribir
+        ruta = self._ruta(archivo)
+        temporal = ruta + ".tmp"
         try:
-            with open("consultas.json", "w", encoding="utf-8") as archivo:
-                json.dump(datos, archivo, ensure_ascii=False, indent=4)
-            logging.info("Consultas guardadas en archivo JSON")
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(f'{{"version": {FORMATO_CONSULTAS}')
+                for nombre, registros in secciones:
+                    f.write(f',\n"{nombre}": [')
+                    f.write(",".join("\n" + json.dumps(r, ensure_ascii=False) for r in registros))
+                    f.write("\n]")
+                f.write("\n}\n")
+                self._sincronizar(f)
+            os.replace(temporal, ruta)
+            self._sincronizar_directorio()
+            self._firma_snapshot = self._firma(ruta)
+            instrumentacion.sumar_bytes("guardar_json_consultas", escritos=self._firma_snapshot[1])
+            logger.info("Consultas guardadas en archivo JSON")
+            self._guardar_indice_texto(archivo, forzar=True)
         except Exception as e:
-            logging.error(f"Error al guardar consultas en JSON: {e}")
+            logger.error("Error al guardar consultas en JSON: %s", e)
             print("Hubo un problema al guardar las consultas.")
+            return False
+        self._persistidos = {"propietario": set(propietarios), "mascota": set(mascotas)}
+        return True
+
+    def _asegurar_id(self, tipo, entidad):
+        """
+        Asigna el siguiente id libre a una entidad que aún no lo tiene y la registra
+        en el mapa de identidad. Retorna el id.
+        """
+        if entidad.id is None:
+            entidad.id = self._siguiente_id[tipo]
+        self._siguiente_id[tipo] = max(self._siguiente_id[tipo], entidad.id + 1)
+        self._por_id[tipo].setdefault(entidad.id, entidad)
+        return entidad.id
+
+    def _internar_propietario(self, datos):
+        """
+        Retorna el único objeto Propietario que corresponde a un registro leído:
+        primero por id y luego por nombre entre los propietarios ya cargados.
+        """
+        id_ = datos.get("id")
+        propietario = self._por_id["propietario"].get(id_)
+        if propietario is None:
+            propietario = self.buscar_propietario(datos["nombre"])
+            if propietario is None or propietario.id not in (None, id_):
+                propietario = Propietario(datos["nombre"], datos["telefono"], datos["direccion"], id_)
+                self.propietarios.append(propietario)
+        if propietario.id is None and id_ is not None:
+            propietario.id = id_
+        if propietario.id is not None:
+            self._asegurar_id("propietario", propietario)
+        return propietario
+
+    def _internar_mascota(self, datos, propietario):
+        """
+        Retorna el único objeto Mascota que corresponde a un registro leído:
+        primero por id y luego por nombre y propietario entre las mascotas cargadas.
+        Las mascotas que solo aparecen en consultas no se agregan a self.mascotas.
+        """
+        id_ = datos.get("id")
+        mascota = self._por_id["mascota"].get(id_)
+        if mascota is None:
+            clave = clave_busqueda(datos["nombre"])
+            candidatas = self._indice("mascotas", self.mascotas, lambda m: m.nombre).get(clave, [])
+            mascota = next((m for m in candidatas if m.propietario is propietario and m.id in (None, id_)), None)
+            if mascota is None:
+                historica = self._mascotas_historicas.get((clave, id(propietario)))
+                if historica is not None and historica.id in (None, id_):
+                    mascota = historica
+            if mascota is None:
+                mascota = Mascota(datos["nombre"], datos["especie"], datos["raza"], datos["edad"], propietario)
+                self._mascotas_historicas[(clave, id(propietario))] = mascota
+        if mascota.id is None and id_ is not None:
+            mascota.id = id_
+        if mascota.id is not None:
+            self._asegurar_id("mascota", mascota)
+        return mascota
+
+    def _consulta_desde_registro(self, datos):
+        """
+        Crea una Consulta a partir de un registro del archivo, en formato normalizado
+        (con "mascota_id") o en el formato anterior con la mascota embebida.
+        """
+        if "mascota_id" in datos:
+            mascota = self._por_id["mascota"][datos["mascota_id"]]
+        else:
+            self._formato_antiguo = True
+            datos_mascota = datos["mascota"]
+            propietario = self._internar_propietario(datos_mascota["propietario"])
+            mascota = self._internar_mascota(datos_mascota, propietario)
+        return Consulta(fecha_desde_texto(datos["fecha"]), datos["motivo"], datos["diagnostico"], mascota)
+
+    def _cargar_registro(self, registro):
+        """
+        Incorpora un registro del journal: propietario, mascota o consulta.
+        Las líneas sin "tipo" son consultas en el formato anterior.
+        """
+        tipo = registro.get("tipo")
+        if tipo == "propietario":
+            self._persistidos["propietario"].add(self._internar_propietario(registro).id)
+        elif tipo == "mascota":
+            propietario = self._por_id["propietario"].get(registro["propietario_id"])
+            self._persistidos["mascota"].add(self._internar_mascota(registro, propietario).id)
+        else:
+            self.consultas.append(self._consulta_desde_registro(registro))
+
+    @staticmethod
+    def _ruta_journal(archivo):
+        return os.path.splitext(archivo)[0] + ".jsonl"
+
+    def agregar_consulta_journal(self, consulta, archivo=ARCHIVO_CONSULTAS):
+        """
+        Agrega una consulta al journal como una sola línea JSON, sin reescribir
+        el historial completo. Al superar UMBRAL_COMPACTACION entradas se compacta.
+        """
+        self.agregar_consultas_journal([consulta], archivo)
+
+    @instrumentacion.medir
+    def agregar_consultas_journal(self, consultas, archivo=ARCHIVO_CONSULTAS):
+        """
+        Agrega varias consultas al journal con una sola apertura y escritura del archivo.
+        """
+        with self.bloqueo():
+            self._escribir_journal(consultas, archivo)
+
+    def _escribir_journal(self, consultas, archivo):
+        lineas = []
+        ubicaciones = []  # (mascota, posición relativa, longitud) de cada línea de consulta
+        tamano = 0
+        nuevos = {"propietario": set(), "mascota": set()}
+        for consulta in consultas:
+            registros = []
+            mascota = consulta.mascota
+            propietario = mascota.propietario
+            # El propietario y la mascota se escriben solo la primera vez que se referencian
+            if propietario is not None:
+                id_ = self._asegurar_id("propietario", propietario)
+                if id_ not in self._persistidos["propietario"] and id_ not in nuevos["propietario"]:
+                    nuevos["propietario"].add(id_)
+                    registros.append({"tipo": "propietario", **propietario.diccionario_normalizado()})
+            id_ = self._asegurar_id("mascota", mascota)
+            if id_ not in self._persistidos["mascota"] and id_ not in nuevos["mascota"]:
+                nuevos["mascota"].add(id_)
+                registros.append({"tipo": "mascota", **mascota.diccionario_normalizado()})
+            registros.append({"tipo": "consulta", **consulta.diccionario_normalizado()})
+            for registro in registros:
+                linea = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+                lineas.append(linea)
+                tamano += len(linea)
+            ubicaciones.append((mascota, tamano - len(linea), len(linea)))
 
-    
-    def cargar_json(self, archivo="consultas.json"):
         try:
-            with open(archivo, "r", encoding="utf-8") as f:
+            with open(self._ruta(self._ruta_journal(archivo)), "ab", buffering=TAMANO_BUFFER) as f:
+                inicio = f.tell()
+                f.write(b"".join(lineas))
+                self._sincronizar(f)
+            self._fin_journal = inicio + tamano
+            self._recordar_version(self._ruta_journal(archivo))
+            instrumentacion.sumar_bytes("agregar_consultas_journal", escritos=tamano)
+        except Exception as e:
+            logger.error("Error al guardar consulta en el journal: %s", e)
+            print("Hubo un problema al guardar la consulta.")
+            return
+        self._entradas_journal += len(lineas)
+        if self._ubicaciones is not None:
+            for mascota, posicion, longitud in ubicaciones:
+                self._agregar_ubicacion(mascota, 1, inicio + posicion, longitud)
+        for tipo, ids in nuevos.items():
+            self._persistidos[tipo].update(ids)
+        logger.info("%s consulta(s) agregada(s) al journal", len(ubicaciones))
+
+        # Con carga diferida no se compacta sola: obligaría a cargar todo el historial
+        if self._entradas_journal >= UMBRAL_COMPACTACION and self._ubicaciones is None:
+            self.compactar_consultas(archivo)
+
+    def _fuentes_estado(self, archivo):
+        """
+        Los archivos de los que sale el estado en memoria, con la parte ya
+        leída de cada uno: [ruta, bytes, CRC32 de esos bytes, si debe coincidir
+        completo]. Los CSV y el journal solo crecen, así que del snapshot
+        binario sirve que su contenido siga siendo el comienzo de esos archivos.
+        """
+        tamano_snapshot = self._firma_snapshot[1] if self._firma_snapshot else 0
+        journal = self._ruta_journal(archivo)
+        return [
+            [ARCHIVO_MASCOTAS, self._fin_csv, crc_archivo(self._ruta(ARCHIVO_MASCOTAS), self._fin_csv), False],
+            [archivo, tamano_snapshot, crc_archivo(self._ruta(archivo)) if self._firma_snapshot else None, True],
+            [journal, self._fin_journal, crc_archivo(self._ruta(journal), self._fin_journal), False],
+            [ARCHIVO_PROPIETARIOS, self._fin_propietarios, crc_archivo(self._ruta(ARCHIVO_PROPIETARIOS), self._fin_propietarios), False],
+        ]
+
+    @instrumentacion.medir
+    def guardar_estado_binario(self, ruta=ARCHIVO_ESTADO, archivo=ARCHIVO_CONSULTAS):
+        """
+        Guarda propietarios, mascotas, consultas e ids en un snapshot binario
+        (ver estado_binario.py), validado contra los archivos de los que salen,
+        para que el próximo inicio no tenga que analizar el CSV ni el JSON.
+        Solo incluye lo que ya está en esos archivos: un propietario agregado
+        sin mascotas ni guardar_propietario queda fuera, como al cargarlos.
+        No aplica con repositorio, con carga diferida ni con una migración pendiente.
+
+        Retorna:
+            bool: True si se guardó.
+        """
+        if self.repositorio is not None or self._ubicaciones is not None or self._formato_antiguo or self._csv_antiguo:
+            return False
+        with self.bloqueo():
+            # El snapshot se valida contra los archivos: no puede tener registros que aún no están en ellos
+            self.escribir_pendientes()
+            textos = {}
+            posiciones = {"propietario": {}, "mascota": {}}
+            tablas = {"propietario": [], "mascota": []}
+
+            def texto(valor):
+                if valor is None:
+                    return _NULO
+                if type(valor) is not str:
+                    raise TypeError(f"valor no textual: {valor!r}")
+                return textos.setdefault(valor, len(textos))
+
+            def entidad(tipo, objeto):
+                if objeto is None:
+                    return _NULO
+                posicion = posiciones[tipo].get(id(objeto))
+                if posicion is None:
+                    posicion = posiciones[tipo][id(objeto)] = len(tablas[tipo])
+                    tablas[tipo].append(objeto)
+                return posicion
+
+            try:
+                persistidos = self._propietarios_en_csv | self._persistidos["propietario"]
+                lista_propietarios = array("q", (entidad("propietario", p) for p in self.propietarios
+                                                 if p.id in persistidos))
+                lista_mascotas = array("q", (entidad("mascota", m) for m in self.mascotas))
+                historicas = array("q", (entidad("mascota", m) for m in self._mascotas_historicas.values()))
+                for m in self._por_id["mascota"].values():
+                    entidad("mascota", m)
+                consulta_mascota = array("i", (entidad("mascota", c.mascota) for c in self.consultas))
+                mascota_propietario = array("q", (entidad("propietario", m.propietario) for m in tablas["mascota"]))
+                for p in self._por_id["propietario"].values():
+                    entidad("propietario", p)
+                secciones = {
+                    "propietario_id": array("q", (_NULO if p.id is None else p.id for p in tablas["propietario"])),
+                    "propietario_nombre": array("q", (texto(p.nombre) for p in tablas["propietario"])),
+                    "propietario_telefono": array("q", (texto(p.telefono) for p in tablas["propietario"])),
+                    "propietario_direccion": array("q", (texto(p.direccion) for p in tablas["propietario"])),
+                    "mascota_id": array("q", (_NULO if m.id is None else m.id for m in tablas["mascota"])),
+                    "mascota_nombre": array("q", (texto(m.nombre) for m in tablas["mascota"])),
+                    "mascota_especie": array("q", (texto(m.especie) for m in tablas["mascota"])),
+                    "mascota_raza": array("q", (texto(m.raza) for m in tablas["mascota"])),
+                    "mascota_edad": array("q", (_NULO if m.edad is None else m.edad for m in tablas["mascota"])),
+                    "mascota_propietario": mascota_propietario,
+                    "lista_propietarios": lista_propietarios,
+                    "lista_mascotas": lista_mascotas,
+                    "mascotas_historicas": historicas,
+                    "consulta_fecha": array("i", (c.fecha.toordinal() for c in self.consultas)),
+                    "consulta_motivo": array("i", (texto(c.motivo) for c in self.consultas)),
+                    "consulta_diagnostico": array("i", (texto(c.diagnostico) for c in self.consultas)),
+                    "consulta_mascota": consulta_mascota,
+                    "persistidos_propietario": array("q", self._persistidos["propietario"]),
+                    "persistidos_mascota": array("q", self._persistidos["mascota"]),
+                    "propietarios_csv": array("q", self._propietarios_en_csv),
+                }
+            except (TypeError, OverflowError) as e:
+                logger.warning("No se guardó el snapshot binario: %s", e)
+                return False
+            lista_textos = list(textos)
+            secciones["fin_textos"] = array("q", itertools.accumulate(len(t) for t in lista_textos))
+            secciones["textos"] = array("B", "".join(lista_textos).encode("utf-8"))
+            encabezado = {
+                "fuentes": self._fuentes_estado(archivo),
+                "siguiente_id": self._siguiente_id,
+                "entradas_journal": self._entradas_journal,
+            }
+            try:
+                escribir_estado(self._ruta(ruta), encabezado, secciones)
+            except OSError as e:
+                logger.error("Error al guardar el snapshot binario: %s", e)
+                return False
+        self._ultimo_estado = time.monotonic()
+        logger.info("Snapshot binario guardado: %s consultas", len(self.consultas))
+        return True
+
+    def _guardar_estado_periodico(self):
+        if time.monotonic() - self._ultimo_estado >= INTERVALO_ESTADO:
+            self.guardar_estado_binario()
+
+    @instrumentacion.medir
+    def _cargar_estado_binario(self, ruta=ARCHIVO_ESTADO, archivo=ARCHIVO_CONSULTAS):
+        """
+        Carga el estado desde el snapshot binario si sigue correspondiendo a
+        los archivos: consultas.json idéntico y los CSV y el journal con el
+        mismo comienzo. Lo agregado después lo incorpora quien llama.
+
+        Retorna:
+            bool: False si no hay snapshot o está desactualizado; entonces se
+            cargan el CSV y el JSON.
+        """
+        try:
+            leido = leer_estado(self._ruta(ruta))
+        except (OSError, ValueError) as e:
+            logger.warning("Snapshot binario ilegible: %s", e)
+            return False
+        if leido is None:
+            return False
+        encabezado, secciones = leido
+        fuentes = encabezado["fuentes"]
+        if [fuente[0] for fuente in fuentes] != [ARCHIVO_MASCOTAS, archivo, self._ruta_journal(archivo), ARCHIVO_PROPIETARIOS]:
+            return False
+        for ruta_fuente, tamano, crc, completo in fuentes:
+            if completo and self._tamano(self._ruta(ruta_fuente)) != tamano:
+                return False
+            if (tamano or completo) and crc_archivo(self._ruta(ruta_fuente), tamano) != crc:
+                logger.info("Snapshot binario desactualizado respecto de %s, se cargan los archivos", ruta_fuente)
+                return False
+
+        fin_textos = secciones["fin_textos"]
+        todo = secciones["textos"].tobytes().decode("utf-8")
+        textos = [todo[inicio:fin] for inicio, fin in zip(itertools.chain((0,), fin_textos), fin_textos)]
+
+        def texto(i):
+            return None if i == _NULO else textos[i]
+
+        # Se pausa el recolector de ciclos: con cada lote de objetos nuevos recorrería todos los ya creados
+        recolector_activo = gc.isenabled()
+        gc.disable()
+        try:
+            propietarios = [
+                Propietario(texto(nombre), texto(telefono), texto(direccion), None if id_ == _NULO else id_)
+                for id_, nombre, telefono, direccion in zip(
+                    secciones["propietario_id"], secciones["propietario_nombre"],
+                    secciones["propietario_telefono"], secciones["propietario_direccion"])
+            ]
+            mascotas = [
+                Mascota(texto(nombre), texto(especie), texto(raza), None if edad == _NULO else edad,
+                        None if propietario == _NULO else propietarios[propietario], None if id_ == _NULO else id_)
+                for id_, nombre, especie, raza, edad, propietario in zip(
+                    secciones["mascota_id"], secciones["mascota_nombre"], secciones["mascota_especie"],
+                    secciones["mascota_raza"], secciones["mascota_edad"], secciones["mascota_propietario"])
+            ]
+            ordinales = secciones["consulta_fecha"]
+            fechas = {ordinal: fecha_compacta(date.fromordinal(ordinal)) for ordinal in set(ordinales)}
+            self.consultas = list(map(Consulta, map(fechas.__getitem__, ordinales),
+                                      map(texto, secciones["consulta_motivo"]),
+                                      map(texto, secciones["consulta_diagnostico"]),
+                                      map(mascotas.__getitem__, secciones["consulta_mascota"])))
+        finally:
+            if recolector_activo:
+                gc.enable()
+        self.propietarios = [propietarios[i] for i in secciones["lista_propietarios"]]
+        self.mascotas = [mascotas[i] for i in secciones["lista_mascotas"]]
+        for tipo, entidades in (("propietario", propietarios), ("mascota", mascotas)):
+            for entidad in entidades:
+                if entidad.id is not None:
+                    self._por_id[tipo].setdefault(entidad.id, entidad)
+        self._mascotas_historicas = {
+            (clave_busqueda(mascotas[i].nombre), id(mascotas[i].propietario)): mascotas[i]
+            for i in secciones["mascotas_historicas"]
+        }
+        self._persistidos = {"propietario": set(secciones["persistidos_propietario"]),
+                             "mascota": set(secciones["persistidos_mascota"])}
+        self._siguiente_id = encabezado["siguiente_id"]
+        self._entradas_journal = encabezado["entradas_journal"]
+        self._fin_csv = fuentes[0][1]
+        self._firma_snapshot = self._firma(self._ruta(archivo))
+        self._fin_journal = fuentes[2][1]
+        self._fin_propietarios = fuentes[3][1]
+        self._propietarios_en_csv = set(secciones["propietarios_csv"])
+        for nombre in (ARCHIVO_MASCOTAS, ARCHIVO_PROPIETARIOS, self._ruta_journal(archivo)):
+            self._recordar_version(nombre)
+        logger.info("Estado cargado del snapshot binario: %s mascotas, %s consultas", len(self.mascotas), len(self.consultas))
+        return True
+
+    @instrumentacion.medir
+    def compactar_consultas(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Integra el journal en el archivo JSON (snapshot) y lo vacía.
+        El journal solo se borra si el snapshot se escribió correctamente.
+        Con carga diferida, primero se cargan todas las consultas.
+        """
+        with self.bloqueo():
+            if self._ubicaciones is None:
+                self._consultas_pendientes = []  # Ya están en self.consultas: van en el snapshot
+            self.escribir_pendientes()
+            self.cargar_consultas_pendientes(archivo)
+            if self._snapshot_danado:
+                logger.error("No se compacta sobre el snapshot dañado %s", self._ruta(archivo))
+                return
+            if not self.guardar_json_consultas(archivo):
+                return
+            try:
+                os.remove(self._ruta(self._ruta_journal(archivo)))
+            except FileNotFoundError:
+                pass
+            self._entradas_journal = 0
+            self._fin_journal = 0
+            self._recordar_version(self._ruta_journal(archivo))
+            self._formato_antiguo = False  # Ya no quedan consultas en el formato anterior
+        logger.info("Journal de consultas compactado")
+
+    @instrumentacion.medir
+    def _leer_journal(self, archivo, desde=0):
+        """
+        Incorpora los registros del journal a partir del byte `desde`. Con carga
+        diferida, de las consultas solo se registra su ubicación. Una última línea
+        incompleta (p. ej. por un cierre inesperado) se descarta y se recorta del
+        archivo para que la siguiente entrada quede en su propia línea.
+
+        Retorna:
+            bool: False si hay líneas en el formato anterior y la carga es diferida.
+        """
+        ruta = self._ruta(self._ruta_journal(archivo))
+        if desde == 0:
+            self._entradas_journal = 0
+        try:
+            f = open(ruta, "rb")
+        except FileNotFoundError:
+            self._fin_journal = 0
+            self._recordar_version(self._ruta_journal(archivo))
+            return True
+        with f:
+            f.seek(desde)
+            inicio = desde
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    logger.warning("Línea incompleta al final del journal, se descarta")
+                    os.truncate(ruta, inicio)
+                    break
+                registro = linea.rstrip(b"\r\n")
+                if registro:
+                    try:
+                        if self._ubicaciones is None:
+                            self._cargar_registro(json.loads(registro))
+                        elif registro.startswith(b'{"tipo": "consulta"'):
+                            mascota_id = int(_PATRON_MASCOTA_ID.search(registro).group(1))
+                            self._agregar_ubicacion(self._por_id["mascota"][mascota_id], 1, inicio, len(registro))
+                        elif registro.startswith(b'{"tipo": "'):
+                            self._cargar_registro(json.loads(registro))
+                        else:
+                            return False
+                        self._entradas_journal += 1
+                    except (ValueError, KeyError) as e:
+                        logger.warning("Línea del journal descartada: %s", e)
+                inicio += len(linea)
+        self._fin_journal = inicio
+        self._recordar_version(self._ruta_journal(archivo))
+        instrumentacion.sumar_bytes("leer_journal", leidos=inicio - desde)
+        if desde == 0:
+            logger.info("Journal reproducido: %s registros.", self._entradas_journal)
+        return True
+
+    def cargar_consultas_pendientes(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Si las consultas se cargaron de forma diferida, las carga todas en
+        self.consultas y el sistema pasa a trabajar en memoria.
+        """
+        if self._ubicaciones is not None:
+            self.escribir_pendientes()
+            self._ubicaciones = None
+            self._ids_por_nombre = {}
+            self.cargar_json(archivo)
+
+    def _agregar_ubicacion(self, mascota, archivo, inicio, longitud):
+        ubicaciones = self._ubicaciones.get(mascota.id)
+        if ubicaciones is None:
+            ubicaciones = self._ubicaciones[mascota.id] = array("q")
+            self._ids_por_nombre.setdefault(clave_busqueda(mascota.nombre), []).append(mascota.id)
+        ubicaciones.append((archivo << _BITS_DESPLAZAMIENTO) | inicio)
+        ubicaciones.append(longitud)
+
+    @instrumentacion.medir
+    def _indexar_consultas(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Carga diferida: interna propietarios y mascotas del snapshot y del journal,
+        pero de cada consulta solo guarda en qué archivo y bytes está, sin
+        decodificarla. Si algún archivo está en el formato anterior, se hace la
+        carga completa (que además lo migra).
+        """
+        self._ubicaciones = {}
+        self._ids_por_nombre = {}
+        self._persistidos = {"propietario": set(), "mascota": set()}
+        self._entradas_journal = 0
+        self._rutas_diferidas = (self._ruta(archivo), self._ruta(self._ruta_journal(archivo)))
+        self._firma_snapshot = self._firma(self._ruta(archivo))
+        try:
+            if not (self._indexar_snapshot(self._ruta(archivo)) and self._leer_journal(archivo)):
+                logger.info("Consultas en formato anterior, se cargan completas")
+                self._ubicaciones = None
+                self._ids_por_nombre = {}
+                self.cargar_json(archivo)
+                self._formato_antiguo = True
+                return
+        except Exception as e:
+            # Se cargan completas: así el journal se reproduce y el snapshot dañado se aparta
+            logger.error("Error al indexar consultas: %s", e)
+            self._ubicaciones = None
+            self._ids_por_nombre = {}
+            self.cargar_json(archivo)
+            return
+        logger.info("Consultas indexadas para carga diferida: %s mascotas.", len(self._ubicaciones))
+
+    def _indexar_snapshot(self, ruta):
+        """
+        Registra las consultas del snapshot sin decodificarlas: cada registro
+        ocupa una línea dentro de su sección. Retorna False si el archivo no
+        tiene ese formato.
+        """
+        try:
+            f = open(ruta, "rb")
+        except FileNotFoundError:
+            return True
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                if datos[:13] != b'{"version": 2':
+                    return False
+                instrumentacion.sumar_bytes("indexar_consultas", leidos=len(datos))
+                inicio_consultas = datos.find(b'\n"consultas": [')
+                if inicio_consultas < 0 or datos[-5:] != b"\n]\n}\n":
+                    raise ValueError(f"snapshot incompleto: {ruta}")
+                # Propietarios y mascotas son pocos: se internan completos
+                seccion = None
+                for linea in datos[:inicio_consultas].split(b"\n"):
+                    registro = linea.rstrip(b",\r")
+                    if registro.startswith(b'"'):
+                        seccion = registro
+                    elif registro.startswith(b"{") and seccion is not None:
+                        self._internar_registro(seccion, json.loads(registro))
+                # De las consultas solo se guarda su posición, con una búsqueda sobre el archivo mapeado
+                mascotas = self._por_id["mascota"]
+                for encontrada in _PATRON_CONSULTA.finditer(datos, inicio_consultas):
+                    inicio, fin = encontrada.span()
+                    self._agregar_ubicacion(mascotas[int(encontrada.group(1))], 0, inicio, fin - inicio)
+        return True
+
+    def _internar_registro(self, tipo, datos):
+        """
+        Interna un propietario o una mascota leídos de la sección o línea de ese tipo.
+        """
+        if b"propietario" in tipo:
+            self._persistidos["propietario"].add(self._internar_propietario(datos).id)
+        elif b"mascota" in tipo:
+            propietario = self._por_id["propietario"].get(datos["propietario_id"])
+            self._persistidos["mascota"].add(self._internar_mascota(datos, propietario).id)
+
+    def _leer_consultas_diferidas(self, nombre_mascota):
+        """
+        Lee y decodifica desde disco solo las consultas de las mascotas con ese nombre.
+        Se hace con el bloqueo tomado, por si otro proceso compactó los archivos.
+        """
+        with self.bloqueo():
+            self.escribir_pendientes()
+            if self._ubicaciones is None:
+                return self.consultas_de_mascota(nombre_mascota)
+            return self._leer_ubicaciones(nombre_mascota)
+
+    def _leer_ubicaciones(self, nombre_mascota):
+        ubicaciones = []
+        for mascota_id in self._ids_por_nombre.get(clave_busqueda(nombre_mascota), []):
+            datos = self._ubicaciones[mascota_id]
+            ubicaciones.extend(zip(datos[::2], datos[1::2]))
+        ubicaciones.sort()  # Orden de registro: snapshot y luego journal, cada uno por posición
+
+        consultas = []
+        archivos = {}
+        try:
+            for ubicacion, longitud in ubicaciones:
+                numero_archivo = ubicacion >> _BITS_DESPLAZAMIENTO
+                if numero_archivo not in archivos:
+                    archivos[numero_archivo] = open(self._rutas_diferidas[numero_archivo], "rb")
+                f = archivos[numero_archivo]
+                f.seek(ubicacion & ((1 << _BITS_DESPLAZAMIENTO) - 1))
+                consultas.append(self._consulta_desde_registro(json.loads(f.read(longitud))))
+        finally:
+            for f in archivos.values():
+                f.close()
+        instrumentacion.sumar_bytes("consultas_de_mascota", leidos=sum(longitud for _, longitud in ubicaciones))
+        return consultas
+
+    @instrumentacion.medir
+    def cargar_json(self, archivo=ARCHIVO_CONSULTAS):
+        """
+        Carga el snapshot de consultas y luego reproduce su journal, si existe.
+        Acepta el formato normalizado y la lista con mascotas embebidas; en ambos
+        casos las mascotas y propietarios se enlazan a los objetos ya cargados.
+        Un snapshot que no se puede leer se aparta (ver _apartar_danado) y el
+        journal se reproduce igual.
+        """
+        self._firma_snapshot = self._firma(self._ruta(archivo))
+        try:
+            with open(self._ruta(archivo), "r", encoding="utf-8") as f:
                 datos = json.load(f)
-                self.consultas = [Consulta.from_dict(item) for item in datos]
-            logging.info("Consultas cargadas desde archivo JSON.")
+                instrumentacion.sumar_bytes("cargar_json", leidos=os.fstat(f.fileno()).st_size)
+            self._persistidos = {"propietario": set(), "mascota": set()}
+            if isinstance(datos, list):
+                self.consultas = [self._consulta_desde_registro(item) for item in datos]
+            else:
+                for registro in datos["propietarios"]:
+                    self._persistidos["propietario"].add(self._internar_propietario(registro).id)
+                for registro in datos["mascotas"]:
+                    propietario = self._por_id["propietario"].get(registro["propietario_id"])
+                    self._persistidos["mascota"].add(self._internar_mascota(registro, propietario).id)
+                self.consultas = [self._consulta_desde_registro(item) for item in datos["consultas"]]
+            logger.info("Consultas cargadas desde archivo JSON.")
         except FileNotFoundError:
-            logging.warning("Archivo JSON no encontrado.")
+            logger.warning("Archivo JSON no encontrado.")
             self.consultas = []
         except Exception as e:
-            logging.error(f"Error al cargar JSON: {e}")
+            logger.error("Error al cargar JSON: %s", e)
             self.consultas = []
+            self._persistidos = {"propietario": set(), "mascota": set()}
+            self._apartar_danado(archivo)
 
-    def guardar_mascotas_csv(self, mascota):
         try:
-            with open("mascotas.csv", "a", newline='', encoding="utf-8") as archivo:
+            self._leer_journal(archivo)
+        except Exception as e:
+            logger.error("Error al cargar el journal de consultas: %s", e)
+
+    def _apartar_danado(self, archivo):
+        """
+        Renombra un snapshot de consultas que no se pudo leer a
+        <archivo>.corrupto y guarda una copia de su journal como
+        <journal>.corrupto, para que la próxima compactación no reemplace ni
+        borre datos que todavía se podrían recuperar a mano.
+        """
+        ruta = self._ruta(archivo)
+        journal = self._ruta(self._ruta_journal(archivo))
+        for numero in itertools.count():  # Sin pisar copias de un daño anterior
+            sufijo = ".corrupto" if numero == 0 else f".corrupto.{numero}"
+            if not (os.path.exists(ruta + sufijo) or os.path.exists(journal + sufijo)):
+                break
+        try:
+            if os.path.exists(journal):
+                shutil.copyfile(journal, journal + sufijo)
+            os.replace(ruta, ruta + sufijo)
+            self._sincronizar_directorio()
+        except OSError as e:
+            logger.error("No se pudo apartar el snapshot dañado %s: %s", ruta, e)
+            self._snapshot_danado = True
+            return
+        self._firma_snapshot = self._firma(ruta)
+        logger.warning("Snapshot dañado apartado como %s%s", ruta, sufijo)
+
+    @instrumentacion.medir
+    def guardar_mascotas_csv(self, *mascotas):
+        """
+        Agrega una o varias mascotas al final de mascotas.csv con una sola apertura
+        del archivo, asignándoles id si aún no lo tienen. Sus propietarios que aún no están en propietarios.csv se
+        agregan antes, para que quien lea la fila ya encuentre al propietario.
+        """
+        try:
+            nuevos = {id(m.propietario): m.propietario for m in mascotas
+                      if m.propietario is not None and m.propietario.id not in self._propietarios_en_csv}
+            if nuevos:
+                self._escribir_propietarios_csv(nuevos.values())
+            for mascota in mascotas:
+                self._asegurar_id("mascota", mascota)
+            with open(self._ruta(ARCHIVO_MASCOTAS), "a", newline='', encoding="utf-8", buffering=TAMANO_BUFFER) as archivo:
                 writer = csv.writer(archivo)
-                writer.writerow([
-                    mascota.nombre,
-                    mascota.especie,
-                    mascota.raza,
-                    mascota.edad,
-                    mascota.propietario.nombre,
-                    mascota.propietario.telefono,
-                    mascota.propietario.direccion
-                ])
-            logging.info(f"Mascota {mascota.nombre} guardada en archivo CSV")
+                if archivo.tell() == 0:
+                    writer.writerow(CAMPOS_MASCOTAS)
+                writer.writerows(map(self._fila_mascota, mascotas))
+                self._sincronizar(archivo)
+            self._fin_csv, antes = self._tamano(self._ruta(ARCHIVO_MASCOTAS)), self._fin_csv
+            self._recordar_version(ARCHIVO_MASCOTAS)
+            instrumentacion.sumar_bytes("guardar_mascotas_csv", escritos=self._fin_csv - antes)
+            if len(mascotas) == 1:
+                logger.info("Mascota %s guardada en archivo CSV", mascotas[0].nombre)
+            else:
+                logger.info("%s mascotas guardadas en archivo CSV", len(mascotas))
         except Exception as e:
-            logging.error(f"Error al guardar mascota en CSV: {e}")
+            logger.error("Error al guardar mascota en CSV: %s", e)
             print("Hubo un problema al guardar la mascota.")
 
-    def _cargar_mascotas_duenos_csv(self):
+    @staticmethod
+    def _fila_mascota(mascota):
+        return [mascota.id, mascota.nombre, mascota.especie, mascota.raza, mascota.edad,
+                mascota.propietario.id if mascota.propietario else ""]
+
+    @staticmethod
+    def _fila_propietario(propietario):
+        return [propietario.id, propietario.nombre, propietario.telefono, propietario.direccion]
+
+    def _escribir_propietarios_csv(self, propietarios):
         """
-        Carga mascotas y propietarios desde el archivo 'mascotas.csv'.
+        Agrega los propietarios al final de propietarios.csv, asignándoles id si
+        aún no lo tienen. Los errores los maneja quien llama.
         """
+        propietarios = list(propietarios)
+        for propietario in propietarios:
+            self._asegurar_id("propietario", propietario)
+        with open(self._ruta(ARCHIVO_PROPIETARIOS), "a", newline='', encoding="utf-8", buffering=TAMANO_BUFFER) as archivo:
+            csv.writer(archivo).writerows(map(self._fila_propietario, propietarios))
+            self._sincronizar(archivo)
+        self._fin_propietarios, antes = self._tamano(self._ruta(ARCHIVO_PROPIETARIOS)), self._fin_propietarios
+        self._recordar_version(ARCHIVO_PROPIETARIOS)
+        instrumentacion.sumar_bytes("guardar_propietarios_csv", escritos=self._fin_propietarios - antes)
+        self._propietarios_en_csv.update(propietario.id for propietario in propietarios)
+
+    def _mascotas_csv_con_encabezado(self):
+        """Indica si mascotas.csv empieza con CAMPOS_MASCOTAS (o todavía no existe)."""
+        try:
+            with open(self._ruta(ARCHIVO_MASCOTAS), newline="", encoding="utf-8") as f:
+                primera = next(csv.reader(f), None)
+        except FileNotFoundError:
+            return True
+        return primera is None or primera == CAMPOS_MASCOTAS
+
+    @staticmethod
+    def _reescribir_csv(ruta, filas, encabezado=None):
+        """
+        Reescribe un CSV completo en un temporal y lo reemplaza. Retorna su tamaño.
+        """
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", newline='', encoding="utf-8", buffering=TAMANO_BUFFER) as archivo:
+            writer = csv.writer(archivo)
+            if encabezado is not None:
+                writer.writerow(encabezado)
+            writer.writerows(filas)
+        os.replace(temporal, ruta)
+        return os.path.getsize(ruta)
+
+    def _migrar_mascotas_csv(self):
+        """
+        Pasa mascotas.csv de los formatos anteriores (con los datos del
+        propietario en cada fila, o sin el id de la mascota y sin encabezado)
+        al actual: encabezado, id de la mascota e id de su propietario en
+        propietarios.csv. Se hace después de cargar las consultas, para que
+        mascotas y propietarios conserven los ids que ya tienen en
+        consultas.json; desde entonces se reconocen por id y no por nombre.
+
+        Primero se reemplaza propietarios.csv y después mascotas.csv: si se
+        interrumpe, las filas antiguas se siguen leyendo y se migran al
+        próximo inicio.
+        """
+        logger.info("Migrando mascotas.csv al formato con propietarios.csv")
+        propietarios = {id(p): p for p in self.propietarios}
+        propietarios.update((id(m.propietario), m.propietario) for m in self.mascotas if m.propietario is not None)
+        for propietario in propietarios.values():
+            self._asegurar_id("propietario", propietario)
+        for mascota in self.mascotas:
+            self._asegurar_id("mascota", mascota)
+        try:
+            fin_propietarios = self._reescribir_csv(self._ruta(ARCHIVO_PROPIETARIOS), map(self._fila_propietario, propietarios.values()))
+            self._propietarios_en_csv = {p.id for p in propietarios.values()}
+            self._fin_propietarios = fin_propietarios
+            self._fin_csv = self._reescribir_csv(self._ruta(ARCHIVO_MASCOTAS), map(self._fila_mascota, self.mascotas),
+                                                 CAMPOS_MASCOTAS)
+            self._recordar_version(ARCHIVO_PROPIETARIOS)
+            self._recordar_version(ARCHIVO_MASCOTAS)
+        except OSError as e:
+            logger.error("Error al migrar mascotas.csv: %s", e)
+            return
+        self._csv_antiguo = False
+
+    @instrumentacion.medir
+    def _cargar_mascotas_duenos_csv(self, desde=0, desde_propietarios=0):
+        """
+        Carga propietarios desde 'propietarios.csv' y mascotas desde
+        'mascotas.csv', a partir de los bytes `desde_propietarios` y `desde`
+        (las filas anteriores ya están cargadas). Una fila de un propietario
+        ya cargado actualiza sus datos. Las mascotas se internan por id; las
+        filas de los formatos anteriores, sin id (y algunas con los datos del
+        propietario, que se reconoce por nombre), quedan para migrar.
+        """
+        leidos = 0
         try:
-            with open("mascotas.csv", mode="r", encoding="utf-8") as archivo:
+            with open(self._ruta(ARCHIVO_PROPIETARIOS), mode="rb") as binario:
+                binario.seek(desde_propietarios)
+                archivo = io.TextIOWrapper(binario, encoding="utf-8", newline="")
+                por_id = self._por_id["propietario"]
+                for fila in csv.reader(archivo):
+                    if len(fila) != 4 or not fila[0].isdigit():
+                        continue  # Evita filas corruptas
+                    id_ = int(fila[0])
+                    propietario = por_id.get(id_)
+                    if propietario is None:
+                        propietario = Propietario(fila[1], fila[2], fila[3], id_)
+                        self._asegurar_id("propietario", propietario)
+                        self.propietarios.append(propietario)
+                    else:
+                        propietario.telefono, propietario.direccion = fila[2], fila[3]
+                    self._propietarios_en_csv.add(id_)
+                self._fin_propietarios = os.fstat(binario.fileno()).st_size
+                self._recordar_version(ARCHIVO_PROPIETARIOS)
+                leidos += self._fin_propietarios - desde_propietarios
+        except FileNotFoundError:
+            pass  # Sin propietarios.csv: datos en el formato anterior o sistema nuevo
+        try:
+            with open(self._ruta(ARCHIVO_MASCOTAS), mode="rb") as binario:
+                binario.seek(desde)
+                archivo = io.TextIOWrapper(binario, encoding="utf-8", newline="")
                 reader = csv.reader(archivo)
+                por_id = self._por_id["propietario"]
+                mascotas_por_id = self._por_id["mascota"]
+                if desde == 0:
+                    primera = next(reader, None)
+                    if primera is not None and primera != CAMPOS_MASCOTAS:
+                        self._csv_antiguo = True
+                        reader = itertools.chain([primera], reader)
                 for fila in reader:
-                    if len(fila) != 7:
+                    if len(fila) == 6:
+                        if not fila[0].isdigit():
+                            continue  # Evita filas corruptas
+                        id_, nombre_m, especie, raza, edad, propietario_id = fila
+                        mascota = mascotas_por_id.get(int(id_))
+                        if mascota is None:
+                            propietario = por_id.get(int(propietario_id)) if propietario_id.isdigit() else None
+                            mascota = Mascota(nombre_m, especie, raza, int(edad), propietario, int(id_))
+                            self._asegurar_id("mascota", mascota)
+                        self.mascotas.append(mascota)
+                        continue
+                    if len(fila) == 5:
+                        nombre_m, especie, raza, edad, propietario_id = fila
+                        propietario = por_id.get(int(propietario_id)) if propietario_id.isdigit() else None
+                        self._csv_antiguo = True
+                    elif len(fila) == 7:
+                        nombre_m, especie, raza, edad, nombre_p, telefono, direccion = fila
+                        propietario = self.buscar_propietario(nombre_p)
+                        if not propietario:
+                            propietario = Propietario(nombre_p, telefono, direccion)
+                            self.propietarios.append(propietario)
+                        self._csv_antiguo = True
+                    else:
                         continue  # Evita filas corruptas
-                    nombre_m, especie, raza, edad, nombre_p, telefono, direccion = fila
-                    propietario = self.buscar_propietario(nombre_p)
-                    if not propietario:
-                        propietario = Propietario(nombre_p, telefono, direccion)
-                        self.propietarios.append(propietario)
                     mascota = Mascota(nombre_m, especie, raza, int(edad), propietario)
                     self.mascotas.append(mascota)
-            logging.info("Mascotas cargadas desde el archivo CSV.")
+                self._fin_csv = os.fstat(binario.fileno()).st_size
+                self._recordar_version(ARCHIVO_MASCOTAS)
+                leidos += self._fin_csv - desde
+            logger.info("Mascotas cargadas desde el archivo CSV.")
         except FileNotFoundError:
-            logging.warning("Archivo 'mascotas.csv' no encontrado.")
+            logger.warning("Archivo 'mascotas.csv' no encontrado.")
+        instrumentacion.sumar_bytes("cargar_mascotas_duenos_csv", leidos=leidos)
 
 
-def main():
+def main(argv=None):
     """
     Función principal que lanza el menú interactivo del sistema veterinario.
     """
-    logging.info("Se inició la aplicación")
-    sistema=SistemaVeterinaria() #Con esto nos aseguramos de usar la clase SistemaVet que tiene todas las funciones del codigo
+    parser = argparse.ArgumentParser(description="Sistema de la veterinaria Amigos Peludos")
+    parser.add_argument("--sqlite", metavar="RUTA", help="usar una base de datos SQLite en lugar de los archivos CSV/JSON")
+    parser.add_argument("--carga-diferida", action="store_true", help="leer cada historia clínica solo cuando se consulta")
+    parser.add_argument("--sucursales", nargs="+", metavar="DIRECTORIO", help="trabajar con los datos de varias sucursales, uno por directorio")
+    parser.add_argument("--sucursal", metavar="DIRECTORIO", help="sucursal donde se registran los datos nuevos (por defecto la primera)")
+    parser.add_argument("--lote-escritura", type=int, default=1, metavar="N", help="escribir los registros nuevos en lotes de N")
+    parser.add_argument("--intervalo-escritura", type=float, default=INTERVALO_ESCRITURA, metavar="SEGUNDOS",
+                        help="tiempo máximo que un registro espera su lote")
+    parser.add_argument("--durabilidad", choices=DURABILIDADES, default="flush", help="qué se garantiza de cada lote escrito")
+    parser.add_argument("--nivel-log", choices=NIVELES_LOG, help="nivel mínimo del log (por defecto INFO o VETERINARIA_LOG_NIVEL)")
+    parser.add_argument("--metricas", action="store_true", help="medir el rendimiento de cada operación desde el inicio")
+    subcomandos = parser.add_subparsers(dest="comando")
+    importar = subcomandos.add_parser("importar", help="importar propietarios, mascotas y consultas desde archivos .csv/.json/.jsonl")
+    importar.add_argument("--propietarios", metavar="ARCHIVO")
+    importar.add_argument("--mascotas", metavar="ARCHIVO")
+    importar.add_argument("--consultas", metavar="ARCHIVO")
+    paginado = argparse.ArgumentParser(add_help=False)
+    paginado.add_argument("--tamano-pagina", type=entero_positivo, metavar="N", help="elementos por página")
+    paginado.add_argument("--pagina", type=entero_positivo, metavar="N", help="mostrar solo esa página")
+    paginado.add_argument("--salida", metavar="ARCHIVO", help="escribir el listado en un archivo en lugar de la consola")
+    subcomandos.add_parser("listar", parents=[paginado], help="listar las mascotas registradas")
+    historia = subcomandos.add_parser("historia", parents=[paginado], help="mostrar la historia clínica de una mascota")
+    historia.add_argument("mascota")
+    censo = subcomandos.add_parser("censo", help="estadísticas de la clínica exportadas a CSV")
+    censo.add_argument("--directorio", default=".", help="dónde escribir los reportes CSV")
+    args = parser.parse_args(argv)
+
+    configurar_logging(nivel=args.nivel_log)
+    instrumentacion.activa = instrumentacion.activa or args.metricas
+    logger.info("Se inició la aplicación")
+    escritura = dict(lote_escritura=args.lote_escritura, intervalo_escritura=args.intervalo_escritura,
+                     durabilidad=args.durabilidad)
+    repositorio = None
+    if args.sqlite:
+        from almacenamiento_sqlite import RepositorioSQLite
+        repositorio = RepositorioSQLite(args.sqlite)
+    elif args.sucursales:
+        from sucursales import RepositorioSucursales
+        # Las sucursales escriben en sus procesos trabajadores, cada una con su buffer de escritura
+        repositorio = RepositorioSucursales(args.sucursales, args.sucursal, carga_diferida=args.carga_diferida, **escritura)
+    sistema=SistemaVeterinaria(repositorio=repositorio, carga_diferida=args.carga_diferida, **escritura) #Con esto nos aseguramos de usar la clase SistemaVet que tiene todas las funciones del codigo
+
+    if args.comando == "importar":
+        try:
+            registros = [leer_registros(ruta, tipo) if ruta else ()
+                         for ruta, tipo in ((args.propietarios, "propietarios"), (args.mascotas, "mascotas"),
+                                            (args.consultas, "consultas"))]
+        except (OSError, ValueError) as e:
+            detener_logging()
+            parser.error(str(e))
+        resumen = sistema.importar_registros(*registros)
+        sistema.cerrar()
+        print(f"Importados {resumen['propietarios']} propietarios, {resumen['mascotas']} mascotas y {resumen['consultas']} consultas.")
+        for error in resumen["errores"]:
+            print(f" * {error}")
+        detener_logging()
+        return
+    if args.comando == "censo":
+        sistema.reporte_censo(args.directorio)
+        detener_logging()
+        return
+    if args.comando in ("listar", "historia"):
+        try:
+            with open(args.salida, "w", encoding="utf-8") if args.salida else nullcontext() as salida:
+                if args.comando == "listar":
+                    sistema.listar_mascotas(salida, args.tamano_pagina, args.pagina)
+                else:
+                    sistema.historia_clinica(args.mascota, salida, args.tamano_pagina, args.pagina)
+        except ValueError as e:  # Página fuera del listado
+            detener_logging()
+            parser.error(str(e))
+        detener_logging()
+        return
     while True:
+        # Mientras se espera la opción no se revisa el intervalo: el buffer se escribe antes de preguntar
+        sistema.escribir_pendientes()
+        sistema.recargar_cambios()  # Lo que registraron otros puestos mientras tanto
         Titulos.imprimir_titulo("Bienvenido al sistema de la veterinaria Amigos Peludos")
         
         print("1. Registrar mascota")
@@ -358,6 +2454,13 @@ def main():
         print("3. Lista de mascotas")
         print("4. Historia clinica de mascota")
         print("5. Salir del sistema")
+        print("6. Estadísticas de rendimiento")
+        print("7. Consultas entre fechas")
+        print("8. Visitas por mes y especie")
+        print("9. Última visita de cada mascota")
+        print("10. Buscar consultas por motivo o diagnóstico")
+        print("11. Actualizar datos de un propietario")
+        print("12. Estadísticas de la clínica")
         
         Mensajes.imprimir_mensaje("¿En qué podemos ayudarlo? Elija un número: ")
         opcion = input("> ")
@@ -367,13 +2470,31 @@ def main():
         elif opcion == '2':
             sistema.registrar_consulta()
         elif opcion == '3':
-            sistema.listar_mascotas()
+            sistema.listar_mascotas(tamano_pagina=TAMANO_PAGINA)
         elif opcion == '4':
-            sistema.historia_clinica()
+            sistema.historia_clinica(tamano_pagina=TAMANO_PAGINA)
         elif opcion == '5':
+            sistema.cerrar()
+            if instrumentacion.activa:
+                instrumentacion.guardar_prometheus(objetos=sistema.conteo_objetos())
             print("¡Gracias por usar el sistema! Hasta luego.")
-            logging.info("Se cerró la aplicación")
+            logger.info("Se cerró la aplicación")
+            detener_logging()
             break
+        elif opcion == '6':
+            sistema.mostrar_estadisticas()
+        elif opcion == '7':
+            sistema.reporte_consultas_entre()
+        elif opcion == '8':
+            sistema.reporte_visitas_por_mes()
+        elif opcion == '9':
+            sistema.reporte_ultimas_visitas()
+        elif opcion == '10':
+            sistema.reporte_busqueda()
+        elif opcion == '11':
+            sistema.actualizar_datos_propietario()
+        elif opcion == '12':
+            sistema.reporte_censo()
         else:
             print("Opción inválida. Intente nuevamente.")
 
@@ -0,0 +1,348 @@
+"""
+Varias sucursales de la clínica, cada una con su propio directorio de datos
+(propietarios.csv, mascotas.csv, consultas.json...), consultadas como una sola
+red.
+
+RepositorioSucursales es un repositorio de SistemaVeterinaria: cada sucursal
+se carga en un SistemaVeterinaria propio, dentro de un pool de procesos
+trabajadores (uno por núcleo, con varias sucursales cada uno si hay más
+sucursales que núcleos). Las sucursales se cargan en paralelo y cada búsqueda
+se envía a la vez a todos los trabajadores y se combinan los resultados, así
+que los tiempos dependen de sucursales / núcleos y no de la cantidad de
+sucursales.
+
+Las escrituras van a la sucursal activa. Un propietario se reconoce por
+nombre en cada sucursal, como en buscar_propietario; una mascota que se
+atiende en una sucursal que no es la suya se registra también allí.
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+
+from sprint7 import Mascota, Propietario, SistemaVeterinaria, clave_busqueda
+
+logger = logging.getLogger(__name__)
+
+ESPERA_PEDIDO = 0.5  # Segundos que un trabajador espera un pedido antes de revisar su buffer de escritura
+
+
+def _propietario_local(sistema, propietario):
+    """El propietario con ese nombre en la sucursal; si no está, se agrega."""
+    if propietario is None:
+        return None
+    local = sistema.buscar_propietario(propietario.nombre)
+    if local is None:
+        local = Propietario(propietario.nombre, propietario.telefono, propietario.direccion)
+        sistema.agregar_propietario(local)
+    return local
+
+
+def _agregar_propietario(sistema, propietario):
+    # Sin mascotas que lo lleven a los archivos: se guarda de inmediato
+    if sistema.buscar_propietario(propietario.nombre) is None:
+        sistema.guardar_propietario(Propietario(propietario.nombre, propietario.telefono, propietario.direccion))
+
+
+def _agregar_mascota(sistema, mascota):
+    # Los ids son de cada sucursal: la copia recibida se registra como mascota nueva
+    sistema.agregar_mascota(Mascota(mascota.nombre, mascota.especie, mascota.raza, mascota.edad,
+                                    _propietario_local(sistema, mascota.propietario)))
+
+
+def _agregar_consulta(sistema, consulta):
+    mascota = consulta.mascota
+    local = sistema._mascota_de(mascota.nombre, mascota.propietario.nombre if mascota.propietario else None)
+    if local is None:
+        local = Mascota(mascota.nombre, mascota.especie, mascota.raza, mascota.edad,
+                        _propietario_local(sistema, mascota.propietario))
+        sistema.agregar_mascota(local)
+    consulta.mascota = local
+    sistema.agregar_consulta(consulta)
+
+
+def _actualizar_propietario(sistema, propietario):
+    local = sistema.buscar_propietario(propietario.nombre)
+    if local is not None:
+        sistema.actualizar_propietario(local, propietario.telefono, propietario.direccion)
+
+
+def _mascotas(sistema):
+    return list(sistema.iterar_mascotas())
+
+
+# Operaciones que un trabajador ejecuta sobre cada una de sus sucursales
+_OPERACIONES = {
+    "buscar_propietario": SistemaVeterinaria.buscar_propietario,
+    "buscar_mascota": SistemaVeterinaria.buscar_mascota,
+    "consultas_de_mascota": SistemaVeterinaria.consultas_de_mascota,
+    "consultas_entre": SistemaVeterinaria.consultas_entre,
+    "visitas_por_mes": SistemaVeterinaria.visitas_por_mes,
+    "ultima_visita": SistemaVeterinaria.ultima_visita,
+    "ultimas_visitas": SistemaVeterinaria.ultimas_visitas,
+    "buscar_consultas": SistemaVeterinaria.buscar_consultas,
+    "mascotas": _mascotas,
+    "agregar_propietario": _agregar_propietario,
+    "agregar_mascota": _agregar_mascota,
+    "agregar_consulta": _agregar_consulta,
+    "actualizar_propietario": _actualizar_propietario,
+    "cerrar": SistemaVeterinaria.cerrar,
+}
+
+
+def _atender(conexion, directorios, opciones, cola_logs, nivel_log):
+    """
+    Proceso trabajador: carga un SistemaVeterinaria por directorio y ejecuta
+    las operaciones que recibe, (nombre, argumentos, directorio o None para
+    todos), hasta recibir None. Responde ("ok", [(directorio, resultado)]) o
+    ("error", mensaje). Sus logs se reenvían por `cola_logs` al proceso principal.
+    Mientras espera, cada ESPERA_PEDIDO segundos escribe los lotes que ya
+    esperaron su intervalo_escritura, como el servidor entre peticiones.
+    """
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [logging.handlers.QueueHandler(cola_logs)]
+    raiz.setLevel(nivel_log)
+    try:
+        sistemas = {directorio: SistemaVeterinaria(directorio=directorio, **opciones) for directorio in directorios}
+    except Exception as e:
+        logger.exception("Error al cargar las sucursales %s", directorios)
+        conexion.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conexion.send(("ok", []))
+    while True:
+        if not conexion.poll(ESPERA_PEDIDO):
+            try:
+                for sistema in sistemas.values():
+                    sistema.escribir_pendientes(vencidas=True)
+            except Exception:
+                logger.exception("Error al escribir el buffer de las sucursales")
+            continue
+        pedido = conexion.recv()
+        if pedido is None:
+            return
+        operacion, argumentos, destino = pedido
+        try:
+            funcion = _OPERACIONES[operacion]
+            resultados = [(directorio, funcion(sistema, *argumentos))
+                          for directorio, sistema in sistemas.items() if destino in (None, directorio)]
+        except Exception as e:
+            logger.exception("Error en la operación %s de las sucursales", operacion)
+            conexion.send(("error", f"{operacion}: {type(e).__name__}: {e}"))
+        else:
+            conexion.send(("ok", resultados))
+
+
+class _ReenvioLog(logging.Handler):
+    """Entrega a los loggers de este proceso los registros que llegan de los trabajadores."""
+    def handle(self, record):
+        logging.getLogger(record.name).handle(record)
+        return True
+
+
+class RepositorioSucursales:
+    """
+    Repositorio de SistemaVeterinaria repartido entre los directorios de varias
+    sucursales (ver el comentario del módulo).
+
+    Atributos:
+        directorios (list): Directorio de datos de cada sucursal (absoluto).
+        activa (str): Directorio de la sucursal donde se registran los datos nuevos.
+    """
+    def __init__(self, directorios, activa=None, trabajadores=None, **opciones):
+        """
+        Parámetros:
+            directorios (list): Un directorio por sucursal; se crean si no existen.
+            activa (str): Sucursal donde se registra; por defecto la primera.
+            trabajadores (int): Procesos trabajadores; por defecto uno por núcleo,
+                sin pasar de la cantidad de sucursales.
+            opciones: Se pasan a cada SistemaVeterinaria (p. ej. carga_diferida
+                o lote_escritura, intervalo_escritura y durabilidad).
+        """
+        self.directorios = list(dict.fromkeys(os.path.abspath(d) for d in directorios))
+        if not self.directorios:
+            raise ValueError("Se necesita al menos una sucursal")
+        self.activa = os.path.abspath(activa) if activa is not None else self.directorios[0]
+        if self.activa not in self.directorios:
+            raise ValueError(f"La sucursal activa no está entre las sucursales: {activa}")
+        for directorio in self.directorios:
+            os.makedirs(directorio, exist_ok=True)
+        cantidad = min(trabajadores or os.cpu_count() or 1, len(self.directorios))
+
+        # spawn: un fork con el hilo del log en marcha podría heredar sus locks tomados
+        contexto = multiprocessing.get_context("spawn")
+        self._cola_logs = contexto.Queue()
+        self._reenvio_logs = logging.handlers.QueueListener(self._cola_logs, _ReenvioLog())
+        self._reenvio_logs.start()
+        self._lock = threading.Lock()
+        self._conexiones = []
+        self._procesos = []
+        self._trabajador_de = {}
+        for numero in range(cantidad):
+            asignados = self.directorios[numero::cantidad]
+            propia, remota = contexto.Pipe()
+            proceso = contexto.Process(
+                target=_atender, name=f"sucursales-{numero}", daemon=True,
+                args=(remota, asignados, opciones, self._cola_logs, logging.getLogger().getEffectiveLevel()))
+            proceso.start()
+            remota.close()
+            self._conexiones.append(propia)
+            self._procesos.append(proceso)
+            for directorio in asignados:
+                self._trabajador_de[directorio] = numero
+        try:
+            with self._lock:
+                self._respuestas(range(cantidad))
+        except Exception:
+            self.cerrar()
+            raise
+        logger.info("%s sucursales cargadas en %s procesos", len(self.directorios), cantidad)
+
+    def _respuestas(self, trabajadores):
+        resultados = {}
+        errores = []
+        for numero in trabajadores:
+            try:
+                estado, valor = self._conexiones[numero].recv()
+            except EOFError:
+                estado, valor = "error", f"el proceso {self._procesos[numero].name} terminó"
+            if estado == "ok":
+                resultados.update(valor)
+            else:
+                errores.append(valor)
+        if errores:
+            raise RuntimeError("Error en las sucursales: " + "; ".join(errores))
+        return resultados
+
+    def _pedir(self, operacion, *argumentos, sucursal=None):
+        """
+        Ejecuta la operación en todas las sucursales a la vez, o solo en
+        `sucursal`.
+
+        Retorna:
+            list: (directorio, resultado) de cada sucursal, primero la activa y
+            después en el orden de self.directorios.
+        """
+        if sucursal is None:
+            trabajadores = range(len(self._conexiones))
+        else:
+            trabajadores = [self._trabajador_de[os.path.abspath(sucursal)]]
+            sucursal = os.path.abspath(sucursal)
+        with self._lock:
+            for numero in trabajadores:
+                self._conexiones[numero].send((operacion, argumentos, sucursal))
+            resultados = self._respuestas(trabajadores)
+        orden = [self.activa] + [d for d in self.directorios if d != self.activa]
+        return [(directorio, resultados[directorio]) for directorio in orden if directorio in resultados]
+
+    @contextmanager
+    def lote(self):
+        """Cada sucursal guarda cada registro por separado: no hay transacción común."""
+        yield
+
+    def cerrar(self):
+        """
+        Cierra el sistema de cada sucursal y termina los trabajadores.
+        """
+        if not self._procesos:
+            return
+        try:
+            self._pedir("cerrar")
+        except (RuntimeError, OSError) as e:
+            logger.error("Error al cerrar las sucursales: %s", e)
+        for conexion, proceso in zip(self._conexiones, self._procesos):
+            try:
+                conexion.send(None)
+            except OSError:
+                pass
+            proceso.join(timeout=10)
+            if proceso.is_alive():
+                proceso.terminate()
+            conexion.close()
+        self._conexiones = []
+        self._procesos = []
+        self._reenvio_logs.stop()
+
+    # Búsquedas en toda la red
+
+    def buscar_propietario(self, nombre_propietario):
+        return next((p for _, p in self._pedir("buscar_propietario", nombre_propietario) if p is not None), None)
+
+    def buscar_mascota(self, nombre_mascota):
+        return next((m for _, m in self._pedir("buscar_mascota", nombre_mascota) if m is not None), None)
+
+    def propietario_en_sucursales(self, nombre_propietario):
+        """
+        Retorna:
+            dict: {directorio: Propietario} de las sucursales donde está registrado.
+        """
+        return {directorio: p for directorio, p in self._pedir("buscar_propietario", nombre_propietario) if p is not None}
+
+    def historia_por_sucursal(self, nombre_mascota):
+        """
+        Retorna:
+            dict: {directorio: consultas} de las sucursales donde la mascota tiene consultas.
+        """
+        return {directorio: consultas for directorio, consultas in self._pedir("consultas_de_mascota", nombre_mascota)
+                if consultas}
+
+    def consultas_de_mascota(self, nombre_mascota):
+        """Historia clínica de la mascota en toda la red, ordenada por fecha."""
+        return self._por_fecha(self._pedir("consultas_de_mascota", nombre_mascota))
+
+    def mascotas(self):
+        for _, mascotas in self._pedir("mascotas"):
+            yield from mascotas
+
+    def consultas_entre(self, desde, hasta):
+        return self._por_fecha(self._pedir("consultas_entre", desde, hasta))
+
+    def buscar_consultas(self, texto, desde=None, hasta=None, especie=None):
+        return self._por_fecha(self._pedir("buscar_consultas", texto, desde, hasta, especie))
+
+    def visitas_por_mes(self, desde=None, hasta=None):
+        total = {}
+        for _, visitas in self._pedir("visitas_por_mes", desde, hasta):
+            for mes, especies in visitas.items():
+                del_mes = total.setdefault(mes, {})
+                for especie, cantidad in especies.items():
+                    del_mes[especie] = del_mes.get(especie, 0) + cantidad
+        return dict(sorted(total.items()))
+
+    def ultima_visita(self, mascota):
+        visitas = [c for _, c in self._pedir("ultima_visita", mascota.nombre) if c is not None]
+        return max(visitas, key=lambda consulta: consulta.fecha, default=None)
+
+    def ultimas_visitas(self):
+        """La última consulta de cada mascota en toda la red (por nombre de mascota y propietario)."""
+        ultimas = {}
+        for _, consultas in self._pedir("ultimas_visitas"):
+            for consulta in consultas:
+                mascota = consulta.mascota
+                clave = (clave_busqueda(mascota.nombre),
+                         clave_busqueda(mascota.propietario.nombre) if mascota.propietario else None)
+                if clave not in ultimas or consulta.fecha > ultimas[clave].fecha:
+                    ultimas[clave] = consulta
+        return sorted(ultimas.values(), key=lambda consulta: consulta.fecha, reverse=True)
+
+    @staticmethod
+    def _por_fecha(resultados):
+        consultas = [consulta for _, lista in resultados for consulta in lista]
+        consultas.sort(key=lambda consulta: consulta.fecha)
+        return consultas
+
+    # Registros en la sucursal activa
+
+    def agregar_propietario(self, propietario):
+        self._pedir("agregar_propietario", propietario, sucursal=self.activa)
+
+    def agregar_mascota(self, mascota):
+        self._pedir("agregar_mascota", mascota, sucursal=self.activa)
+
+    def agregar_consulta(self, consulta):
+        self._pedir("agregar_consulta", consulta, sucursal=self.activa)
+
+    def actualizar_propietario(self, propietario):
+        """Actualiza los datos del propietario en todas las sucursales donde está registrado."""
+        self._pedir("actualizar_propietario", propietario)
@@ -0,0 +1,40 @@
+import unittest
+from datetime import date
+
+from sprint7 import Mascota, Propietario, Consulta
+from almacenamiento_columnar import SIN_EDAD, TablaConsultas, TablaMascotas
+
+
+class TestTablaConsultas(unittest.TestCase):
+    def setUp(self):
+        self.mascota = Mascota("Kira", "Gato", "Mestizo", 4, Propietario("Ana", "123", "XYZ"))
+        self.consultas = [Consulta(date(2024, 5, dia), "Chequeo", "Bien", self.mascota) for dia in (1, 2, 3)]
+
+    def test_filas_conservan_los_datos(self):
+        tabla = TablaConsultas.desde_consultas(self.consultas)
+        self.assertEqual(len(tabla), 3)
+        self.assertEqual([c.diccionario_Consulta() for c in tabla], [c.diccionario_Consulta() for c in self.consultas])
+        self.assertIs(tabla[0].mascota, self.mascota)
+
+    def test_textos_y_mascotas_se_guardan_una_vez(self):
+        tabla = TablaConsultas.desde_consultas(self.consultas)
+        self.assertEqual(tabla.textos, ["Chequeo", "Bien"])
+        self.assertEqual(len(tabla.lista_mascotas), 1)
+        self.assertEqual(list(tabla.fechas), [date(2024, 5, dia).toordinal() for dia in (1, 2, 3)])
+
+
+class TestTablaMascotas(unittest.TestCase):
+    def test_columnas(self):
+        ana = Propietario("Ana", "123", "XYZ")
+        tabla = TablaMascotas.desde_mascotas([Mascota("Kira", "Gato", "Criollo", 4, ana),
+                                              Mascota("Toby", "Perro", "Criollo", 2, ana),
+                                              Mascota("Sin edad", "Gato", "Persa", None, ana)])
+        self.assertEqual(len(tabla), 3)
+        self.assertEqual(tabla.textos, ["Gato", "Criollo", "Perro", "Persa"])
+        self.assertEqual(list(tabla.especies), [0, 2, 0])
+        self.assertEqual(list(tabla.razas), [1, 1, 3])
+        self.assertEqual(list(tabla.edades), [4, 2, SIN_EDAD])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch
+from datetime import date
+import gc
+import os
+import tempfile
+
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria
+from almacenamiento_sqlite import RepositorioSQLite, importar_desde_archivos
+
+
+class TestRepositorioSQLite(unittest.TestCase):
+    def setUp(self):
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.repositorio = RepositorioSQLite("veterinaria.db")
+
+    def tearDown(self):
+        self.repositorio.cerrar()
+        os.chdir(self.directorio_original)
+        self.tmp.cleanup()
+
+    def test_usa_modo_wal(self):
+        modo = self.repositorio.conexion.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(modo, "wal")
+
+    def test_registro_y_busqueda(self):
+        sistema = SistemaVeterinaria(repositorio=self.repositorio)
+        with patch("builtins.input", side_effect=["Luna", "Perro", "Labrador", "5", "Carlos", "Carlos", "321", "Cra 45"]), \
+             patch("builtins.print"):
+            sistema.registrar_mascota()
+        with patch("builtins.input", side_effect=["luna", "01-05-2024", "Chequeo", "Bien"]), patch("builtins.print"):
+            sistema.registrar_consulta()
+
+        self.assertEqual(sistema.mascotas, [])  # Nada se mantiene en memoria
+        mascota = sistema.buscar_mascota("LUNA")
+        self.assertEqual(mascota.propietario.nombre, "Carlos")
+        consultas = sistema.consultas_de_mascota("Luna")
+        self.assertEqual([(c.fecha, c.motivo) for c in consultas], [(date(2024, 5, 1), "Chequeo")])
+        self.assertIs(consultas[0].mascota, mascota)
+
+    def test_actualizar_propietario(self):
+        sistema = SistemaVeterinaria(repositorio=self.repositorio)
+        propietario = Propietario("Ana", "123", "XYZ")
+        sistema.agregar_mascota(Mascota("Kira", "Gato", "Mestizo", 4, propietario))
+        sistema.actualizar_propietario(propietario, direccion="Calle 9")
+
+        otro = RepositorioSQLite("veterinaria.db")
+        self.addCleanup(otro.cerrar)
+        actualizado = otro.buscar_propietario("ana")
+        self.assertEqual((actualizado.telefono, actualizado.direccion), ("123", "Calle 9"))
+
+    def test_lote_revierte_si_falla(self):
+        propietario = Propietario("Ana", "123", "XYZ")
+        with self.assertRaises(RuntimeError):
+            with self.repositorio.lote():
+                self.repositorio.agregar_mascota(Mascota("Kira", "Gato", "Mestizo", 4, propietario))
+                raise RuntimeError("falla")
+        self.assertIsNone(self.repositorio.buscar_propietario("Ana"))
+        self.assertEqual(list(self.repositorio.mascotas()), [])
+
+    def test_consultas_entre_fechas(self):
+        mascota = Mascota("Kira", "Gato", "Mestizo", 4, Propietario("Ana", "123", "XYZ"))
+        for dia in (1, 10, 20):
+            self.repositorio.agregar_consulta(Consulta(date(2024, 5, dia), "Chequeo", "Bien", mascota))
+        consultas = self.repositorio.consultas_entre(date(2024, 5, 5), date(2024, 5, 31))
+        self.assertEqual([c.fecha.day for c in consultas], [10, 20])
+
+    def test_visitas_por_mes_y_ultimas_visitas(self):
+        dueno = Propietario("Ana", "123", "XYZ")
+        kira = Mascota("Kira", "Gato", "Mestizo", 4, dueno)
+        max_ = Mascota("Max", "Perro", "Bulldog", 3, dueno)
+        for fecha, mascota in [(date(2024, 4, 30), kira), (date(2024, 5, 2), kira), (date(2024, 5, 20), max_)]:
+            self.repositorio.agregar_consulta(Consulta(fecha, f"Visita {fecha.day}", "Bien", mascota))
+        self.assertEqual(self.repositorio.visitas_por_mes(),
+                         {"2024-04": {"Gato": 1}, "2024-05": {"Gato": 1, "Perro": 1}})
+        self.assertEqual(self.repositorio.visitas_por_mes(date(2024, 5, 1)), {"2024-05": {"Gato": 1, "Perro": 1}})
+        self.assertEqual([(c.mascota.nombre, c.motivo) for c in self.repositorio.ultimas_visitas()],
+                         [("Max", "Visita 20"), ("Kira", "Visita 2")])
+        self.assertEqual(self.repositorio.ultima_visita(kira).fecha, date(2024, 5, 2))
+
+    def test_buscar_consultas_por_palabras(self):
+        sistema = SistemaVeterinaria(repositorio=self.repositorio)
+        mascota = Mascota("Kira", "Gato", "Mestizo", 4, Propietario("Ana", "123", "XYZ"))
+        sistema.agregar_consulta(Consulta(date(2024, 5, 1), "Picazón", "Dermatitis alérgica", mascota))
+        sistema.agregar_consulta(Consulta(date(2024, 6, 1), "Vacunación", "Sin novedad", mascota))
+        self.assertEqual([c.motivo for c in sistema.buscar_consultas("dermatitis OR vacunacion", desde=date(2024, 5, 15))],
+                         ["Vacunación"])
+
+    def test_importar_desde_archivos(self):
+        with open("mascotas.csv", "w", encoding="utf-8") as f:
+            f.write("Luna,Perro,Labrador,5,Carlos,321,Cra 45\n")
+            f.write("Max,Perro,Bulldog,3,carlos,321,Cra 45\n")
+        origen = SistemaVeterinaria()
+        origen.agregar_consulta(Consulta(date(2024, 5, 1), "Chequeo", "Bien", origen.buscar_mascota("Max")))
+
+        self.assertEqual(importar_desde_archivos(self.repositorio), (1, 2, 1))
+        self.assertEqual([m.nombre for m in self.repositorio.mascotas()], ["Luna", "Max"])
+        self.assertEqual(len(self.repositorio.consultas_de_mascota("max")), 1)
+
+    def test_reimportar_no_duplica(self):
+        with open("mascotas.csv", "w", encoding="utf-8") as f:
+            f.write("Luna,Perro,Labrador,5,Carlos,321,Cra 45\n")
+        origen = SistemaVeterinaria()
+        origen.agregar_consulta(Consulta(date(2024, 5, 1), "Chequeo", "Bien", origen.buscar_mascota("Luna")))
+        historica = Mascota("Toby", "Perro", "Beagle", 2, Propietario("Ana", "123", "XYZ"))
+        origen.agregar_consulta(Consulta(date(2024, 6, 1), "Control", "Bien", historica))
+        origen.cerrar()
+
+        self.assertEqual(importar_desde_archivos(self.repositorio), (2, 2, 2))
+        self.assertEqual(importar_desde_archivos(self.repositorio), (0, 0, 0))
+        # La mascota histórica no se lista, pero su consulta está en los reportes
+        self.assertEqual([m.nombre for m in self.repositorio.mascotas()], ["Luna"])
+        self.assertIsNone(self.repositorio.buscar_mascota("Toby"))
+        self.assertEqual([c.motivo for c in self.repositorio.consultas_de_mascota("toby")], ["Control"])
+        self.assertEqual(len(self.repositorio.consultas_entre(date(2024, 1, 1), date(2024, 12, 31))), 2)
+
+        SistemaVeterinaria().agregar_consulta(Consulta(date(2024, 7, 1), "Chequeo", "Bien", origen.buscar_mascota("Luna")))
+        self.assertEqual(importar_desde_archivos(self.repositorio), (0, 0, 1))
+
+    def test_mapas_de_identidad_no_retienen_filas(self):
+        mascota = Mascota("Kira", "Gato", "Mestizo", 4, Propietario("Ana", "123", "XYZ"))
+        self.repositorio.agregar_consulta(Consulta(date(2024, 5, 1), "Chequeo", "Bien", mascota))
+        self.assertIs(self.repositorio.buscar_mascota("kira"), mascota)
+        del mascota
+        gc.collect()
+        self.assertEqual((len(self.repositorio._mascotas), len(self.repositorio._propietarios)), (0, 0))
+        # Una fila ya registrada no se vuelve a insertar aunque su objeto se haya liberado
+        kira = self.repositorio.buscar_mascota("Kira")
+        self.repositorio.agregar_consulta(Consulta(date(2024, 6, 1), "Control", "Bien", kira))
+        self.assertEqual(len(list(self.repositorio.mascotas())), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import tempfile
+
+from benchmark import censo_con_bucles, generar_datos, main
+from estadisticas import Censo
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.directorio_original)
+        self.tmp.cleanup()
+
+    def test_generador_es_reproducible(self):
+        propietarios, mascotas, consultas = generar_datos(200, semilla=7)
+        _, mascotas_2, consultas_2 = generar_datos(200, semilla=7)
+        self.assertEqual((len(propietarios), len(mascotas), len(consultas)), (10, 20, 200))
+        self.assertEqual([m.diccionarioMascotas() for m in mascotas], [m.diccionarioMascotas() for m in mascotas_2])
+        self.assertEqual([c.diccionario_Consulta() for c in consultas], [c.diccionario_Consulta() for c in consultas_2])
+        self.assertNotEqual([m.nombre for m in mascotas], [m.nombre for m in generar_datos(200, semilla=8)[1]])
+
+    def test_censo_con_bucles_coincide_con_columnas(self):
+        _, mascotas, consultas = generar_datos(2000, semilla=7)
+        esperado = censo_con_bucles(mascotas, consultas)
+        resumen = Censo().actualizar(mascotas, consultas).resumen()
+        # Las razas empatadas pueden quedar en otro orden
+        self.assertEqual(sorted(resumen.pop("razas")), sorted(esperado.pop("razas")))
+        self.assertEqual(resumen, esperado)
+
+    def test_resultados_en_json(self):
+        with patch("builtins.print"):
+            main(["--escalas", "100", "--repeticiones", "5", "--salida", "resultados.json"])
+        with open("resultados.json", encoding="utf-8") as f:
+            resultados = json.load(f)
+        escala = resultados["escalas"]["100"]
+        self.assertEqual(escala["consultas"], 100)
+        self.assertEqual(set(escala["operaciones"]), {
+            "iniciar", "iniciar_carga_diferida", "buscar_propietario",
+            "registrar_consulta", "registrar_consulta_en_lote", "historia_clinica", "listar_mascotas", "listar_mascotas_repetido",
+            "censo_bucles", "censo_columnar", "censo_columnar_repetido"})
+        self.assertEqual(escala["operaciones"]["registrar_consulta"]["repeticiones"], 5)
+        self.assertEqual(os.listdir("."), ["resultados.json"])  # Los datos se generan en un directorio temporal
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from cola_incremental import ColaIncremental
+
+
+class TestColaIncremental(unittest.TestCase):
+    def setUp(self):
+        self.cola = ColaIncremental()
+        self.lista = [1, 2, 3]
+
+    def test_solo_lo_agregado(self):
+        self.assertTrue(self.cola.reemplazada(self.lista))
+        self.assertEqual(list(self.cola.nuevos(self.lista)), [1, 2, 3])
+        self.assertFalse(self.cola.reemplazada(self.lista))
+        self.assertEqual(list(self.cola.nuevos(self.lista)), [])
+        self.lista.extend([4, 5])
+        self.assertFalse(self.cola.reemplazada(self.lista))
+        self.assertEqual(list(self.cola.nuevos(self.lista)), [4, 5])
+        self.assertEqual(self.cola.procesados, 5)
+
+    def test_lista_reemplazada_o_acortada(self):
+        self.cola.nuevos(self.lista)
+        otra = [7, 8]
+        self.assertTrue(self.cola.reemplazada(otra))
+        self.assertEqual(list(self.cola.nuevos(otra)), [7, 8])
+        del otra[1:]
+        self.assertTrue(self.cola.reemplazada(otra))
+        self.assertEqual(list(self.cola.nuevos(otra)), [7])
+
+    def test_desde_una_posicion(self):
+        # Lo derivado ya incluye los dos primeros, p. ej. un índice cargado de disco
+        self.assertEqual(list(self.cola.nuevos(self.lista, desde=2)), [3])
+        self.assertFalse(self.cola.reemplazada(self.lista))
+
+
+if __name__ == "__main__":
+    unittest.main()
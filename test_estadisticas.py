@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch
+import csv
+import os
+import tempfile
+from datetime import date
+
+import estadisticas
+from estadisticas import Censo, REPORTES_CSV
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria
+
+
+class TestCenso(unittest.TestCase):
+    def setUp(self):
+        ana = Propietario("Ana", "123", "XYZ")
+        carlos = Propietario("Carlos", "321", "Cra 45")
+        self.kira = Mascota("Kira", "Gato", "Mestizo", 4, ana)
+        self.luna = Mascota("Luna", "Perro", "Labrador", 5, carlos)
+        self.toby = Mascota("Toby", "Perro", "Beagle", 2, ana)
+        self.rex = Mascota("Rex", "Perro", "Labrador", 5, carlos)
+        self.mascotas = [self.kira, self.luna, self.toby, self.rex]
+        self.consultas = [
+            Consulta(date(2024, 3, 2), "Otitis", "Tratada", self.kira),
+            Consulta(date(2024, 4, 10), "Dermatitis", "Alergia", self.luna),
+            Consulta(date(2024, 5, 1), "Vacunación", "Sano", self.luna),
+            Consulta(date(2024, 5, 20), "Control", "Sano", self.kira),
+            Consulta(date(2024, 5, 21), "Control", "Sano", self.luna),
+        ]
+
+    def test_estadisticas(self):
+        censo = Censo().actualizar(self.mascotas, self.consultas)
+        self.assertEqual(censo.mascotas_por_especie(), [("Perro", 3), ("Gato", 1)])
+        self.assertEqual(censo.mascotas_por_raza(), [("Perro", "Labrador", 2), ("Gato", "Mestizo", 1), ("Perro", "Beagle", 1)])
+        self.assertEqual(censo.distribucion_edades(), [(2, 1), (4, 1), (5, 2)])
+        self.assertEqual(censo.distribucion_edades(ancho=5), [(0, 2), (5, 2)])
+        self.assertEqual(censo.consultas_por_mascota(), [(self.luna, 3), (self.kira, 2)])
+        self.assertEqual(censo.consultas_por_mascota(1), [(self.luna, 3)])
+        self.assertEqual(censo.consultas_por_mes(), {"2024-03": 1, "2024-04": 1, "2024-05": 3})
+        self.assertEqual(censo.diagnosticos_frecuentes(2), [("Sano", 3), ("Tratada", 1)])
+
+    def test_sin_datos(self):
+        resumen = Censo().actualizar([], []).resumen()
+        self.assertEqual(resumen, {"especies": [], "razas": [], "edades": [], "mascotas_frecuentes": [],
+                                   "por_mes": {}, "diagnosticos": []})
+
+    def test_solo_agrega_lo_nuevo(self):
+        censo = Censo().actualizar(self.mascotas, self.consultas)
+        tabla = censo.consultas
+        self.consultas.append(Consulta(date(2024, 6, 1), "Control", "Sano", self.toby))
+        censo.actualizar(self.mascotas, self.consultas)
+        self.assertIs(censo.consultas, tabla)
+        self.assertEqual(len(tabla), 6)
+        self.assertEqual(censo.consultas_por_mes()["2024-06"], 1)
+
+        # Una lista reemplazada se vuelve a construir
+        censo.actualizar(self.mascotas, self.consultas[:2])
+        self.assertIsNot(censo.consultas, tabla)
+        self.assertEqual(censo.consultas_por_mes(), {"2024-03": 1, "2024-04": 1})
+
+    def test_exportar_csv(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = Censo().actualizar(self.mascotas, self.consultas).exportar_csv(os.path.join(directorio, "reportes"))
+            self.assertEqual(sorted(os.path.basename(ruta) for ruta in rutas), sorted(REPORTES_CSV.values()))
+            with open(os.path.join(directorio, "reportes", REPORTES_CSV["mascotas_frecuentes"]), encoding="utf-8") as f:
+                filas = list(csv.reader(f))
+        self.assertEqual(filas, [["mascota", "especie", "propietario", "consultas"],
+                                 ["Luna", "Perro", "Carlos", "3"], ["Kira", "Gato", "Ana", "2"]])
+
+    @unittest.skipUnless(estadisticas.numpy, "NumPy no está instalado")
+    def test_numpy_y_counter_coinciden(self):
+        censo = Censo().actualizar(self.mascotas, self.consultas)
+        con_numpy = censo.resumen()
+        with patch("estadisticas.numpy", None):
+            self.assertEqual(censo.resumen(), con_numpy)
+
+
+class TestCensoDelSistema(unittest.TestCase):
+    def setUp(self):
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        sistema = SistemaVeterinaria()
+        ana = Propietario("Ana", "123", "XYZ")
+        kira = Mascota("Kira", "Gato", "Mestizo", 4, ana)
+        sistema.agregar_propietario(ana)
+        sistema.agregar_mascota(kira)
+        sistema.agregar_consulta(Consulta(date(2024, 3, 2), "Otitis", "Tratada", kira))
+        sistema.cerrar()
+
+    def tearDown(self):
+        os.chdir(self.directorio_original)
+        self.tmp.cleanup()
+
+    def test_censo_se_actualiza_con_los_registros(self):
+        sistema = SistemaVeterinaria()
+        censo = sistema.censo()
+        self.assertEqual(censo.mascotas_por_especie(), [("Gato", 1)])
+        kira = sistema.buscar_mascota("Kira")
+        sistema.agregar_consulta(Consulta(date(2024, 5, 20), "Control", "Bien", kira))
+        self.assertIs(sistema.censo(), censo)
+        self.assertEqual(censo.consultas_por_mascota(), [(kira, 2)])
+
+    def test_carga_diferida(self):
+        sistema = SistemaVeterinaria(carga_diferida=True)
+        self.assertEqual(sistema.censo().consultas_por_mes(), {"2024-03": 1})
+
+    def test_reporte_exporta_csv(self):
+        sistema = SistemaVeterinaria()
+        with patch("builtins.print"), patch.object(sistema, "censo", wraps=sistema.censo) as censo:
+            sistema.reporte_censo("reportes")
+        censo.assert_called_once()  # Con un repositorio, cada llamada arma el censo de nuevo
+        self.assertEqual(sorted(os.listdir("reportes")), sorted(REPORTES_CSV.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
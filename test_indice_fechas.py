@@ -0,0 +1,59 @@
+import unittest
+from datetime import date
+
+from sprint7 import Mascota, Propietario, Consulta
+from indice_fechas import IndiceFechas
+
+
+class TestIndiceFechas(unittest.TestCase):
+    def setUp(self):
+        dueno = Propietario("Ana", "123", "XYZ")
+        self.kira = Mascota("Kira", "Gato", "Mestizo", 4, dueno)
+        self.max = Mascota("Max", "Perro", "Bulldog", 3, dueno)
+
+    def consulta(self, fecha, mascota=None, motivo="Chequeo"):
+        return Consulta(fecha, motivo, "Bien", mascota or self.kira)
+
+    def test_rango_con_inserciones_desordenadas(self):
+        indice = IndiceFechas()
+        for dia in (10, 1, 20, 5, 10):
+            indice.agregar(self.consulta(date(2024, 5, dia), motivo=str(dia)))
+        self.assertEqual(list(indice.fechas), sorted(indice.fechas))
+        self.assertEqual([c.motivo for c in indice.entre(date(2024, 5, 5), date(2024, 5, 10))], ["5", "10", "10"])
+        self.assertEqual(indice.entre(date(2024, 6, 1), date(2024, 6, 30)), [])
+
+    def test_agregar_varias_intercala_y_conserva_el_orden_de_registro(self):
+        indice = IndiceFechas()
+        indice.agregar_varias(self.consulta(date(2024, 1, 1 + i % 28), motivo=f"a{i}") for i in range(100))
+        indice.agregar_varias(self.consulta(date(2024, 1, 1 + i % 28), motivo=f"b{i}") for i in range(100))
+        self.assertEqual(len(indice), 200)
+        self.assertEqual(list(indice.fechas), sorted(indice.fechas))
+        del_dia_1 = [c.motivo for c in indice.entre(date(2024, 1, 1), date(2024, 1, 1))]
+        self.assertEqual(del_dia_1, ["a0", "a28", "a56", "a84", "b0", "b28", "b56", "b84"])
+
+    def test_visitas_por_mes_y_especie(self):
+        indice = IndiceFechas()
+        indice.agregar_varias([
+            self.consulta(date(2024, 4, 30)),
+            self.consulta(date(2024, 5, 2)),
+            self.consulta(date(2024, 5, 20), self.max),
+            self.consulta(date(2024, 5, 31), self.max),
+            self.consulta(date(2024, 7, 1), self.max),
+        ])
+        self.assertEqual(indice.visitas_por_mes(), {
+            "2024-04": {"Gato": 1}, "2024-05": {"Gato": 1, "Perro": 2}, "2024-07": {"Perro": 1}})
+        # Los meses de los bordes del rango se cuentan solo en parte
+        self.assertEqual(indice.visitas_por_mes(date(2024, 5, 10), date(2024, 7, 1)), {
+            "2024-05": {"Perro": 2}, "2024-07": {"Perro": 1}})
+
+    def test_ultima_visita_por_mascota(self):
+        indice = IndiceFechas()
+        indice.agregar(self.consulta(date(2024, 5, 20), motivo="última"))
+        indice.agregar(self.consulta(date(2024, 5, 1), motivo="anterior"))
+        indice.agregar(self.consulta(date(2024, 3, 1), self.max))
+        self.assertEqual(indice.ultima_visita(self.kira).motivo, "última")
+        self.assertEqual([c.mascota.nombre for c in indice.ultimas_visitas()], ["Kira", "Max"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import tempfile
+from datetime import date
+
+from sprint7 import Mascota, Propietario, Consulta
+from indice_texto import IndiceTexto, normalizar_texto, palabras
+
+
+class TestIndiceTexto(unittest.TestCase):
+    def setUp(self):
+        mascota = Mascota("Kira", "Gato", "Mestizo", 4, Propietario("Ana", "123", "XYZ"))
+        self.indice = IndiceTexto()
+        for motivo, diagnostico in [
+            ("Vacunación anual", "Sin novedad"),
+            ("Picazón", "Dermatitis alérgica"),
+            ("Pérdida de pelo", "Dermatitis por pulgas"),
+            ("Picazón en orejas", "Otitis externa"),
+        ]:
+            self.indice.agregar(Consulta(date(2024, 5, 1), motivo, diagnostico, mascota))
+
+    def test_normalizacion(self):
+        self.assertEqual(normalizar_texto("VACUNACIÓN Pequeña"), "vacunacion pequena")
+        self.assertEqual(palabras("Pérdida de pelo"), ["perdida", "pelo"])
+
+    def test_y_o_prefijo(self):
+        self.assertEqual(self.indice.buscar("vacunacion"), [0])
+        self.assertEqual(self.indice.buscar("DERMATITIS alergica"), [1])
+        self.assertEqual(self.indice.buscar("dermatitis OR otitis"), [1, 2, 3])
+        self.assertEqual(self.indice.buscar("derma* O vacun*"), [0, 1, 2])
+        self.assertEqual(self.indice.buscar("picazon otitis"), [3])
+        self.assertEqual(self.indice.buscar("moquillo"), [])
+
+    def test_palabras_vacias_no_restringen(self):
+        self.assertEqual(self.indice.buscar("otitis la"), [3])
+        self.assertEqual(self.indice.buscar("otitis la*"), [3])
+        self.assertEqual(self.indice.buscar("de* OR vacun*"), [0])
+
+    def test_guardar_y_cargar(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, "consultas.indice")
+        self.indice.guardar(ruta, (1, 2, 3))
+
+        cargado = IndiceTexto.cargar(ruta, (1, 2, 3))
+        self.assertEqual(cargado.cantidad, 4)
+        self.assertEqual(cargado.buscar("derma*"), [1, 2])
+        self.assertIsNone(IndiceTexto.cargar(ruta, (1, 2, 4)))  # De otro snapshot
+        self.assertIsNone(IndiceTexto.cargar(os.path.join(directorio.name, "no_existe"), None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+
+from metricas import Instrumentacion
+
+
+class TestInstrumentacion(unittest.TestCase):
+    def setUp(self):
+        self.instrumentacion = Instrumentacion()
+
+    def test_desactivada_no_registra(self):
+        @self.instrumentacion.medir
+        def buscar():
+            return 42
+
+        self.assertEqual(buscar(), 42)
+        self.instrumentacion.sumar_bytes("buscar", leidos=100)
+        self.assertEqual(self.instrumentacion.resumen(), {})
+
+    def test_llamadas_percentiles_y_errores(self):
+        self.instrumentacion.activa = True
+
+        @self.instrumentacion.medir
+        def _cargar(fallar=False):
+            if fallar:
+                raise ValueError("falla")
+
+        for _ in range(9):
+            _cargar()
+        with self.assertRaises(ValueError):
+            _cargar(fallar=True)
+        for i in range(1, 101):
+            self.instrumentacion.registrar("historia", i / 1000)
+        self.instrumentacion.sumar_bytes("cargar", leidos=10, escritos=5)
+        self.instrumentacion.sumar_bytes("cargar", leidos=10)
+
+        resumen = self.instrumentacion.resumen()
+        self.assertEqual(resumen["cargar"]["llamadas"], 10)  # Sin el guion bajo inicial
+        self.assertEqual(resumen["cargar"]["errores"], 1)
+        self.assertEqual((resumen["cargar"]["bytes_leidos"], resumen["cargar"]["bytes_escritos"]), (20, 5))
+        self.assertEqual((resumen["historia"]["p50_ms"], resumen["historia"]["p95_ms"], resumen["historia"]["p99_ms"]),
+                         (51.0, 96.0, 100.0))
+
+    def test_formato_prometheus(self):
+        self.instrumentacion.activa = True
+        with self.instrumentacion.medicion("listar"):
+            pass
+        self.instrumentacion.sumar_bytes("listar", escritos=7)
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, "metricas.prom")
+        self.instrumentacion.guardar_prometheus(ruta, {"mascotas": 3})
+
+        with open(ruta, encoding="utf-8") as f:
+            lineas = f.read().splitlines()
+        self.assertIn("# TYPE veterinaria_operacion_segundos summary", lineas)
+        self.assertIn('veterinaria_operacion_segundos_count{operacion="listar"} 1', lineas)
+        self.assertTrue(any(l.startswith('veterinaria_operacion_segundos{operacion="listar",quantile="0.99"} ') for l in lineas))
+        self.assertIn('veterinaria_bytes_escritos_total{operacion="listar"} 7', lineas)
+        self.assertIn('veterinaria_objetos{tipo="mascotas"} 3', lineas)
+        self.assertEqual(os.listdir(directorio.name), ["metricas.prom"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+import io
+
+from presentacion import Listado, escribir_listado
+
+
+class SalidaTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class TestListado(unittest.TestCase):
+    def setUp(self):
+        self.formateados = []
+
+        def formato(elemento):
+            self.formateados.append(elemento)
+            return f"{elemento}\n"
+
+        self.listado = Listado(formato)
+
+    def test_paginas(self):
+        self.listado.actualizar(list(range(5)))
+        self.assertEqual(self.listado.pagina(), "0\n1\n2\n3\n4\n")
+        self.assertEqual(self.listado.pagina(2, 2), "2\n3\n")
+        self.assertEqual(self.listado.pagina(3, 2), "4\n")
+        self.assertEqual(self.listado.cantidad_paginas(2), 3)
+        self.assertEqual(Listado(str).cantidad_paginas(2), 1)
+
+    def test_solo_se_formatea_lo_agregado(self):
+        elementos = [1, 2, 3]
+        self.listado.actualizar(elementos)
+        completa = self.listado.pagina(1, 2)
+        self.listado.pagina(2, 2)
+        self.listado.pagina()
+        elementos.append(4)
+        self.listado.actualizar(elementos)
+        self.assertEqual(self.formateados, [1, 2, 3, 4])
+        self.assertIs(self.listado.pagina(1, 2), completa)  # Las páginas completas se conservan
+        self.assertEqual(self.listado.pagina(2, 2), "3\n4\n")
+        self.assertEqual(self.listado.pagina(), "1\n2\n3\n4\n")
+
+    def test_lista_reemplazada_o_acortada_se_rehace(self):
+        elementos = [1, 2, 3]
+        self.listado.actualizar(elementos)
+        reemplazo = [7, 8]
+        self.listado.actualizar(reemplazo)
+        self.assertEqual(self.listado.pagina(), "7\n8\n")
+        self.listado.actualizar(reemplazo[:1])
+        self.assertEqual(self.listado.pagina(), "7\n")
+        self.assertEqual(self.formateados, [1, 2, 3, 7, 8, 7])
+
+
+class TestEscribirListado(unittest.TestCase):
+    def setUp(self):
+        self.listado = Listado(lambda n: f"{n}\n").actualizar(list(range(5)))
+
+    def test_archivo_recibe_todo_en_una_escritura(self):
+        salida = io.StringIO()
+        with patch.object(salida, "write", wraps=salida.write) as escribir:
+            escribir_listado(self.listado, salida, tamano=2)
+        escribir.assert_called_once_with("0\n1\n2\n3\n4\n")
+
+    def test_una_pagina(self):
+        salida = io.StringIO()
+        escribir_listado(self.listado, salida, tamano=2, pagina=3)
+        self.assertEqual(salida.getvalue(), "4\n")
+
+    def test_pagina_o_tamano_fuera_de_rango(self):
+        for pagina in (-1, 0, 4):
+            with self.subTest(pagina=pagina), self.assertRaises(ValueError):
+                escribir_listado(self.listado, io.StringIO(), tamano=2, pagina=pagina)
+        with self.assertRaises(ValueError):
+            escribir_listado(self.listado, io.StringIO(), tamano=0)
+
+    def test_terminal_pagina_por_pagina(self):
+        salida = SalidaTerminal()
+        with patch("builtins.input", side_effect=["", "1", "q"]) as preguntar:
+            escribir_listado(self.listado, salida, tamano=2)
+        self.assertEqual(salida.getvalue(), "0\n1\n2\n3\n0\n1\n")
+        self.assertIn("Página 1 de 3", preguntar.call_args_list[0][0][0])
+
+    def test_terminal_termina_en_la_ultima_pagina(self):
+        salida = SalidaTerminal()
+        with patch("builtins.input", side_effect=["", "", ""]):
+            escribir_listado(self.listado, salida, tamano=2)
+        self.assertEqual(salida.getvalue(), "0\n1\n2\n3\n4\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import http.client
+import json
+import os
+import tempfile
+import threading
+
+from sprint7 import SistemaVeterinaria
+from servidor import ServidorVeterinaria
+
+
+class TestServidor(unittest.TestCase):
+    def setUp(self):
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.servidor = ServidorVeterinaria(("127.0.0.1", 0), SistemaVeterinaria())
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        os.chdir(self.directorio_original)
+        self.tmp.cleanup()
+
+    def conectar(self):
+        return http.client.HTTPConnection(*self.servidor.server_address, timeout=5)
+
+    def pedir(self, conexion, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos) if datos is not None else None
+        conexion.request(metodo, ruta, body=cuerpo, headers={"Content-Type": "application/json"})
+        respuesta = conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+
+    def test_registro_y_consulta_en_la_misma_conexion(self):
+        conexion = self.conectar()
+        estado, _ = self.pedir(conexion, "POST", "/mascotas", {"nombre": "Luna", "especie": "Perro", "raza": "Labrador",
+                                                              "edad": 5, "propietario": "Carlos"})
+        self.assertEqual(estado, 201)
+        estado, _ = self.pedir(conexion, "POST", "/consultas", {"mascota": "Luna", "fecha": "01-05-2024",
+                                                               "motivo": "Vacunación", "diagnostico": "Bien"})
+        self.assertEqual(estado, 201)
+
+        estado, mascotas = self.pedir(conexion, "GET", "/mascotas")
+        self.assertEqual([m["nombre"] for m in mascotas], ["Luna"])
+        estado, historia = self.pedir(conexion, "GET", "/mascotas/luna/historia")
+        self.assertEqual(historia[0]["motivo"], "Vacunación")
+        conexion.close()
+
+    def test_datos_invalidos(self):
+        conexion = self.conectar()
+        estado, cuerpo = self.pedir(conexion, "POST", "/mascotas", {"nombre": "Luna", "especie": "Perro", "raza": "Labrador",
+                                                                   "edad": "cinco", "propietario": "Carlos"})
+        self.assertEqual(estado, 400)
+        self.assertIn("error", cuerpo)
+        estado, _ = self.pedir(conexion, "GET", "/mascotas/Nadie/historia")
+        self.assertEqual(estado, 404)
+        conexion.close()
+
+    def test_textos_invalidos_no_se_registran(self):
+        conexion = self.conectar()
+        estado, _ = self.pedir(conexion, "POST", "/mascotas", {"nombre": 7, "especie": "Perro", "raza": "Labrador",
+                                                              "edad": 5, "propietario": "Carlos"})
+        self.assertEqual(estado, 400)
+        estado, _ = self.pedir(conexion, "POST", "/mascotas", {"nombre": "Luna", "especie": "Perro", "raza": "Labrador",
+                                                              "edad": 5, "propietario": "Carlos"})
+        self.assertEqual(estado, 201)
+        estado, cuerpo = self.pedir(conexion, "POST", "/consultas", {"mascota": "Luna", "fecha": "01-05-2024",
+                                                                    "motivo": "Vacunación", "diagnostico": None})
+        self.assertEqual(estado, 400)
+        self.assertIn("diagnostico", cuerpo["error"])
+        estado, mascotas = self.pedir(conexion, "GET", "/mascotas")
+        self.assertEqual([m["nombre"] for m in mascotas], ["Luna"])
+        estado, _ = self.pedir(conexion, "GET", "/mascotas/luna/historia")
+        self.assertEqual(estado, 404)
+        conexion.close()
+
+    def test_ruta_desconocida_no_desincroniza_la_conexion(self):
+        conexion = self.conectar()
+        estado, _ = self.pedir(conexion, "POST", "/desconocido", {"nombre": "Luna"})
+        self.assertEqual(estado, 404)
+        estado, mascotas = self.pedir(conexion, "GET", "/mascotas")
+        self.assertEqual((estado, mascotas), (200, []))
+        conexion.close()
+
+    def test_metricas_por_ruta_conocida(self):
+        conexion = self.conectar()
+        for ruta in ("/x0", "/x1", "/mascotas/luna/historia", "/mascotas/kira/historia", "/mascotas"):
+            self.pedir(conexion, "GET", ruta)
+        estado, _ = self.pedir(conexion, "POST", "/mascotas", {"nombre": "Luna", "especie": "Perro", "raza": "Labrador",
+                                                              "edad": True, "propietario": "Carlos"})
+        self.assertEqual(estado, 400)
+        _, metricas = self.pedir(conexion, "GET", "/metricas")
+        self.assertEqual(set(metricas), {"otras", "GET /mascotas/<nombre>/historia", "GET /mascotas", "POST /mascotas"})
+        self.assertEqual(metricas["otras"]["peticiones"], 2)
+        self.assertEqual(metricas["GET /mascotas/<nombre>/historia"]["peticiones"], 2)
+        self.assertEqual(metricas["GET /mascotas"]["peticiones"], 1)
+        conexion.close()
+
+    def test_clientes_concurrentes_no_pierden_registros(self):
+        conexion = self.conectar()
+        self.pedir(conexion, "POST", "/mascotas", {"nombre": "Luna", "especie": "Perro", "raza": "Labrador",
+                                                  "edad": 5, "propietario": "Carlos"})
+
+        def cliente(numero):
+            propia = self.conectar()
+            for i in range(20):
+                self.pedir(propia, "POST", "/consultas", {"mascota": "Luna", "fecha": "01-05-2024",
+                                                         "motivo": f"Control {numero}-{i}", "diagnostico": "Bien"})
+            propia.close()
+
+        hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        _, historia = self.pedir(conexion, "GET", "/mascotas/Luna/historia")
+        self.assertEqual(len(historia), 160)
+        self.assertEqual(len(SistemaVeterinaria().consultas), 160)
+        _, metricas = self.pedir(conexion, "GET", "/metricas")
+        self.assertEqual(metricas["POST /consultas"]["peticiones"], 160)
+        self.assertIn("p99_ms", metricas["POST /consultas"])
+        conexion.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,12 +39,27 @@
 #     unittest.main(verbosity=2)
 import unittest
 from unittest.mock import patch, mock_open
-from sprint6 import Mascota, Propietario, Consulta, SistemaVeterinaria
-from datetime import datetime
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria, main, configurar_logging, detener_logging, leer_registros, DURABILIDADES
+from metricas import instrumentacion
+from datetime import datetime, date
+import csv
+import io
 import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
 
 class TestVeterinaria(unittest.TestCase):
     def setUp(self):
+        # Directorio vacío para no leer ni escribir mascotas.csv y consultas.json del proyecto
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(os.chdir, self.directorio_original)
         self.sistema = SistemaVeterinaria()
         self.prop = Propietario("Carlos", "321", "Cra 45")
         self.mascota = Mascota("Luna", "Perro", "Labrador", 5, self.prop)
@@ -153,7 +168,958 @@ class TestVeterinaria(unittest.TestCase):
         self.assertEqual(consulta.mascota.propietario.nombre, "Ana")
         self.assertEqual(consulta.fecha.strftime("%d-%m-%Y"), "01-05-2024")
 
-    
+    # 5. Representación compacta
+    def test_fecha_es_date_compartida(self):
+        c1 = Consulta(datetime(2024, 5, 1, 10, 30), "Chequeo", "Bien", self.mascota)
+        c2 = Consulta.from_dict({"fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien",
+                                 "mascota": self.mascota.diccionarioMascotas()})
+        self.assertNotIsInstance(c1.fecha, datetime)
+        self.assertIs(c1.fecha, c2.fecha)
+        self.assertEqual(c1.diccionario_Consulta()["fecha"], "01-05-2024")
+
+    def test_clases_sin_dict(self):
+        with self.assertRaises(AttributeError):
+            self.mascota.color = "Negro"
+        self.assertFalse(hasattr(self.prop, "__dict__"))
+
+    # 6. Índices de búsqueda
+    def test_buscar_propietario_sin_distinguir_mayusculas(self):
+        self.sistema.propietarios = [self.prop]
+        self.assertIs(self.sistema.buscar_propietario("CARLOS"), self.prop)
+        self.assertIsNone(self.sistema.buscar_propietario("Nadie"))
+
+    def test_indices_reflejan_listas_reemplazadas(self):
+        self.sistema.mascotas = [self.mascota]
+        self.assertIs(self.sistema.buscar_mascota("luna"), self.mascota)
+        self.sistema.mascotas = []
+        self.assertIsNone(self.sistema.buscar_mascota("luna"))
+
+    def test_consultas_de_mascota(self):
+        self.sistema.consultas = [Consulta(datetime(2024, 5, 1), "Chequeo", "Bien", self.mascota)]
+        self.sistema.consultas.append(Consulta(datetime(2024, 6, 1), "Control", "Bien", self.mascota))
+        self.assertEqual([c.motivo for c in self.sistema.consultas_de_mascota("LUNA")], ["Chequeo", "Control"])
+        self.assertEqual(self.sistema.consultas_de_mascota("Otra"), [])
+
+
+class TestConDirectorioTemporal(unittest.TestCase):
+    """Ejecuta cada prueba en un directorio vacío con la mascota Luna registrada en el CSV."""
+    def setUp(self):
+        self.directorio_original = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        with open("mascotas.csv", "w", encoding="utf-8") as f:
+            f.write("Luna,Perro,Labrador,5,Carlos,321,Cra 45\n")
+
+    def tearDown(self):
+        os.chdir(self.directorio_original)
+        self.tmp.cleanup()
+
+    def registrar(self, sistema, fecha, motivo="Chequeo"):
+        with patch("builtins.input", side_effect=["Luna", fecha, motivo, "Bien"]), patch("builtins.print"):
+            sistema.registrar_consulta()
+
+
+class TestJournalConsultas(TestConDirectorioTemporal):
+    def test_consulta_se_agrega_al_journal(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024")
+        self.registrar(sistema, "02-05-2024")
+        self.assertFalse(os.path.exists("consultas.json"))
+        with open("consultas.jsonl", encoding="utf-8") as f:
+            tipos = [json.loads(linea)["tipo"] for linea in f]
+        # El propietario y la mascota se escriben una sola vez
+        self.assertEqual(tipos, ["propietario", "mascota", "consulta", "consulta"])
+
+    def test_inicio_reproduce_snapshot_y_journal(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024", "Vacunación")
+        sistema.compactar_consultas()
+        self.registrar(sistema, "02-05-2024", "Control")
+        self.assertEqual(sistema._entradas_journal, 1)
+
+        recargado = SistemaVeterinaria()
+        self.assertEqual([c.motivo for c in recargado.consultas], ["Vacunación", "Control"])
+
+    def test_compactacion_vacia_el_journal(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024")
+        sistema.compactar_consultas()
+        self.assertFalse(os.path.exists("consultas.jsonl"))
+        with open("consultas.json", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)["consultas"]), 1)
+
+    def test_snapshot_danado_no_borra_el_journal(self):
+        sistema = SistemaVeterinaria()
+        for dia in range(1, 6):
+            self.registrar(sistema, f"0{dia}-05-2024", f"c{dia}")
+        with open("consultas.json", "w", encoding="utf-8") as f:
+            f.write('{"version": 2, "propie')
+
+        for carga_diferida in (False, True):
+            with self.subTest(carga_diferida=carga_diferida):
+                recargado = SistemaVeterinaria(carga_diferida=carga_diferida)
+                self.assertEqual([c.motivo for c in recargado.consultas_de_mascota("Luna")],
+                                 ["c1", "c2", "c3", "c4", "c5"])
+                self.assertTrue(os.path.exists("consultas.jsonl.corrupto"))
+                os.replace("consultas.json.corrupto", "consultas.json")
+                os.remove("consultas.jsonl.corrupto")
+
+        recargado = SistemaVeterinaria()
+        self.registrar(recargado, "06-05-2024", "c6")
+        recargado.cerrar()
+        self.assertEqual([c.motivo for c in SistemaVeterinaria().consultas], ["c1", "c2", "c3", "c4", "c5", "c6"])
+        with open("consultas.json.corrupto", encoding="utf-8") as f:
+            self.assertEqual(f.read(), '{"version": 2, "propie')
+        with open("consultas.jsonl.corrupto", encoding="utf-8") as f:
+            self.assertEqual(sum(1 for _ in f), 7)
+
+    def test_linea_incompleta_se_descarta(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024")
+        with open("consultas.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"fecha": "02-05-20')
+        recargado = SistemaVeterinaria()
+        self.assertEqual(len(recargado.consultas), 1)
+        self.registrar(recargado, "03-05-2024")
+        self.assertEqual(len(SistemaVeterinaria().consultas), 2)
+
+
+class TestFormatoNormalizado(TestConDirectorioTemporal):
+    def test_consultas_comparten_la_mascota_registrada(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024")
+        self.registrar(sistema, "02-05-2024")
+        sistema.compactar_consultas()
+
+        recargado = SistemaVeterinaria()
+        luna = recargado.buscar_mascota("Luna")
+        self.assertTrue(all(c.mascota is luna for c in recargado.consultas))
+        self.assertIs(luna.propietario, recargado.buscar_propietario("Carlos"))
+        self.assertEqual(len(recargado.propietarios), 1)
+
+    def test_migracion_desde_formato_embebido(self):
+        embebida = {"nombre": "Luna", "especie": "Perro", "raza": "Labrador", "edad": 5,
+                    "propietario": {"nombre": "Carlos", "telefono": "321", "direccion": "Cra 45"}}
+        with open("consultas.json", "w", encoding="utf-8") as f:
+            json.dump([{"fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien", "mascota": embebida},
+                       {"fecha": "02-05-2024", "motivo": "Control", "diagnostico": "Bien", "mascota": embebida}], f)
+
+        sistema = SistemaVeterinaria()
+        self.assertIs(sistema.consultas[0].mascota, sistema.consultas[1].mascota)
+        self.assertIs(sistema.consultas[0].mascota, sistema.buscar_mascota("Luna"))
+        with open("consultas.json", encoding="utf-8") as f:
+            datos = json.load(f)
+        self.assertEqual(datos["version"], 2)
+        self.assertEqual(len(datos["mascotas"]), 1)
+        self.assertEqual({c["mascota_id"] for c in datos["consultas"]}, {datos["mascotas"][0]["id"]})
+
+
+class TestCargaDiferida(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog,3,Leo,999,Centro\n")
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024", "Vacunación")
+        sistema.agregar_consulta(Consulta(datetime(2024, 5, 2), "Control", "Bien", sistema.buscar_mascota("Max")))
+        sistema.compactar_consultas()
+        self.registrar(sistema, "03-05-2024", "Revisión")
+
+    def test_no_carga_consultas_al_iniciar(self):
+        sistema = SistemaVeterinaria(carga_diferida=True)
+        self.assertEqual(sistema.consultas, [])
+        consultas = sistema.consultas_de_mascota("luna")
+        self.assertEqual([c.motivo for c in consultas], ["Vacunación", "Revisión"])
+        self.assertTrue(all(c.mascota is sistema.buscar_mascota("Luna") for c in consultas))
+
+    def test_consulta_nueva_se_lee_del_journal(self):
+        sistema = SistemaVeterinaria(carga_diferida=True)
+        self.registrar(sistema, "04-05-2024", "Cirugía")
+        self.assertEqual([c.motivo for c in sistema.consultas_de_mascota("Luna")], ["Vacunación", "Revisión", "Cirugía"])
+        self.assertEqual(len(sistema.consultas_de_mascota("Max")), 1)
+
+    def test_compactar_carga_todo(self):
+        sistema = SistemaVeterinaria(carga_diferida=True)
+        sistema.compactar_consultas()
+        self.assertEqual(len(sistema.consultas), 3)
+        self.assertEqual(len(SistemaVeterinaria(carga_diferida=True).consultas_de_mascota("Luna")), 2)
+
+
+class TestImportacion(TestConDirectorioTemporal):
+    def test_importar_valida_y_deduplica(self):
+        sistema = SistemaVeterinaria()
+        resumen = sistema.importar_registros(
+            mascotas=[
+                {"nombre": "Max", "especie": "Perro", "raza": "Bulldog", "edad": "3", "propietario": "carlos"},
+                {"nombre": "Kira", "especie": "Gato", "raza": "Mestizo", "edad": "cuatro", "propietario": "Ana"},
+                {"nombre": "Luna", "especie": "Gato", "raza": "Siames", "edad": 2, "propietario": "Ana",
+                 "telefono": "123", "direccion": "XYZ"},
+            ],
+            consultas=[
+                {"mascota": "Luna", "propietario": "Ana", "fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien"},
+                {"mascota": "Max", "fecha": "2024/05/01", "motivo": "Chequeo", "diagnostico": "Bien"},
+            ])
+
+        self.assertEqual((resumen["propietarios"], resumen["mascotas"], resumen["consultas"]), (1, 2, 1))
+        self.assertEqual(len(resumen["errores"]), 2)
+        self.assertIs(sistema.buscar_mascota("Max").propietario, sistema.buscar_propietario("Carlos"))
+        self.assertEqual(sistema.consultas[0].mascota.especie, "Gato")  # La Luna de Ana, no la de Carlos
+
+        recargado = SistemaVeterinaria()
+        self.assertEqual([m.nombre for m in recargado.mascotas], ["Luna", "Max", "Luna"])
+        self.assertEqual(len(recargado.consultas), 1)
+
+    def test_textos_que_no_son_texto(self):
+        sistema = SistemaVeterinaria()
+        resumen = sistema.importar_registros(
+            mascotas=[{"nombre": 7, "especie": "Perro", "raza": "Bulldog", "edad": 3, "propietario": "Carlos"}],
+            consultas=[{"mascota": "Luna", "fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": None},
+                       {"mascota": "Luna", "fecha": "02-05-2024", "motivo": "Chequeo"}])
+        self.assertEqual((resumen["mascotas"], resumen["consultas"]), (0, 0))
+        self.assertEqual(len(resumen["errores"]), 3)
+        self.assertIn("nombre debe ser texto", resumen["errores"][0])
+        # Las búsquedas siguen funcionando
+        self.assertEqual(sistema.buscar_mascota("Luna").nombre, "Luna")
+        self.assertEqual(sistema.buscar_consultas("chequeo"), [])
+
+    def test_importar_archivos_del_sistema(self):
+        os.makedirs("otra")
+        otra = SistemaVeterinaria(directorio="otra")
+        leo = Propietario("Leo", "999", "Centro")
+        otra.agregar_propietario(leo)
+        otra.agregar_mascota(Mascota("Max", "Perro", "Bulldog", 3, leo))
+        otra.cerrar()
+        with open(os.path.join("otra", "anterior.csv"), "w", encoding="utf-8") as f:
+            f.write(f"Kira,Gato,Mestizo,4,{leo.id}\n")  # mascotas.csv de la versión anterior, sin encabezado ni id
+
+        with patch("builtins.print"):
+            main(["importar", "--mascotas", os.path.join("otra", "mascotas.csv")])
+            main(["importar", "--mascotas", os.path.join("otra", "anterior.csv")])
+        sistema = SistemaVeterinaria()
+        self.assertEqual([m.nombre for m in sistema.mascotas], ["Luna", "Max", "Kira"])
+        self.assertEqual(sistema.buscar_mascota("Max").propietario.telefono, "999")
+        self.assertIs(sistema.buscar_mascota("Kira").propietario, sistema.buscar_mascota("Max").propietario)
+        self.assertIsNone(sistema.buscar_propietario(str(leo.id)))
+
+    def test_csv_sin_encabezado_no_reconocido(self):
+        os.makedirs("otra")
+        rutas = (os.path.join("otra", "columnas.csv"), os.path.join("otra", "sin_propietarios.csv"))
+        with open(rutas[0], "w", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog\n")
+        with open(rutas[1], "w", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog,3,1\n")  # Sin el propietarios.csv con el propietario 1
+        for ruta in rutas:
+            with self.subTest(ruta=ruta):
+                with self.assertRaises(ValueError):
+                    leer_registros(ruta)
+                with patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+                    main(["importar", "--mascotas", ruta])
+        self.assertEqual([m.nombre for m in SistemaVeterinaria().mascotas], ["Luna"])
+
+    def test_subcomando_importar(self):
+        with open("padron.csv", "w", encoding="utf-8") as f:
+            f.write("nombre,especie,raza,edad,propietario,telefono,direccion\n")
+            f.write("Max,Perro,Bulldog,3,Leo,999,Centro\n")
+        with open("historial.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"mascota": "Max", "fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien"}) + "\n")
+
+        with patch("builtins.print"):
+            main(["importar", "--mascotas", "padron.csv", "--consultas", "historial.jsonl"])
+        sistema = SistemaVeterinaria()
+        self.assertEqual(sistema.buscar_mascota("Max").propietario.telefono, "999")
+        self.assertEqual(len(sistema.consultas_de_mascota("Max")), 1)
+
+    def test_propietarios_sin_mascotas_se_guardan(self):
+        with open("duenos.csv", "w", encoding="utf-8") as f:
+            f.write("nombre,telefono,direccion\nLeo,999,Centro\n")
+        with patch("builtins.print"):
+            main(["importar", "--propietarios", "duenos.csv"])
+        with patch("builtins.input", side_effect=["Sofía", "555", "Norte"]), patch("builtins.print"):
+            SistemaVeterinaria().registrar_propietario()
+
+        os.remove("veterinaria.estado")  # Solo con los archivos de datos
+        sistema = SistemaVeterinaria()
+        self.assertEqual(sistema.buscar_propietario("Leo").telefono, "999")
+        self.assertEqual(sistema.buscar_propietario("Sofía").direccion, "Norte")
+
+    def test_csv_de_consultas_con_encabezado(self):
+        # Cuatro columnas, como propietarios.csv, pero el encabezado es de consultas
+        with open("consultas.csv", "w", encoding="utf-8") as f:
+            f.write("mascota,fecha,motivo,diagnostico\n")
+            f.write("Luna,01-05-2024,Chequeo,Bien\n")
+        self.assertEqual(list(leer_registros("consultas.csv", "consultas")),
+                         [{"mascota": "Luna", "fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien"}])
+        with patch("builtins.print"):
+            main(["importar", "--consultas", "consultas.csv"])
+        self.assertEqual([c.motivo for c in SistemaVeterinaria().consultas_de_mascota("Luna")], ["Chequeo"])
+
+
+
+def escribir_desde_otro_proceso(numero, consultas, compactar_cada):
+    """Proceso escritor de la prueba de concurrencia: registra una mascota y sus consultas."""
+    sistema = SistemaVeterinaria()
+    mascota = Mascota(f"Mascota{numero}", "Perro", "Mestizo", 2, Propietario(f"Dueño{numero}", "300", "Calle"))
+    sistema.agregar_mascota(mascota)
+    for i in range(consultas):
+        sistema.agregar_consulta(Consulta(datetime(2024, 1, 1 + i % 28), f"{mascota.nombre}-{i}", "Bien", mascota))
+        if compactar_cada and i % compactar_cada == compactar_cada - 1:
+            sistema.compactar_consultas()
+
+
+class TestVariosProcesos(TestConDirectorioTemporal):
+    def test_escritores_concurrentes_no_pierden_registros(self):
+        procesos, consultas = 6, 25
+        contexto = multiprocessing.get_context()
+        escritores = [contexto.Process(target=escribir_desde_otro_proceso,
+                                       args=(n, consultas, 10 if n % 2 else 0)) for n in range(procesos)]
+        for escritor in escritores:
+            escritor.start()
+        for escritor in escritores:
+            escritor.join(60)
+            self.assertEqual(escritor.exitcode, 0)
+
+        for carga_diferida in (False, True):
+            sistema = SistemaVeterinaria(carga_diferida=carga_diferida)
+            self.assertEqual(len(sistema.mascotas), procesos + 1)  # Más Luna
+            for n in range(procesos):
+                historia = sistema.consultas_de_mascota(f"Mascota{n}")
+                self.assertEqual([c.motivo for c in historia], [f"Mascota{n}-{i}" for i in range(consultas)])
+                self.assertEqual(historia[0].mascota.propietario.nombre, f"Dueño{n}")
+        self.assertFalse(os.path.exists("consultas.json.tmp"))
+
+    def test_incorpora_lo_escrito_por_otra_instancia(self):
+        primero, segundo = SistemaVeterinaria(), SistemaVeterinaria()
+        self.registrar(primero, "01-05-2024", "Primera")
+        self.registrar(segundo, "02-05-2024", "Segunda")
+        primero.compactar_consultas()
+        self.registrar(segundo, "03-05-2024", "Tercera")
+
+        self.assertEqual([c.motivo for c in segundo.consultas], ["Primera", "Segunda", "Tercera"])
+        self.assertEqual([c.motivo for c in SistemaVeterinaria().consultas], ["Primera", "Segunda", "Tercera"])
+
+
+
+class TestLogging(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        nivel_original = logging.getLogger().level
+        self.addCleanup(logging.getLogger().setLevel, nivel_original)
+        self.addCleanup(detener_logging)
+
+    def test_importar_no_configura_logging(self):
+        codigo = "import logging, sprint7; print(len(logging.getLogger().handlers))"
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                                env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))})
+        self.assertEqual(salida.stdout.strip(), "0")
+        self.assertFalse(os.path.exists("clinica_veterinaria.log"))
+
+    def test_escribe_en_segundo_plano_con_nivel(self):
+        configurar_logging(nivel="warning")
+        logger = logging.getLogger("sprint7")
+        logger.info("no se escribe %s", "info")
+        logger.warning("Mascota %s sin dueño", "Luna")
+        detener_logging()  # Vacía la cola
+        with open("clinica_veterinaria.log", encoding="utf-8") as f:
+            contenido = f.read()
+        self.assertIn("WARNING - Mascota Luna sin dueño", contenido)
+        self.assertNotIn("no se escribe", contenido)
+
+    def test_rotacion_por_tamano(self):
+        configurar_logging(archivo="app.log", max_bytes=500, copias=2)
+        for i in range(100):
+            logging.getLogger("sprint7").info("Mensaje número %d", i)
+        detener_logging()
+        self.assertTrue(os.path.exists("app.log.1"))
+        self.assertTrue(os.path.exists("app.log.2"))
+        self.assertFalse(os.path.exists("app.log.3"))
+        with open("app.log", encoding="utf-8") as f:
+            self.assertIn("Mensaje número 99", f.read())
+
+
+
+class TestInstrumentacionSistema(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        instrumentacion.reiniciar()
+        self.addCleanup(instrumentacion.reiniciar)
+        self.addCleanup(setattr, instrumentacion, "activa", False)
+
+    def test_desactivada_por_defecto(self):
+        sistema = SistemaVeterinaria()
+        sistema.buscar_mascota("Luna")
+        self.assertEqual(instrumentacion.resumen(), {})
+
+    def test_menu_de_estadisticas(self):
+        instrumentacion.activa = True
+        tamano_csv = os.path.getsize("mascotas.csv")  # Antes de migrarlo al formato con propietarios.csv
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024")
+        with patch("builtins.input", side_effect=["Luna"]), patch("builtins.print"):
+            sistema.historia_clinica()
+        with patch("builtins.input", side_effect=["s"]), patch("builtins.print") as salida:
+            sistema.mostrar_estadisticas()
+
+        self.assertFalse(instrumentacion.activa)  # Se desactivó desde el menú
+        resumen = instrumentacion.resumen()
+        self.assertEqual(resumen["cargar_mascotas_duenos_csv"]["bytes_leidos"], tamano_csv)
+        self.assertEqual(resumen["agregar_consulta"]["llamadas"], 1)
+        self.assertGreater(resumen["agregar_consultas_journal"]["bytes_escritos"], 0)
+        self.assertEqual(resumen["historia_clinica"]["llamadas"], 1)
+        self.assertIn("Objetos en memoria: propietarios: 1, mascotas: 1, consultas: 1, entradas_journal: 3",
+                      [args[0] for args, _ in salida.call_args_list])
+        with open("metricas_veterinaria.prom", encoding="utf-8") as f:
+            contenido = f.read()
+        self.assertIn('veterinaria_operacion_segundos_count{operacion="buscar_mascota"}', contenido)
+        self.assertIn('veterinaria_objetos{tipo="consultas"} 1', contenido)
+
+
+
+class TestReportesPorFecha(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Kira,Gato,Mestizo,4,Ana,123,XYZ\n")
+        sistema = SistemaVeterinaria()
+        for fecha, mascota in [("15-05-2024", "Luna"), ("01-04-2024", "Kira"), ("20-05-2024", "Kira")]:
+            with patch("builtins.input", side_effect=[mascota, fecha, "Chequeo", "Bien"]), patch("builtins.print"):
+                sistema.registrar_consulta()
+        self.sistema = sistema
+
+    def test_rango_y_agregados(self):
+        self.assertEqual([(c.fecha.day, c.mascota.nombre) for c in self.sistema.consultas_entre(date(2024, 5, 1), date(2024, 5, 31))],
+                         [(15, "Luna"), (20, "Kira")])
+        self.assertEqual(self.sistema.visitas_por_mes(), {"2024-04": {"Gato": 1}, "2024-05": {"Perro": 1, "Gato": 1}})
+        self.assertEqual(self.sistema.ultima_visita("kira").fecha, date(2024, 5, 20))
+        self.assertIsNone(self.sistema.ultima_visita("Nadie"))
+
+    def test_indice_se_actualiza_con_cada_consulta(self):
+        self.sistema.consultas_entre(date(2024, 1, 1), date(2024, 12, 31))
+        indice = self.sistema._indices["fechas"][0]
+        self.registrar(self.sistema, "02-04-2024", "Control")
+        self.assertEqual([c.motivo for c in self.sistema.consultas_entre(date(2024, 4, 1), date(2024, 4, 30))],
+                         ["Chequeo", "Control"])
+        self.assertIs(self.sistema._indices["fechas"][0], indice)  # No se reconstruyó
+
+    def test_con_carga_diferida(self):
+        sistema = SistemaVeterinaria(carga_diferida=True)
+        self.assertEqual([c.mascota.nombre for c in sistema.ultimas_visitas()], ["Kira", "Luna"])
+
+    def test_opciones_del_menu(self):
+        with patch("builtins.input", side_effect=["01-05-2024", "31/05/2024", "31-05-2024"]), \
+             patch("builtins.print") as salida:
+            self.sistema.reporte_consultas_entre()
+        self.assertIn("Total: 2 consultas.", [args[0] for args, _ in salida.call_args_list if args])
+        with patch("builtins.input", side_effect=["", ""]), patch("builtins.print") as salida:
+            self.sistema.reporte_visitas_por_mes()
+        self.assertIn("2024-05       2 visitas  (Gato: 1, Perro: 1)", [args[0] for args, _ in salida.call_args_list if args])
+
+
+
+class TestBusquedaPorPalabras(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Kira,Gato,Mestizo,4,Ana,123,XYZ\n")
+        self.sistema = SistemaVeterinaria()
+        for nombre, fecha, motivo, diagnostico in [
+            ("Luna", "10-03-2023", "Picazón", "Dermatitis alérgica"),
+            ("Kira", "15-06-2023", "Vacunación", "Sin novedad"),
+            ("Kira", "20-01-2024", "Pérdida de pelo", "dermatitis por pulgas"),
+        ]:
+            with patch("builtins.input", side_effect=[nombre, fecha, motivo, diagnostico]), patch("builtins.print"):
+                self.sistema.registrar_consulta()
+
+    def test_busqueda_con_filtros(self):
+        self.assertEqual([c.fecha.year for c in self.sistema.buscar_consultas("dermatitis")], [2023, 2024])
+        self.assertEqual(len(self.sistema.buscar_consultas("DERMATITIS", desde=date(2023, 1, 1), hasta=date(2023, 12, 31))), 1)
+        self.assertEqual([c.mascota.nombre for c in self.sistema.buscar_consultas("derma*", especie="gato")], ["Kira"])
+        self.assertEqual(len(self.sistema.buscar_consultas("vacunacion OR pulgas")), 2)
+
+        self.registrar(self.sistema, "01-02-2024", "Dermatitis recurrente")
+        self.assertEqual(len(self.sistema.buscar_consultas("dermatitis")), 3)  # Se actualiza al registrar
+
+    def test_indice_se_guarda_y_se_reutiliza(self):
+        self.sistema.buscar_consultas("dermatitis")
+        self.sistema.compactar_consultas()
+        self.registrar(self.sistema, "01-02-2024", "Dermatitis recurrente")
+        self.sistema.cerrar()
+        self.assertTrue(os.path.exists("consultas.indice"))
+
+        with patch("indice_texto.IndiceTexto.agregar") as agregar:
+            recargado = SistemaVeterinaria()
+            self.assertEqual(len(recargado.buscar_consultas("dermatitis")), 3)
+        agregar.assert_not_called()  # No se reconstruyó
+
+    def test_indice_de_otro_snapshot_se_descarta(self):
+        self.sistema.buscar_consultas("dermatitis")
+        self.sistema.compactar_consultas()
+        otro = SistemaVeterinaria()
+        self.registrar(otro, "01-02-2024", "Otitis")
+        otro.compactar_consultas()  # Sin índice construido: el guardado queda viejo
+        self.assertEqual(len(SistemaVeterinaria().buscar_consultas("otitis OR dermatitis")), 3)
+
+
+
+class TestEstadoBinario(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024", "Vacunación")
+        historica = Mascota("Toby", "Perro", "Beagle", 2, Propietario("Ana", None, "XYZ"))
+        sistema.agregar_consulta(Consulta(datetime(2024, 6, 1), "Control", "Bien", historica))
+        sistema.cerrar()
+
+    def cargar_sin_analizar_archivos(self):
+        leidos = []
+        leer_csv = SistemaVeterinaria._cargar_mascotas_duenos_csv
+
+        def leer_desde(sistema, desde=0, desde_propietarios=0):
+            leidos.append(desde)
+            return leer_csv(sistema, desde, desde_propietarios)
+
+        with patch.object(SistemaVeterinaria, "cargar_json") as cargar_json, \
+             patch.object(SistemaVeterinaria, "_cargar_mascotas_duenos_csv", leer_desde):
+            sistema = SistemaVeterinaria()
+        cargar_json.assert_not_called()
+        self.assertNotIn(0, leidos)  # Del CSV solo se leen filas agregadas después del snapshot
+        return sistema
+
+    def test_inicia_desde_el_snapshot(self):
+        self.assertTrue(os.path.exists("veterinaria.estado"))
+        sistema = self.cargar_sin_analizar_archivos()
+        self.assertEqual([m.nombre for m in sistema.mascotas], ["Luna"])
+        self.assertEqual([(c.fecha, c.motivo, c.mascota.nombre) for c in sistema.consultas],
+                         [(date(2024, 5, 1), "Vacunación", "Luna"), (date(2024, 6, 1), "Control", "Toby")])
+        self.assertIs(sistema.consultas[0].mascota, sistema.mascotas[0])
+        self.assertIsNone(sistema.consultas[1].mascota.propietario.telefono)
+
+        # Los ids continúan y lo nuevo se guarda igual que sin snapshot
+        self.registrar(sistema, "02-05-2024", "Control")
+        sistema.agregar_mascota(Mascota("Max", "Perro", "Bulldog", 3, Propietario("Leo", "999", "Centro")))
+        recargado = SistemaVeterinaria()
+        self.assertEqual(len(recargado.consultas), 3)
+        self.assertEqual(len({m.id for m in recargado._por_id["mascota"].values()}), 3)
+        self.assertEqual([m.nombre for m in recargado.mascotas], ["Luna", "Max"])
+
+    def test_incorpora_lo_agregado_despues_del_snapshot(self):
+        otro = SistemaVeterinaria(carga_diferida=True)
+        otro.agregar_mascota(Mascota("Max", "Perro", "Bulldog", 3, Propietario("Leo", "999", "Centro")))
+        self.registrar(otro, "03-05-2024", "Desparasitación")
+
+        sistema = self.cargar_sin_analizar_archivos()
+        self.assertEqual([m.nombre for m in sistema.mascotas], ["Luna", "Max"])
+        self.assertEqual([c.motivo for c in sistema.consultas], ["Vacunación", "Control", "Desparasitación"])
+
+    def test_textos_ausentes_de_consultas(self):
+        sistema = SistemaVeterinaria()
+        sistema.agregar_consulta(Consulta(datetime(2024, 7, 1), None, None, sistema.buscar_mascota("Luna")))
+        sistema.cerrar()
+        sistema = self.cargar_sin_analizar_archivos()
+        self.assertEqual([(c.motivo, c.diagnostico) for c in sistema.consultas],
+                         [("Vacunación", "Bien"), ("Control", "Bien"), (None, None)])
+
+    def test_solo_lo_que_esta_en_los_archivos(self):
+        sistema = SistemaVeterinaria()
+        sistema.agregar_propietario(Propietario("Sofía", "555", "Norte"))  # Sin mascotas: no se escribe
+        sistema.cerrar()
+        self.assertIsNone(self.cargar_sin_analizar_archivos().buscar_propietario("Sofía"))
+
+    def test_se_guarda_despues_de_migrar(self):
+        embebida = {"nombre": "Luna", "especie": "Perro", "raza": "Labrador", "edad": 5,
+                    "propietario": {"nombre": "Carlos", "telefono": "321", "direccion": "Cra 45"}}
+        with open("consultas.json", "w", encoding="utf-8") as f:
+            json.dump([{"fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien", "mascota": embebida}], f)
+        os.remove("veterinaria.estado")
+        SistemaVeterinaria().cerrar()
+        self.assertEqual([c.motivo for c in self.cargar_sin_analizar_archivos().consultas], ["Chequeo"])
+
+    def test_snapshot_desactualizado_se_descarta(self):
+        with open("mascotas.csv", "w", encoding="utf-8") as f:
+            f.write("Kira,Gato,Mestizo,4,Ana,123,XYZ\n")
+        self.assertEqual([m.nombre for m in SistemaVeterinaria().mascotas], ["Kira"])
+
+    def test_snapshot_danado_se_descarta(self):
+        with open("veterinaria.estado", "r+b") as f:
+            f.truncate(100)
+        self.assertEqual(len(SistemaVeterinaria().consultas), 2)
+
+    def test_guardado_periodico(self):
+        os.remove("veterinaria.estado")
+        sistema = SistemaVeterinaria()
+        with patch("sprint7.INTERVALO_ESTADO", 0):
+            self.registrar(sistema, "02-05-2024")
+        self.assertEqual(len(self.cargar_sin_analizar_archivos().consultas), 3)
+
+
+class TestListados(TestConDirectorioTemporal):
+    def test_lista_de_mascotas_en_una_escritura(self):
+        sistema = SistemaVeterinaria()
+        salida = io.StringIO()
+        with patch("builtins.print"), patch.object(salida, "write", wraps=salida.write) as escribir:
+            sistema.listar_mascotas(salida)
+        escribir.assert_called_once_with(
+            "Nombre: Luna\nEspecie: Perro\nRaza: Labrador\nEdad: 5\nPropietario: Carlos\n" + "-" * 30 + "\n")
+
+    def test_historia_se_reutiliza_hasta_que_cambia(self):
+        sistema = SistemaVeterinaria()
+        self.registrar(sistema, "01-05-2024", "Vacunación")
+        texto_consulta = Consulta.__str__
+        with patch.object(Consulta, "__str__", autospec=True, side_effect=texto_consulta) as formatear, \
+             patch("builtins.print"):
+            for _ in range(3):
+                sistema.historia_clinica("luna", io.StringIO())
+            self.assertEqual(formatear.call_count, 1)
+            self.registrar(sistema, "02-05-2024", "Control")
+            salida = io.StringIO()
+            sistema.historia_clinica("Luna", salida)
+        self.assertEqual(formatear.call_count, 2)  # Solo se formateó la consulta nueva
+        self.assertEqual(salida.getvalue().count("Fecha: "), 2)
+        self.assertTrue(salida.getvalue().endswith("Motivo: Control\nDiagnostico: Bien\nMascota: Luna\n\n"))
+
+    def test_lista_se_rehace_si_se_recargan_las_mascotas(self):
+        sistema = SistemaVeterinaria()
+        salida = io.StringIO()
+        with patch("builtins.print"):
+            sistema.listar_mascotas(salida)
+            sistema.mascotas = [Mascota("Max", "Perro", "Bulldog", 3, None)]
+            sistema.listar_mascotas(salida)
+        self.assertTrue(salida.getvalue().endswith("Nombre: Max\nEspecie: Perro\nRaza: Bulldog\nEdad: 3\n"
+                                                   "Propietario: Sin propietario\n" + "-" * 30 + "\n"))
+
+    def test_subcomandos_listar_e_historia(self):
+        sistema = SistemaVeterinaria()
+        for mes in range(1, 6):
+            self.registrar(sistema, f"01-{mes:02d}-2024", f"Control {mes}")
+        sistema.agregar_mascota(Mascota("Max", "Perro", "Bulldog", 3, sistema.buscar_propietario("Carlos")))
+        with patch("builtins.print"):
+            main(["listar", "--salida", "mascotas.txt"])
+            main(["historia", "Luna", "--tamano-pagina", "2", "--pagina", "3", "--salida", "historia.txt"])
+        with open("mascotas.txt", encoding="utf-8") as f:
+            self.assertEqual([linea for linea in f if linea.startswith("Nombre")], ["Nombre: Luna\n", "Nombre: Max\n"])
+        with open("historia.txt", encoding="utf-8") as f:
+            self.assertEqual([linea for linea in f if linea.startswith("Motivo")], ["Motivo: Control 5\n"])
+
+    def test_subcomandos_escriben_todo_en_la_salida(self):
+        self.registrar(SistemaVeterinaria(), "01-05-2024")
+        with patch("sys.stdout", io.StringIO()) as consola:
+            main(["listar", "--salida", "mascotas.txt"])
+            main(["historia", "Luna", "--salida", "historia.txt"])
+            main(["historia", "Kira", "--salida", "sin_consultas.txt"])
+        self.assertEqual(consola.getvalue(), "")
+        with open("historia.txt", encoding="utf-8") as f:
+            texto = f.read()
+        self.assertIn("Historia Clínica", texto)
+        self.assertIn("Historial clínico de Luna:", texto)
+        with open("sin_consultas.txt", encoding="utf-8") as f:
+            self.assertIn("No hay consultas registradas", f.read())
+
+    def test_subcomando_con_pagina_inexistente(self):
+        sistema = SistemaVeterinaria()
+        for nombre in ("Max", "Kira", "Toby"):
+            sistema.agregar_mascota(Mascota(nombre, "Perro", "Bulldog", 3, sistema.buscar_propietario("Carlos")))
+        for pagina in ("-1", "0", "3", "9"):
+            with self.subTest(pagina=pagina):
+                errores = io.StringIO()
+                with patch("builtins.print"), patch("sys.stderr", errores), self.assertRaises(SystemExit) as salida:
+                    main(["listar", "--tamano-pagina", "2", "--pagina", pagina])
+                self.assertEqual(salida.exception.code, 2)
+                self.assertIn("--pagina" if pagina in ("-1", "0") else f"La página {pagina} no existe", errores.getvalue())
+        with patch("builtins.print"), patch("sys.stdout", io.StringIO()) as salida:
+            main(["listar", "--tamano-pagina", "2", "--pagina", "2"])
+        self.assertIn("Nombre: Kira", salida.getvalue())
+
+
+class TestPropietariosCSV(TestConDirectorioTemporal):
+    def leer(self, ruta):
+        with open(ruta, newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))
+
+    def test_migra_conservando_los_ids_de_las_consultas(self):
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog,3,carlos,321,Cra 45\n")
+            f.write("Kira,Gato,Mestizo,4,Ana,123,XYZ\n")
+        with open("consultas.json", "w", encoding="utf-8") as f:
+            json.dump({"version": 2,
+                       "propietarios": [{"id": 7, "nombre": "Carlos", "telefono": "321", "direccion": "Cra 45"}],
+                       "mascotas": [{"id": 3, "nombre": "Luna", "especie": "Perro", "raza": "Labrador", "edad": 5,
+                                     "propietario_id": 7}],
+                       "consultas": [{"fecha": "01-05-2024", "motivo": "Chequeo", "diagnostico": "Bien",
+                                      "mascota_id": 3}]}, f)
+        SistemaVeterinaria()
+
+        self.assertEqual(self.leer("propietarios.csv"), [["7", "Carlos", "321", "Cra 45"], ["8", "Ana", "123", "XYZ"]])
+        self.assertEqual(self.leer("mascotas.csv"), [["id", "nombre", "especie", "raza", "edad", "propietario_id"],
+                                                     ["3", "Luna", "Perro", "Labrador", "5", "7"],
+                                                     ["4", "Max", "Perro", "Bulldog", "3", "7"],
+                                                     ["5", "Kira", "Gato", "Mestizo", "4", "8"]])
+        recargado = SistemaVeterinaria()
+        self.assertEqual([(p.id, p.nombre) for p in recargado.propietarios], [(7, "Carlos"), (8, "Ana")])
+        luna = recargado.buscar_mascota("Luna")
+        self.assertIs(recargado.buscar_mascota("Max").propietario, luna.propietario)
+        self.assertIs(recargado.consultas[0].mascota, luna)
+
+    def test_mascota_nueva_agrega_su_propietario_una_vez(self):
+        sistema = SistemaVeterinaria()
+        ana = Propietario("Ana", "123", "XYZ")
+        sistema.agregar_mascota(Mascota("Kira", "Gato", "Mestizo", 4, ana))
+        sistema.agregar_mascota(Mascota("Mia", "Gato", "Siames", 1, ana))
+        self.assertEqual([fila[1] for fila in self.leer("propietarios.csv")], ["Carlos", "Ana"])
+        self.assertEqual([fila[5] for fila in self.leer("mascotas.csv")[1:]], ["1", "2", "2"])
+        self.assertEqual(len(SistemaVeterinaria().propietarios), 2)
+
+    def test_actualizar_sin_reescribir(self):
+        sistema = SistemaVeterinaria()
+        otro = SistemaVeterinaria()
+        tamano_mascotas = os.path.getsize("mascotas.csv")
+        carlos = sistema.buscar_propietario("Carlos")
+        with patch("builtins.input", side_effect=["carlos", "", "Calle 9"]), patch("builtins.print"):
+            sistema.actualizar_datos_propietario()
+
+        self.assertEqual(self.leer("propietarios.csv"), [["1", "Carlos", "321", "Cra 45"], ["1", "Carlos", "321", "Calle 9"]])
+        self.assertEqual(os.path.getsize("mascotas.csv"), tamano_mascotas)
+        self.assertEqual(SistemaVeterinaria().buscar_mascota("Luna").propietario.direccion, "Calle 9")
+        with otro.bloqueo():  # Otra instancia incorpora el cambio al sincronizarse
+            self.assertEqual(otro.buscar_propietario("Carlos").direccion, "Calle 9")
+        self.assertEqual(len(otro.propietarios), 1)
+        self.assertEqual(carlos.telefono, "321")
+
+    def test_mascotas_homonimas_del_mismo_propietario(self):
+        sistema = SistemaVeterinaria()
+        carlos = sistema.buscar_propietario("Carlos")
+        gata = Mascota("Luna", "Gato", "Persa", 2, carlos)
+        sistema.agregar_mascota(gata)
+        sistema.agregar_consulta(Consulta(datetime(2024, 5, 1), "Control", "Bien", gata))
+        sistema.cerrar()
+        os.remove("veterinaria.estado")
+
+        recargado = SistemaVeterinaria()
+        self.assertEqual([m.especie for m in recargado.mascotas], ["Perro", "Gato"])
+        self.assertIs(recargado.consultas[0].mascota, recargado.mascotas[1])
+
+    def test_migra_el_formato_sin_id_de_mascota(self):
+        with open("propietarios.csv", "w", encoding="utf-8") as f:
+            f.write("1,Carlos,321,Cra 45\n")
+        with open("mascotas.csv", "w", encoding="utf-8") as f:
+            f.write("Luna,Perro,Labrador,5,1\nMax,Perro,Bulldog,3,1\n")
+        SistemaVeterinaria()
+        self.assertEqual(self.leer("mascotas.csv"), [["id", "nombre", "especie", "raza", "edad", "propietario_id"],
+                                                     ["1", "Luna", "Perro", "Labrador", "5", "1"],
+                                                     ["2", "Max", "Perro", "Bulldog", "3", "1"]])
+        self.assertEqual([m.id for m in SistemaVeterinaria().mascotas], [1, 2])
+
+    def test_filas_antiguas_agregadas_despues_se_migran(self):
+        SistemaVeterinaria()
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog,3,Carlos,321,Cra 45\n")  # Escrita por una versión anterior
+        sistema = SistemaVeterinaria()
+        self.assertIs(sistema.buscar_mascota("Max").propietario, sistema.buscar_mascota("Luna").propietario)
+        self.assertEqual([len(fila) for fila in self.leer("mascotas.csv")], [6, 6, 6])
+        self.assertEqual(len(self.leer("propietarios.csv")), 1)
+
+
+# Registra 5 mascotas y 2 consultas con lotes de 3 y termina sin cerrar, como una caída del programa
+CODIGO_CAIDA = """
+import os, sys
+from datetime import date
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria
+sistema = SistemaVeterinaria(lote_escritura=3, intervalo_escritura=None, durabilidad=sys.argv[1])
+ana = Propietario("Ana", "123", "XYZ")
+sistema.agregar_propietario(ana)
+mascotas = [Mascota(f"Mascota{i}", "Gato", "Mestizo", i, ana) for i in range(5)]
+for mascota in mascotas:
+    sistema.agregar_mascota(mascota)
+sistema.agregar_consulta(Consulta(date(2024, 5, 1), "Primera", "Bien", mascotas[0]))
+sistema.agregar_consulta(Consulta(date(2024, 5, 2), "Segunda", "Bien", mascotas[0]))
+os._exit(1)
+"""
+
+
+class TestBufferEscritura(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        SistemaVeterinaria().cerrar()  # Migra el CSV de Luna
+        self.ana = Propietario("Ana", "123", "XYZ")
+
+    def mascotas_en_csv(self):
+        with open("mascotas.csv", newline="", encoding="utf-8") as f:
+            return [fila[1] for fila in csv.reader(f)][1:]
+
+    def test_escribe_por_cantidad(self):
+        sistema = SistemaVeterinaria(lote_escritura=3, intervalo_escritura=None)
+        sistema.agregar_propietario(self.ana)
+        with patch.object(sistema, "guardar_mascotas_csv", wraps=sistema.guardar_mascotas_csv) as guardar:
+            for nombre in ("Kira", "Max"):
+                sistema.agregar_mascota(Mascota(nombre, "Gato", "Mestizo", 4, self.ana))
+            self.assertEqual(self.mascotas_en_csv(), ["Luna"])
+            self.assertEqual(sistema.buscar_mascota("Max").propietario, self.ana)  # Ya se ve en memoria
+            sistema.agregar_mascota(Mascota("Toby", "Perro", "Beagle", 2, self.ana))
+        guardar.assert_called_once()
+        self.assertEqual(self.mascotas_en_csv(), ["Luna", "Kira", "Max", "Toby"])
+
+    def test_escribe_por_tiempo(self):
+        sistema = SistemaVeterinaria(lote_escritura=100, intervalo_escritura=5)
+        sistema.agregar_propietario(self.ana)
+        with patch("sprint7.time.monotonic", return_value=1000.0):
+            sistema.agregar_mascota(Mascota("Kira", "Gato", "Mestizo", 4, self.ana))
+        with patch("sprint7.time.monotonic", return_value=1004.0):
+            self.registrar(sistema, "01-05-2024")
+            self.assertEqual(sistema.escribir_pendientes(vencidas=True), 0)
+        self.assertEqual(self.mascotas_en_csv(), ["Luna"])
+        self.assertFalse(os.path.exists("consultas.jsonl"))
+        with patch("sprint7.time.monotonic", return_value=1005.0):
+            self.assertEqual(sistema.escribir_pendientes(vencidas=True), 2)
+        self.assertEqual(self.mascotas_en_csv(), ["Luna", "Kira"])
+        self.assertEqual([c.motivo for c in SistemaVeterinaria().consultas], ["Chequeo"])
+
+    def test_al_cerrar_y_en_carga_diferida(self):
+        sistema = SistemaVeterinaria(lote_escritura=10, intervalo_escritura=None)
+        sistema.agregar_propietario(self.ana)
+        sistema.agregar_mascota(Mascota("Kira", "Gato", "Mestizo", 4, self.ana))
+        self.registrar(sistema, "01-05-2024")
+        self.assertEqual(sistema.escribir_pendientes(vencidas=True), 0)
+        self.assertEqual(SistemaVeterinaria().consultas, [])
+        sistema.cerrar()
+        recargado = SistemaVeterinaria()
+        self.assertEqual([m.nombre for m in recargado.mascotas], ["Luna", "Kira"])
+        self.assertEqual([c.motivo for c in recargado.consultas], ["Chequeo"])
+
+        diferido = SistemaVeterinaria(carga_diferida=True, lote_escritura=10)
+        self.registrar(diferido, "02-05-2024", "Control")
+        self.assertEqual([c.motivo for c in diferido.consultas_de_mascota("Luna")], ["Chequeo", "Control"])
+
+    def test_menu_escribe_antes_de_preguntar(self):
+        respuestas = iter(["2", "Luna", "01-05-2024", "Chequeo", "Bien", "5"])
+        motivos = []
+
+        def responder(pregunta=""):
+            if pregunta == "> ":  # Mientras se espera la opción, otro proceso ya ve la consulta
+                motivos.append([c.motivo for c in SistemaVeterinaria().consultas])
+            return next(respuestas)
+
+        with patch("builtins.input", side_effect=responder), patch("builtins.print"):
+            main(["--lote-escritura", "10", "--intervalo-escritura", "3600"])
+        self.assertEqual(motivos, [[], ["Chequeo"]])
+
+    def test_compactar_no_duplica_pendientes(self):
+        sistema = SistemaVeterinaria(lote_escritura=10)
+        self.registrar(sistema, "01-05-2024")
+        sistema.compactar_consultas()
+        sistema.cerrar()
+        self.assertEqual([c.motivo for c in SistemaVeterinaria().consultas], ["Chequeo"])
+
+    def test_fsync_por_lote(self):
+        for durabilidad, llamadas in (("flush", 0), ("fsync", 2)):
+            sistema = SistemaVeterinaria(lote_escritura=2, durabilidad=durabilidad)
+            propietario = Propietario(f"Dueño {durabilidad}", "1", "X")
+            sistema.agregar_propietario(propietario)
+            with patch("sprint7.os.fsync") as fsync:
+                for nombre in ("Kira", "Max"):
+                    sistema.agregar_mascota(Mascota(nombre, "Gato", "Mestizo", 4, propietario))
+            # propietarios.csv y mascotas.csv, una vez por lote
+            self.assertEqual(fsync.call_count, llamadas, durabilidad)
+
+    def test_durabilidad_desconocida(self):
+        for durabilidad in ("siempre", "ninguna"):
+            with self.subTest(durabilidad=durabilidad), self.assertRaises(ValueError):
+                SistemaVeterinaria(durabilidad=durabilidad)
+
+    def test_recuperacion_tras_una_caida(self):
+        entorno = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+        # Los dos lotes completos: Mascota0-2 y Mascota3-4 con la primera consulta; la segunda esperaba.
+        # Ante una caída del programa ambas durabilidades conservan lo mismo: "fsync" solo agrega
+        # la espera por el disco (ver test_fsync_por_lote), que protege de un corte de energía
+        mascotas = ["Luna", "Mascota0", "Mascota1", "Mascota2", "Mascota3", "Mascota4"]
+        consultas = ["Primera"]
+        for durabilidad in DURABILIDADES:
+            with tempfile.TemporaryDirectory() as directorio:
+                with open(os.path.join(directorio, "mascotas.csv"), "w", encoding="utf-8") as f:
+                    f.write("Luna,Perro,Labrador,5,Carlos,321,Cra 45\n")
+                proceso = subprocess.run([sys.executable, "-c", CODIGO_CAIDA, durabilidad], cwd=directorio,
+                                         env=entorno, capture_output=True)
+                self.assertEqual(proceso.returncode, 1)
+                recuperado = SistemaVeterinaria(directorio=directorio)
+                self.assertEqual([m.nombre for m in recuperado.mascotas], mascotas, durabilidad)
+                self.assertEqual([c.motivo for c in recuperado.consultas], consultas, durabilidad)
+
+
+class TestRecargaIncremental(TestConDirectorioTemporal):
+    def setUp(self):
+        super().setUp()
+        SistemaVeterinaria().cerrar()  # Migra el CSV de Luna
+        self.lector = SistemaVeterinaria()
+        self.escritor = SistemaVeterinaria()
+
+    def registrar_mascota(self, sistema, nombre, propietario="Ana"):
+        with patch("builtins.input", side_effect=[nombre, "Gato", "Mestizo", "4", propietario, propietario, "123", "XYZ"]), \
+             patch("builtins.print"):
+            sistema.registrar_mascota()
+
+    def test_incorpora_solo_lo_agregado(self):
+        self.registrar_mascota(self.escritor, "Kira")
+        self.registrar(self.escritor, "01-05-2024")
+        self.assertIsNone(self.lector.buscar_mascota("Kira"))
+        fin_csv = self.lector._fin_csv
+        with patch.object(self.lector, "_recargar_todo") as recargar_todo, \
+             patch.object(self.lector, "_cargar_mascotas_duenos_csv", wraps=self.lector._cargar_mascotas_duenos_csv) as cargar:
+            self.assertTrue(self.lector.recargar_cambios())
+        recargar_todo.assert_not_called()
+        self.assertEqual(cargar.call_args.kwargs["desde"], fin_csv)
+        self.assertEqual(self.lector.buscar_mascota("Kira").propietario.nombre, "Ana")
+        self.assertEqual([c.motivo for c in self.lector.consultas_de_mascota("Luna")], ["Chequeo"])
+        with patch.object(self.lector, "bloqueo") as bloqueo:
+            self.assertFalse(self.lector.recargar_cambios())  # Sin cambios no se toma el bloqueo
+        bloqueo.assert_not_called()
+
+    def test_por_intervalo_al_consultar(self):
+        with patch("sprint7.time.monotonic", return_value=1000.0):
+            lector = SistemaVeterinaria(intervalo_recarga=5)
+        self.registrar_mascota(self.escritor, "Kira")
+        with patch("sprint7.time.monotonic", return_value=1004.0):
+            self.assertIsNone(lector.buscar_mascota("Kira"))
+        with patch("sprint7.time.monotonic", return_value=1005.0):
+            self.assertIsNotNone(lector.buscar_mascota("Kira"))
+
+    def test_archivo_reemplazado_recarga_todo(self):
+        self.registrar_mascota(self.escritor, "Kira")
+        self.registrar_mascota(self.escritor, "Max")
+        self.lector.recargar_cambios()
+        with open("mascotas.csv", newline="", encoding="utf-8") as f:
+            filas = [fila for fila in csv.reader(f) if fila[1] != "Max"]
+        SistemaVeterinaria._reescribir_csv("mascotas.csv", filas)
+        self.assertTrue(self.lector.recargar_cambios())
+        self.assertEqual([m.nombre for m in self.lector.mascotas], ["Luna", "Kira"])
+
+    def test_reescrito_en_el_lugar_o_truncado(self):
+        self.registrar_mascota(self.escritor, "Kira")
+        self.lector.recargar_cambios()
+        with open("mascotas.csv", "r+b") as f:
+            contenido = f.read()
+            f.seek(0)
+            f.write(contenido.replace(b"Kira", b"Kika"))
+        datos = os.stat("mascotas.csv")
+        os.utime("mascotas.csv", ns=(datos.st_atime_ns, datos.st_mtime_ns + 10**9))
+        self.assertTrue(self.lector.recargar_cambios())
+        self.assertEqual([m.nombre for m in self.lector.mascotas], ["Luna", "Kika"])
+
+        os.truncate("mascotas.csv", sum(map(len, contenido.splitlines(keepends=True)[:2])))
+        self.assertTrue(self.lector.recargar_cambios())
+        self.assertEqual([m.nombre for m in self.lector.mascotas], ["Luna"])
+
+    def test_migracion_de_otro_proceso_conserva_pendientes(self):
+        lector = SistemaVeterinaria(lote_escritura=10)
+        self.registrar_mascota(lector, "Toby", "Pedro")
+        # Otro puesto con la versión anterior agrega una fila; el siguiente en iniciar migra el CSV
+        with open("mascotas.csv", "a", encoding="utf-8") as f:
+            f.write("Max,Perro,Bulldog,3,Ana,123,XYZ\n")
+        SistemaVeterinaria()
+        self.assertTrue(lector.recargar_cambios())
+        self.assertEqual([m.nombre for m in lector.mascotas], ["Luna", "Max", "Toby"])
+        self.assertEqual(lector.buscar_propietario("Ana").telefono, "123")
+        lector.cerrar()
+        recargado = SistemaVeterinaria()
+        self.assertEqual([m.nombre for m in recargado.mascotas], ["Luna", "Max", "Toby"])
+        self.assertEqual(recargado.buscar_mascota("Toby").propietario.nombre, "Pedro")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+import time
+from datetime import date
+
+import servidor
+import sprint7
+from sprint7 import Mascota, Propietario, Consulta, SistemaVeterinaria, detener_logging
+from sucursales import RepositorioSucursales
+
+
+class TestRepositorioSucursales(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.norte, self.sur, self.centro = (os.path.join(self.tmp.name, nombre) for nombre in ("norte", "sur", "centro"))
+        os.makedirs(self.norte)
+        os.makedirs(self.sur)
+
+        norte = SistemaVeterinaria(directorio=self.norte)
+        carlos = Propietario("Carlos", "321", "Cra 45")
+        luna = Mascota("Luna", "Perro", "Labrador", 5, carlos)
+        norte.agregar_propietario(carlos)
+        norte.agregar_mascota(luna)
+        norte.agregar_consulta(Consulta(date(2024, 5, 1), "Vacunación", "Sano", luna))
+        norte.cerrar()
+
+        sur = SistemaVeterinaria(directorio=self.sur)
+        ana = Propietario("Ana", "123", "XYZ")
+        kira = Mascota("Kira", "Gato", "Mestizo", 4, ana)
+        sur.agregar_propietario(ana)
+        sur.agregar_mascota(kira)
+        sur.agregar_consulta(Consulta(date(2024, 3, 2), "Otitis", "Tratada", kira))
+        sur.agregar_consulta(Consulta(date(2024, 5, 20), "Control", "Bien", kira))
+        # Luna también fue atendida en el sur
+        carlos_sur = Propietario("Carlos", "321", "Cra 45")
+        luna_sur = Mascota("Luna", "Perro", "Labrador", 5, carlos_sur)
+        sur.agregar_propietario(carlos_sur)
+        sur.agregar_mascota(luna_sur)
+        sur.agregar_consulta(Consulta(date(2024, 4, 10), "Dermatitis", "Alergia", luna_sur))
+        sur.cerrar()
+
+    def abrir(self, **opciones):
+        repositorio = RepositorioSucursales([self.norte, self.sur, self.centro], trabajadores=2, **opciones)
+        self.addCleanup(repositorio.cerrar)
+        return SistemaVeterinaria(repositorio=repositorio)
+
+    def test_busquedas_en_todas_las_sucursales(self):
+        sistema = self.abrir()
+        self.assertTrue(os.path.isdir(self.centro))
+        self.assertEqual(sistema.buscar_propietario("ana").telefono, "123")
+        self.assertEqual(sistema.buscar_mascota("KIRA").especie, "Gato")
+        self.assertEqual(sorted(m.nombre for m in sistema.iterar_mascotas()), ["Kira", "Luna", "Luna"])
+        historia = sistema.consultas_de_mascota("Luna")
+        self.assertEqual([c.fecha for c in historia], [date(2024, 4, 10), date(2024, 5, 1)])
+        self.assertEqual(sistema.ultima_visita("Luna").motivo, "Vacunación")
+        self.assertEqual([c.mascota.nombre for c in sistema.ultimas_visitas()], ["Kira", "Luna"])
+        self.assertEqual(sistema.visitas_por_mes(), {"2024-03": {"Gato": 1}, "2024-04": {"Perro": 1},
+                                                      "2024-05": {"Perro": 1, "Gato": 1}})
+        self.assertEqual([c.motivo for c in sistema.consultas_entre(date(2024, 4, 1), date(2024, 5, 10))],
+                         ["Dermatitis", "Vacunación"])
+        self.assertEqual([c.motivo for c in sistema.buscar_consultas("otitis OR vacunacion")], ["Otitis", "Vacunación"])
+
+    def test_por_sucursal(self):
+        repositorio = RepositorioSucursales([self.norte, self.sur], trabajadores=1)
+        self.addCleanup(repositorio.cerrar)
+        self.assertEqual(sorted(repositorio.propietario_en_sucursales("Carlos")), sorted([self.norte, self.sur]))
+        historias = repositorio.historia_por_sucursal("Luna")
+        self.assertEqual({d: [c.motivo for c in consultas] for d, consultas in historias.items()},
+                         {self.norte: ["Vacunación"], self.sur: ["Dermatitis"]})
+
+    def test_registros_en_la_sucursal_activa(self):
+        sistema = self.abrir(activa=self.centro)
+        kira = sistema.buscar_mascota("Kira")
+        sistema.agregar_consulta(Consulta(date(2024, 6, 1), "Control", "Bien", kira))
+        sistema.agregar_mascota(Mascota("Toby", "Perro", "Beagle", 2, Propietario("Ana", "123", "XYZ")))
+        sistema.actualizar_propietario(sistema.buscar_propietario("Ana"), telefono="999")
+        sistema.agregar_propietario(Propietario("Sofía", "555", "Norte"))  # Sin mascotas
+        sistema.repositorio.cerrar()
+
+        os.remove(os.path.join(self.centro, "veterinaria.estado"))  # Solo con los archivos de datos
+        centro = SistemaVeterinaria(directorio=self.centro)
+        self.assertEqual(sorted(m.nombre for m in centro.mascotas), ["Kira", "Toby"])
+        self.assertEqual(len(centro.propietarios), 2)
+        self.assertEqual(centro.propietarios[0].telefono, "999")
+        self.assertEqual(centro.buscar_propietario("Sofía").telefono, "555")
+        self.assertEqual([c.fecha for c in centro.consultas_de_mascota("Kira")], [date(2024, 6, 1)])
+        self.assertEqual(SistemaVeterinaria(directorio=self.sur).buscar_propietario("Ana").telefono, "999")
+        self.assertEqual(len(SistemaVeterinaria(directorio=self.sur).consultas_de_mascota("Kira")), 2)
+
+    def test_buffer_de_escritura_en_los_trabajadores(self):
+        sistema = self.abrir(activa=self.centro, lote_escritura=10, intervalo_escritura=0.2)
+        sistema.agregar_consulta(Consulta(date(2024, 6, 1), "Control", "Bien", sistema.buscar_mascota("Kira")))
+        self.assertEqual(SistemaVeterinaria(directorio=self.centro).mascotas, [])  # Espera en el buffer
+        # El trabajador escribe el lote al vencer el intervalo, sin otro pedido que lo despierte
+        limite = time.monotonic() + 10
+        while not SistemaVeterinaria(directorio=self.centro).consultas_de_mascota("Kira") and time.monotonic() < limite:
+            time.sleep(0.1)
+        self.assertEqual(len(SistemaVeterinaria(directorio=self.centro).consultas_de_mascota("Kira")), 1)
+
+    def test_opciones_de_escritura_desde_main(self):
+        argumentos = ["--lote-escritura", "5", "--intervalo-escritura", "2", "--durabilidad", "fsync",
+                      "--sucursales", self.norte, self.sur]
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp.name)  # El log de la aplicación se escribe en el directorio actual
+        for principal in (sprint7.main, servidor.main):
+            with self.subTest(principal=principal.__module__), \
+                 patch("sucursales.RepositorioSucursales", side_effect=RuntimeError) as repositorio, \
+                 self.assertRaises(RuntimeError):
+                try:
+                    principal(argumentos)
+                finally:
+                    detener_logging()
+            self.assertEqual({clave: repositorio.call_args.kwargs[clave]
+                              for clave in ("lote_escritura", "intervalo_escritura", "durabilidad")},
+                             {"lote_escritura": 5, "intervalo_escritura": 2.0, "durabilidad": "fsync"})
+
+    def test_logs_de_los_trabajadores(self):
+        with self.assertLogs("sprint7", level="INFO"):
+            # Los registros llegan por una cola: al cerrar se termina de reenviarlos
+            self.abrir().repositorio.cerrar()
+
+    def test_sucursal_activa_desconocida(self):
+        with self.assertRaises(ValueError):
+            RepositorioSucursales([self.norte], activa=self.sur)
+
+
+if __name__ == "__main__":
+    unittest.main()